@@ -18,8 +18,14 @@ def create_app():
     # Enable CORS
     CORS(app)
 
+    # Return each request's database session to the pool when it ends
+    from app.models.database import remove_session
+    app.teardown_appcontext(remove_session)
+
     # Register blueprints
     from app.api.routes import api
+    from app.api.degree_routes import degrees
     app.register_blueprint(api, url_prefix='/api')
+    app.register_blueprint(degrees, url_prefix='/api')
 
     return app
@@ -0,0 +1,223 @@
+"""
+API Routes for degree planning
+Majors, minors, requirement analysis and schedule generation
+"""
+from flask import Blueprint, jsonify, request
+from app.models.database import Course, Major, Minor, get_session, loading_profile
+from app.utils.scheduler import ScheduleGenerator
+from app.utils.degree_analyzer import DegreeAnalyzer
+
+degrees = Blueprint('degrees', __name__)
+
+
+@degrees.route('/majors', methods=['GET'])
+def get_majors():
+    """Get all available majors with their required courses"""
+    try:
+        session = get_session()
+        majors = session.query(Major).options(*loading_profile('major')).order_by(Major.name).all()
+        return jsonify([major.to_dict() for major in majors]), 200
+
+    except Exception as e:
+        print(f"Error loading majors: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@degrees.route('/minors', methods=['GET'])
+def get_minors():
+    """Get all available minors with their required courses"""
+    try:
+        session = get_session()
+        minors = session.query(Minor).options(*loading_profile('minor')).order_by(Minor.name).all()
+        return jsonify([minor.to_dict() for minor in minors]), 200
+
+    except Exception as e:
+        print(f"Error loading minors: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _parse_id(value):
+    """Integer id from a JSON value (the frontend may send it as a string), or None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+def _degree_ids(data):
+    """
+    (major_id, minor_id) from a request body, or None if major_id is missing
+    or either id is not an integer. minor_id may be omitted.
+    """
+    major_id = _parse_id(data.get('major_id'))
+    minor_id = None
+    if data.get('minor_id') not in (None, ''):
+        minor_id = _parse_id(data.get('minor_id'))
+        if minor_id is None:
+            return None
+
+    return (major_id, minor_id) if major_id is not None else None
+
+
+def _load_degree(session, major_id, minor_id=None):
+    """Major and optional minor, with their course graphs loaded"""
+    major = session.get(Major, major_id, options=loading_profile('major'))
+
+    minor = None
+    if minor_id is not None:
+        minor = session.get(Minor, minor_id, options=loading_profile('minor'))
+
+    return major, minor
+
+
+def _invalid_ids():
+    return jsonify({'error': 'major_id (and minor_id, if given) must be integers'}), 400
+
+
+@degrees.route('/degree-requirements', methods=['POST'])
+def degree_requirements():
+    """
+    Get degree requirements analysis for a major, minor and classification
+    """
+    try:
+        data = request.json or {}
+        ids = _degree_ids(data)
+        if ids is None:
+            return _invalid_ids()
+
+        session = get_session()
+        major, minor = _load_degree(session, *ids)
+        if major is None:
+            return jsonify({'error': 'Major not found'}), 404
+
+        analysis = DegreeAnalyzer(session).analyze_requirements(
+            major, minor, data.get('classification', 'Freshman')
+        )
+        return jsonify(analysis), 200
+
+    except Exception as e:
+        print(f"Degree analysis error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@degrees.route('/generate-schedule', methods=['POST'])
+def generate_schedule():
+    """
+    Generate a semester schedule
+    """
+    try:
+        data = request.json or {}
+        ids = _degree_ids(data)
+        if ids is None:
+            return _invalid_ids()
+
+        session = get_session()
+        major, minor = _load_degree(session, *ids)
+        if major is None:
+            return jsonify({'error': 'Major not found'}), 404
+
+        schedule = ScheduleGenerator(session).generate_schedule(
+            major,
+            minor,
+            data.get('semester', ''),
+            data.get('credit_load', 'standard'),
+            data.get('completed_courses', [])
+        )
+        return jsonify(schedule), 200
+
+    except Exception as e:
+        print(f"Schedule generation error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@degrees.route('/generate-plan', methods=['POST'])
+def generate_plan():
+    """
+    Generate a plan covering every remaining semester through graduation
+
+    Takes the same body as /generate-schedule; semester is the first term.
+    """
+    try:
+        data = request.json or {}
+        ids = _degree_ids(data)
+        if ids is None:
+            return _invalid_ids()
+
+        session = get_session()
+        major, minor = _load_degree(session, *ids)
+        if major is None:
+            return jsonify({'error': 'Major not found'}), 404
+
+        plan = ScheduleGenerator(session).generate_plan(
+            major,
+            minor,
+            data.get('semester', ''),
+            data.get('credit_load', 'standard'),
+            data.get('completed_courses', [])
+        )
+        return jsonify(plan), 200
+
+    except Exception as e:
+        print(f"Plan generation error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@degrees.route('/cohort-eligibility', methods=['POST'])
+def cohort_eligibility():
+    """
+    Courses each student in a cohort can take next
+
+    Body: {students: [{id, completed_courses}], major_id (optional),
+    minor_id (optional)}. With a major, only its (and the minor's)
+    required courses are considered; otherwise the whole catalog.
+    """
+    try:
+        data = request.json or {}
+        students = data.get('students', [])
+        session = get_session()
+
+        if not students:
+            return jsonify({'error': 'Students are required'}), 400
+
+        course_codes = None
+        if data.get('major_id') not in (None, ''):
+            ids = _degree_ids(data)
+            if ids is None:
+                return _invalid_ids()
+
+            major, minor = _load_degree(session, *ids)
+            if major is None:
+                return jsonify({'error': 'Major not found'}), 404
+
+            courses = list(major.required_courses) + (list(minor.required_courses) if minor else [])
+            course_codes = list(dict.fromkeys(course.code for course in courses))
+
+        results = ScheduleGenerator(session).cohort_eligibility(students, course_codes)
+        return jsonify({'students': results}), 200
+
+    except Exception as e:
+        print(f"Cohort eligibility error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@degrees.route('/courses/<path:course_code>', methods=['GET'])
+def get_course(course_code):
+    """Get details for a specific course"""
+    try:
+        session = get_session()
+        course = session.query(Course).options(*loading_profile('prerequisite_graph')) \
+            .filter(Course.code == course_code).first()
+
+        if course is None:
+            return jsonify({'error': 'Course not found'}), 404
+
+        details = course.to_dict()
+        details['unlocks'] = [c.code for c in course.unlocks]
+        return jsonify(details), 200
+
+    except Exception as e:
+        print(f"Error loading course {course_code}: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -1,15 +1,26 @@
 """
 API Routes for Cheap Stop
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+import json
 import os
-from app.scrapers.product_scraper import scrape_products
+import queue
+import threading
+from app.scrapers.product_scraper import product_cache, scrape_flight
+from app.scrapers.store_locator import store_locator
 from app.utils.route_optimizer import calculate_optimal_route
-from app.utils.gemini_search import enhance_search_query, match_products
+from app.utils.budget_optimizer import optimize_budget
+from app.utils.gemini_search import match_products, get_cache_stats
+from app.utils.product_batch import ProductBatch
+from app.utils.jobs import job_manager
+from app.utils.search_pipeline import SearchPipeline
+from app.utils.trip_planner import plan_trip
 import google.generativeai as genai
 
 api = Blueprint('api', __name__)
 
+search_pipeline = SearchPipeline()
+
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 if GEMINI_API_KEY:
@@ -22,6 +33,18 @@ def health():
     return jsonify({'status': 'healthy'}), 200
 
 
+@api.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Cache hit/miss counters"""
+    return jsonify({
+        'llm': get_cache_stats(),
+        'products': product_cache.stats(),
+        'scrapeCoalescing': scrape_flight.stats(),
+        'stores': store_locator.stats(),
+        'jobs': job_manager.stats()
+    }), 200
+
+
 @api.route('/search-products', methods=['POST'])
 def search_products():
     """
@@ -39,72 +62,169 @@ def search_products():
         # Split query into individual items
         items = [item.strip() for item in query.split(',')]
 
-        # Use Gemini to enhance search queries
-        enhanced_queries = []
-        for item in items:
-            try:
-                enhanced = enhance_search_query(item)
-                enhanced_queries.append(enhanced)
-            except Exception as e:
-                print(f"Error enhancing query with Gemini: {e}")
-                enhanced_queries.append(item)
-
-        # Scrape products from retailers
-        all_products = []
-        for idx, item in enumerate(items):
-            query_to_use = enhanced_queries[idx] if idx < len(enhanced_queries) else item
-            products = scrape_products(query_to_use, user_location)
-            all_products.extend(products)
-
-        # Filter by budget if provided
-        if budget:
-            # Group products by item
-            items_dict = {}
-            for product in all_products:
-                item_key = product.get('search_query', 'unknown')
-                if item_key not in items_dict:
-                    items_dict[item_key] = []
-                items_dict[item_key].append(product)
-
-            # For each item, only include products that fit within budget
-            filtered_products = []
-            for item_key, products in items_dict.items():
-                affordable = [p for p in products if p['price'] <= budget]
-                if affordable:
-                    # Sort by price and take cheapest options
-                    affordable.sort(key=lambda x: x['price'])
-                    filtered_products.extend(affordable[:5])  # Top 5 cheapest per item
-                else:
-                    # If nothing is affordable, include cheapest option anyway
-                    products.sort(key=lambda x: x['price'])
-                    if products:
-                        filtered_products.append(products[0])
-
-            all_products = filtered_products
-
-        # Use Gemini to match and rank products
-        try:
-            matched_products = match_products(items, all_products)
-            return jsonify({'products': matched_products}), 200
-        except Exception as e:
-            print(f"Error matching products with Gemini: {e}")
-            # Fall back to returning all products
-            return jsonify({'products': all_products}), 200
+        # Enhance, scrape and rank every item concurrently, then match
+        return jsonify(_search_items(items, user_location, budget)), 200
 
     except Exception as e:
         print(f"Search error: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+def _search_items(items, user_location=None, budget=None, on_event=None):
+    """
+    Run the search pipeline for a shopping list and rank the combined products
+
+    With a budget, also picks one product per item so the whole list fits
+    it (budgetPlan).
+
+    Returns:
+        Dictionary with products, retailerTimings keyed by item and, with a
+        budget, budgetPlan; products are serialized to dicts here
+    """
+    results = search_pipeline.run(items, user_location, budget, on_event=on_event)
+
+    all_products = ProductBatch.concat([result['products'] for result in results])
+    retailer_timings = {result['item']: result['timings'] for result in results}
+
+    try:
+        all_products = match_products(items, all_products)
+    except Exception as e:
+        print(f"Error matching products with Gemini: {e}")
+
+    response = {'products': all_products.to_dicts(), 'retailerTimings': retailer_timings}
+
+    if budget:
+        response['budgetPlan'] = optimize_budget(
+            {result['item']: result['products'] for result in results}, budget
+        )
+
+    return response
+
+
+def _item_summary(record):
+    """Public fields of a search pipeline record"""
+    return {'index': record['index'], 'item': record['item'], 'query': record['query'],
+            'products': record['products'].to_dicts(), 'timings': record['timings']}
+
+
+@api.route('/search-products/stream', methods=['GET', 'POST'])
+def search_products_stream():
+    """
+    Search for products and stream results as Server-Sent Events
+
+    Emits a 'retailer' event with each retailer's products for each item as
+    they arrive, an 'item' event once an item's products are ranked, and a
+    final 'results' event with the Gemini-ranked ordering of all products.
+    Accepts the same JSON body as /search-products, or query, budget, lat
+    and lng as query parameters for EventSource clients.
+    """
+    if request.method == 'POST':
+        data = request.json or {}
+        query = data.get('query', '')
+        budget = data.get('budget')
+        user_location = data.get('location')
+    else:
+        query = request.args.get('query', '')
+        budget = request.args.get('budget', type=float)
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        user_location = {'lat': lat, 'lng': lng} if lat is not None and lng is not None else None
+
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+
+    items = [item.strip() for item in query.split(',')]
+    events = queue.Queue()
+
+    def run_search():
+        try:
+            results = _search_items(
+                items, user_location, budget,
+                on_event=lambda event, data: events.put((event, data))
+            )
+            events.put(('results', results))
+
+        except Exception as e:
+            print(f"Search error: {e}")
+            events.put(('error', {'error': str(e)}))
+
+        events.put(None)
+
+    threading.Thread(target=run_search, daemon=True).start()
+
+    def generate():
+        while True:
+            message = events.get()
+            if message is None:
+                break
+
+            event, data = message
+            if event == 'item':
+                data = _item_summary(data)
+            elif event == 'retailer':
+                data = dict(data, products=data['products'].to_dicts())
+
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@api.route('/search-jobs', methods=['POST'])
+def submit_search_job():
+    """
+    Submit a product search to run in the background
+
+    Takes the same body as /search-products and returns a job id to poll at
+    /search-jobs/<job_id>. Identical submissions share one job.
+    """
+    data = request.json or {}
+    query = data.get('query', '')
+    budget = data.get('budget')
+    user_location = data.get('location')
+
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+
+    items = [item.strip() for item in query.split(',')]
+    params = {'items': items, 'budget': budget, 'location': user_location}
+
+    def run_search(job):
+        job.set_total(len(items))
+        return _search_items(
+            items, user_location, budget,
+            on_event=lambda event, record: job.add_partial(_item_summary(record)) if event == 'item' else None
+        )
+
+    job, created = job_manager.submit('search', params, run_search)
+    return jsonify({'jobId': job.id, 'status': job.status, 'deduplicated': not created}), 202
+
+
+@api.route('/search-jobs/<job_id>', methods=['GET'])
+def get_search_job(job_id):
+    """
+    Progress, partial results per finished item and, once done, the result
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(job.to_dict()), 200
+
+
 @api.route('/calculate-route', methods=['POST'])
 def calculate_route():
     """
-    Calculate optimal route using A* algorithm
+    Calculate optimal route through the selected products' stores
     """
     try:
         data = request.json
         products = data.get('products', [])
         user_location = data.get('userLocation')
+        time_budget_ms = data.get('timeBudgetMs')
 
         if not products:
             return jsonify({'error': 'Products are required'}), 400
@@ -113,10 +233,44 @@ def calculate_route():
             return jsonify({'error': 'User location is required'}), 400
 
         # Calculate optimal route
-        optimized_route = calculate_optimal_route(products, user_location)
+        optimized_route = calculate_optimal_route(products, user_location, time_budget_ms=time_budget_ms)
 
         return jsonify({'optimizedRoute': optimized_route}), 200
 
     except Exception as e:
         print(f"Route calculation error: {e}")
         return jsonify({'error': str(e)}), 500
+
+
+@api.route('/plan-trip', methods=['POST'])
+def plan_trip_route():
+    """
+    Pick which store to buy each item at and the order to visit them,
+    minimizing total price plus travel cost
+    """
+    try:
+        data = request.json
+        products = data.get('products', [])
+        user_location = data.get('userLocation')
+        cost_per_mile = data.get('costPerMile')
+        time_budget_ms = data.get('timeBudgetMs')
+
+        if not products:
+            return jsonify({'error': 'Products are required'}), 400
+
+        if not user_location:
+            return jsonify({'error': 'User location is required'}), 400
+
+        plan = plan_trip(products, user_location, cost_per_mile, time_budget_ms)
+
+        return jsonify({
+            'selectedProducts': plan['selected_products'],
+            'optimizedRoute': plan['route'],
+            'unavailable': plan['unavailable'],
+            'totals': plan['totals'],
+            'costPerMile': plan['cost_per_mile']
+        }), 200
+
+    except Exception as e:
+        print(f"Trip planning error: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -1,10 +1,14 @@
 """
 Database Setup and Models
 """
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, Table
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, ForeignKey, Table
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship, selectinload
+from sqlalchemy.pool import QueuePool, StaticPool
+from contextlib import contextmanager
 import os
+import threading
 
 Base = declarative_base()
 
@@ -114,15 +118,183 @@ class GenEdRequirement(Base):
             'description': self.description
         }
 
+class CatalogVersion(Base):
+    """Single row counter bumped whenever the course catalog is rewritten"""
+    __tablename__ = 'catalog_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+def get_catalog_version(session):
+    """
+    Current catalog version, 0 before the catalog was first populated
+    """
+    return session.query(CatalogVersion.version).filter_by(id=1).scalar() or 0
+
+
+def bump_catalog_version(session):
+    """
+    Mark the catalog as changed; takes effect when the caller commits
+
+    Processes holding a compiled prerequisite graph rebuild it once they see
+    the new version.
+    """
+    row = session.get(CatalogVersion, 1)
+    if row is None:
+        session.add(CatalogVersion(id=1, version=1))
+    else:
+        row.version += 1
+
+
+# Named eager-loading profiles. Course.to_dict, the degree analyzer and the
+# scheduler read prerequisites_required and unlocks for every course; loading
+# them up front with one SELECT ... IN per relationship keeps a request at a
+# fixed number of queries however large the catalog is
+def _course_graph_options(path=None):
+    if path is None:
+        return [selectinload(Course.prerequisites_required), selectinload(Course.unlocks)]
+    return [path.options(selectinload(Course.prerequisites_required), selectinload(Course.unlocks))]
+
+
+LOAD_PROFILES = {
+    'course': lambda: [selectinload(Course.prerequisites_required)],
+    'prerequisite_graph': lambda: _course_graph_options(),
+    'major': lambda: _course_graph_options(selectinload(Major.required_courses)),
+    'minor': lambda: _course_graph_options(selectinload(Minor.required_courses)),
+}
+
+
+def loading_profile(name):
+    """
+    Loader options for a named profile, e.g. query.options(*loading_profile('major'))
+    """
+    return LOAD_PROFILES[name]()
+
+
+class QueryCounter:
+    """Statements seen by count_queries"""
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Count the SQL statements executed inside the block
+
+    Usage:
+        with count_queries() as queries:
+            session.query(Major).options(*loading_profile('major')).all()
+        print(queries.count)
+    """
+    engine = engine or get_engine()
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
 # Database initialization
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # Seconds before a pooled connection is replaced
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# One session per thread, bound to the shared engine on first use. Flask
+# removes the current thread's session when the app context ends
+_session_factory = sessionmaker()
+db_session = scoped_session(_session_factory)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside a writer; NORMAL sync is safe with WAL
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def _create_engine(db_url):
+    url = make_url(db_url)
+
+    if url.get_backend_name() != 'sqlite':
+        return create_engine(
+            db_url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+
+    if not url.database or url.database == ':memory:':
+        # In-memory databases live in a single connection
+        return create_engine(db_url, poolclass=StaticPool, connect_args={'check_same_thread': False})
+
+    engine = create_engine(
+        db_url,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        connect_args={'check_same_thread': False, 'timeout': 15}
+    )
+    event.listen(engine, 'connect', _set_sqlite_pragmas)
+    return engine
+
+
 def get_engine():
-    db_url = os.getenv('DATABASE_URL', 'sqlite:///collegescrap.db')
-    return create_engine(db_url)
+    """
+    Get the process-wide engine, creating it on first use
+    """
+    global _engine
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                db_url = os.getenv('DATABASE_URL', 'sqlite:///collegescrap.db')
+                _engine = _create_engine(db_url)
+                _session_factory.configure(bind=_engine)
+
+    return _engine
+
 
 def get_session():
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """
+    Get the current thread's session from the shared registry
+    """
+    get_engine()
+    return db_session()
+
+
+def remove_session(exception=None):
+    """
+    Close and discard the current thread's session (Flask teardown hook)
+    """
+    db_session.remove()
+
+
+def dispose_engine():
+    """
+    Close all pooled connections and forget the engine, e.g. after a fork
+    """
+    global _engine
+
+    with _engine_lock:
+        db_session.remove()
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
 
 def init_db():
     engine = get_engine()
@@ -5,7 +5,11 @@ Scrapes course and degree information from Ole Miss catalog
 import requests
 from bs4 import BeautifulSoup
 import re
-from app.models.database import Course, Major, Minor, GenEdRequirement, get_session
+from app.models.database import (
+    Course, Major, Minor, GenEdRequirement, get_session, bump_catalog_version,
+    prerequisites, major_courses, minor_courses
+)
+from app.utils.prereq_graph import invalidate_prerequisite_graph
 
 class OleMissCatalogScraper:
     def __init__(self, base_url="https://catalog.olemiss.edu"):
@@ -130,7 +134,10 @@ class OleMissCatalogScraper:
         db_session = get_session()
 
         try:
-            # Clear existing data
+            # Clear existing data. Bulk deletes skip relationship cascades,
+            # so the association tables are cleared explicitly
+            for table in (prerequisites, major_courses, minor_courses):
+                db_session.execute(table.delete())
             db_session.query(Course).delete()
             db_session.query(Major).delete()
             db_session.query(Minor).delete()
@@ -218,6 +225,8 @@ class OleMissCatalogScraper:
             for req in gened_reqs:
                 db_session.add(req)
 
+            # Tells running servers to rebuild their prerequisite graphs
+            bump_catalog_version(db_session)
             db_session.commit()
 
             print("Database populated with sample data successfully!")
@@ -232,6 +241,8 @@ class OleMissCatalogScraper:
             raise
         finally:
             db_session.close()
+            # Other processes notice the version bump; drop this one's graph now
+            invalidate_prerequisite_graph()
 
 if __name__ == '__main__':
     scraper = OleMissCatalogScraper()
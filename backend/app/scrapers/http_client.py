@@ -0,0 +1,55 @@
+"""
+Shared HTTP client for retailer scrapers
+"""
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connection pool settings
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))  # Number of per-host pools kept alive
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '8'))  # Max open connections per host
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Get the process-wide keep-alive HTTP session
+
+    Connections are reused across requests so repeated searches don't pay a
+    TLS handshake each time. pool_block caps concurrent connections per host
+    at HTTP_POOL_MAXSIZE; extra callers wait for a free connection.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_HOSTS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=True
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+
+                _client = session
+
+    return _client
+
+
+def http_get(url, timeout=None, **kwargs):
+    """
+    GET a URL through the shared client
+    """
+    return get_http_client().get(url, timeout=timeout or HTTP_TIMEOUT, **kwargs)
@@ -1,234 +1,351 @@
 """
 Product scraper for multiple retailers
 """
-import requests
-from bs4 import BeautifulSoup
-import re
+import json
 import os
-import googlemaps
-
-# Initialize Google Maps client
-GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
-gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY) if GOOGLE_MAPS_API_KEY else None
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+from app.scrapers.http_client import http_get
+from app.scrapers.store_locator import store_locator
+from app.utils.cache import LRUCache
+from app.utils.geo import location_tile
+from app.utils.product_batch import Product, ProductBatch
+from app.utils.singleflight import SingleFlight
+
+# Retailer fan-out settings
+RETAILER_MAX_WORKERS = int(os.getenv('RETAILER_MAX_WORKERS', '16'))
+RETAILER_DEADLINE_SECONDS = float(os.getenv('RETAILER_DEADLINE_SECONDS', '8'))
+
+# Result cache settings. Adapters can override cache_ttl and stale_ttl per retailer
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '2000'))  # Max cached (retailer, query, tile) entries
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '300'))  # Seconds results are fresh
+RESULT_CACHE_STALE = float(os.getenv('RESULT_CACHE_STALE', '1800'))  # Extra seconds stale results are served
+RESULT_CACHE_PRECISION = int(os.getenv('RESULT_CACHE_PRECISION', '5'))  # Geohash precision of location tiles
+
+# Shared, bounded pool so concurrent searches can't spawn unbounded threads
+retailer_executor = ThreadPoolExecutor(
+    max_workers=RETAILER_MAX_WORKERS,
+    thread_name_prefix='retailer'
+)
 
 
 def get_store_locations(store_name, user_location, radius_miles=10):
     """
-    Get nearby store locations using Google Maps Places API
+    Get nearby store locations, nearest first
+
+    Served by the shared store locator, which resolves each chain once per
+    location tile and caches the result.
     """
-    if not gmaps or not user_location:
-        # Return default locations if API not configured
-        default_locations = {
-            'Walmart': {'lat': user_location.get('lat', 0) + 0.01, 'lng': user_location.get('lng', 0) + 0.01},
-            'Target': {'lat': user_location.get('lat', 0) + 0.02, 'lng': user_location.get('lng', 0) - 0.01},
-            'Costco': {'lat': user_location.get('lat', 0) - 0.01, 'lng': user_location.get('lng', 0) + 0.02},
-            'Kroger': {'lat': user_location.get('lat', 0) + 0.03, 'lng': user_location.get('lng', 0) + 0.01},
-            'CVS': {'lat': user_location.get('lat', 0) - 0.02, 'lng': user_location.get('lng', 0) - 0.01},
-        }
-        return [default_locations.get(store_name, user_location)]
+    return store_locator.nearest(store_name, user_location, n=3, radius_miles=radius_miles)
 
-    try:
-        places_result = gmaps.places_nearby(
-            location=(user_location['lat'], user_location['lng']),
-            radius=radius_miles * 1609.34,  # Convert miles to meters
-            keyword=store_name,
-            type='store'
-        )
 
-        locations = []
-        for place in places_result.get('results', [])[:3]:  # Get up to 3 nearest locations
-            location = place.get('geometry', {}).get('location', {})
-            locations.append({
-                'lat': location.get('lat'),
-                'lng': location.get('lng'),
-                'name': place.get('name'),
-                'address': place.get('vicinity')
-            })
+class RetailerAdapter:
+    """
+    Base class for a retailer integration
 
-        return locations if locations else [{'lat': user_location['lat'], 'lng': user_location['lng']}]
+    Subclasses implement search(). Adapter classes are registered by type
+    name with register_adapter and instantiated from retailer config entries.
+    """
+    def __init__(self, store, deadline=None, cache_ttl=None, stale_ttl=None, **options):
+        self.store = store
+        self.deadline = deadline if deadline is not None else RETAILER_DEADLINE_SECONDS
+        self.cache_ttl = cache_ttl if cache_ttl is not None else RESULT_CACHE_TTL
+        self.stale_ttl = stale_ttl if stale_ttl is not None else RESULT_CACHE_STALE
+        self.options = options
 
-    except Exception as e:
-        print(f"Error getting store locations: {e}")
-        return [{'lat': user_location['lat'], 'lng': user_location['lng']}]
+    def search(self, query, user_location):
+        """Return a list of product dicts for the query"""
+        raise NotImplementedError
 
+    def __repr__(self):
+        return f"{type(self).__name__}({self.store!r})"
 
-def scrape_walmart(query, user_location):
-    """
-    Scrape Walmart products using their API
-    """
-    products = []
-    try:
-        # Walmart's search API (public endpoint)
-        url = f"https://www.walmart.com/search?q={query.replace(' ', '+')}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
-        response = requests.get(url, headers=headers, timeout=10)
-
-        if response.status_code == 200:
-            # For now, return mock data as scraping Walmart requires more complex setup
-            locations = get_store_locations('Walmart', user_location)
-
-            for i in range(3):
-                products.append({
-                    'name': f"{query} - Walmart Option {i+1}",
-                    'price': 5.99 + (i * 2),
-                    'store': 'Walmart',
-                    'image': 'https://via.placeholder.com/300x300?text=Walmart+Product',
-                    'search_query': query,
-                    'location': locations[min(i, len(locations)-1)] if locations else None
-                })
-
-    except Exception as e:
-        print(f"Error scraping Walmart: {e}")
 
-    return products
+ADAPTER_TYPES = {}
 
 
-def scrape_target(query, user_location):
+def register_adapter(type_name):
     """
-    Scrape Target products
+    Class decorator registering a RetailerAdapter under a config type name
     """
-    products = []
-    try:
-        locations = get_store_locations('Target', user_location)
+    def decorator(cls):
+        ADAPTER_TYPES[type_name] = cls
+        return cls
+    return decorator
+
+
+@register_adapter('sample')
+class SampleRetailerAdapter(RetailerAdapter):
+    """
+    Retailer that returns placeholder listings
 
-        for i in range(3):
+    If search_url is configured the retailer's search page is requested
+    first and listings are only returned when it answers with 200.
+    """
+    def search(self, query, user_location):
+        search_url = self.options.get('search_url')
+        if search_url:
+            # For now, return mock data as scraping the page requires more complex setup
+            response = http_get(search_url.format(query=query.replace(' ', '+')))
+            if response.status_code != 200:
+                return []
+
+        locations = get_store_locations(self.store, user_location)
+
+        count = self.options.get('count', 3)
+        base_price = self.options.get('base_price', 5.99)
+        price_step = self.options.get('price_step', 2)
+        label = self.options.get('label', 'Option')
+
+        products = []
+        for i in range(count):
             products.append({
-                'name': f"{query} - Target Option {i+1}",
-                'price': 6.49 + (i * 1.5),
-                'store': 'Target',
-                'image': 'https://via.placeholder.com/300x300?text=Target+Product',
+                'name': f"{query} - {self.store} {label} {i+1}",
+                'price': base_price + (i * price_step),
+                'store': self.store,
+                'image': f"https://via.placeholder.com/300x300?text={self.store}+Product",
                 'search_query': query,
                 'location': locations[min(i, len(locations)-1)] if locations else None
             })
 
-    except Exception as e:
-        print(f"Error scraping Target: {e}")
+        return products
+
+
+# Default retailer configuration. Point RETAILER_CONFIG_FILE at a JSON list
+# of entries to replace it, and set RETAILERS=walmart,target to enable a subset
+DEFAULT_RETAILER_CONFIG = [
+    {
+        'key': 'walmart',
+        'store': 'Walmart',
+        'type': 'sample',
+        'search_url': 'https://www.walmart.com/search?q={query}',
+        'count': 3,
+        'base_price': 5.99,
+        'price_step': 2
+    },
+    {'key': 'target', 'store': 'Target', 'type': 'sample', 'count': 3, 'base_price': 6.49, 'price_step': 1.5},
+    {'key': 'costco', 'store': 'Costco', 'type': 'sample', 'count': 2, 'base_price': 12.99, 'price_step': 3, 'label': 'Bulk'},
+    {'key': 'kroger', 'store': 'Kroger', 'type': 'sample', 'count': 3, 'base_price': 5.49, 'price_step': 1.8},
+    {'key': 'cvs', 'store': 'CVS', 'type': 'sample', 'count': 2, 'base_price': 7.99, 'price_step': 2.5},
+]
+
+
+def load_retailer_config():
+    """
+    Load retailer configuration from RETAILER_CONFIG_FILE or the defaults
+    """
+    config = DEFAULT_RETAILER_CONFIG
+    config_file = os.getenv('RETAILER_CONFIG_FILE')
 
-    return products
+    if config_file:
+        try:
+            with open(config_file) as f:
+                config = json.load(f)
+        except Exception as e:
+            print(f"Error loading retailer config {config_file}: {e}")
 
+    enabled = os.getenv('RETAILERS')
+    if enabled:
+        keys = {key.strip().lower() for key in enabled.split(',') if key.strip()}
+        config = [entry for entry in config if entry['key'] in keys]
 
-def scrape_costco(query, user_location):
+    return config
+
+
+def build_retailer_adapters(config):
     """
-    Scrape Costco products
+    Instantiate an adapter for each retailer config entry
     """
-    products = []
-    try:
-        locations = get_store_locations('Costco', user_location)
+    adapters = []
+    for entry in config:
+        options = {k: v for k, v in entry.items() if k not in ('key', 'store', 'type')}
+        adapter_cls = ADAPTER_TYPES.get(entry.get('type', 'sample'))
 
-        for i in range(2):
-            products.append({
-                'name': f"{query} - Costco Bulk {i+1}",
-                'price': 12.99 + (i * 3),
-                'store': 'Costco',
-                'image': 'https://via.placeholder.com/300x300?text=Costco+Product',
-                'search_query': query,
-                'location': locations[min(i, len(locations)-1)] if locations else None
-            })
+        if not adapter_cls:
+            print(f"Unknown retailer adapter type for {entry['store']}: {entry.get('type')}")
+            continue
 
-    except Exception as e:
-        print(f"Error scraping Costco: {e}")
+        adapters.append(adapter_cls(entry['store'], **options))
 
-    return products
+    return adapters
 
 
-def scrape_kroger(query, user_location):
+_retailer_adapters = None
+
+
+def get_retailer_adapters():
     """
-    Scrape Kroger products
+    Get the configured retailer adapters, building them on first use
     """
-    products = []
-    try:
-        locations = get_store_locations('Kroger', user_location)
+    global _retailer_adapters
 
-        for i in range(3):
-            products.append({
-                'name': f"{query} - Kroger Option {i+1}",
-                'price': 5.49 + (i * 1.8),
-                'store': 'Kroger',
-                'image': 'https://via.placeholder.com/300x300?text=Kroger+Product',
-                'search_query': query,
-                'location': locations[min(i, len(locations)-1)] if locations else None
-            })
+    if _retailer_adapters is None:
+        _retailer_adapters = build_retailer_adapters(load_retailer_config())
+
+    return _retailer_adapters
 
-    except Exception as e:
-        print(f"Error scraping Kroger: {e}")
 
-    return products
+# Scraped results by (store, normalized query, location tile). Entries are
+# (fetched_at, Product records) and are evicted once past cache_ttl +
+# stale_ttl. Records are immutable, so hits are shared rather than copied
+product_cache = LRUCache(maxsize=RESULT_CACHE_SIZE)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
 
+# Identical in-flight retailer scrapes, by result cache key
+scrape_flight = SingleFlight()
 
-def scrape_cvs(query, user_location):
+
+def _result_cache_key(adapter, query, user_location):
+    normalized = ' '.join(query.lower().split())
+    return (adapter.store, normalized, location_tile(user_location, RESULT_CACHE_PRECISION))
+
+
+def _timed_scrape(adapter, query, user_location, cache_key=None):
     """
-    Scrape CVS products
+    Run a single retailer adapter and measure how long it took
+
+    The adapter's product dicts are converted to Product records once here.
+    Successful results are stored in the product cache under cache_key, even
+    if the caller has stopped waiting for them.
     """
-    products = []
+    started = time.monotonic()
     try:
-        locations = get_store_locations('CVS', user_location)
-
-        for i in range(2):
-            products.append({
-                'name': f"{query} - CVS Option {i+1}",
-                'price': 7.99 + (i * 2.5),
-                'store': 'CVS',
-                'image': 'https://via.placeholder.com/300x300?text=CVS+Product',
-                'search_query': query,
-                'location': locations[min(i, len(locations)-1)] if locations else None
-            })
-
+        products = [Product.from_dict(p) for p in adapter.search(query, user_location)]
+        status = 'ok'
     except Exception as e:
-        print(f"Error scraping CVS: {e}")
+        print(f"Error scraping {adapter.store}: {e}")
+        products = []
+        status = 'error'
 
-    return products
+    if status == 'ok' and cache_key is not None:
+        product_cache.set(cache_key, (time.time(), products), ttl=adapter.cache_ttl + adapter.stale_ttl)
 
+    return products, status, time.monotonic() - started
 
-def calculate_distance(loc1, loc2):
+
+def _refresh_in_background(adapter, query, user_location, cache_key):
     """
-    Calculate distance between two locations in miles
+    Rescrape a stale cache entry on the retailer pool, once per key
     """
-    if not loc1 or not loc2:
-        return 0
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return
+        _refreshing.add(cache_key)
+
+    def refresh():
+        try:
+            _timed_scrape(adapter, query, user_location, cache_key)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(cache_key)
 
-    from math import radians, sin, cos, sqrt, atan2
+    retailer_executor.submit(refresh)
 
-    lat1, lon1 = radians(loc1['lat']), radians(loc1['lng'])
-    lat2, lon2 = radians(loc2['lat']), radians(loc2['lng'])
 
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
+def scrape_products_with_timing(query, user_location=None, deadline=None, on_retailer=None):
+    """
+    Scrape products from all configured retailers concurrently
+
+    Each retailer runs on the shared retailer pool and is given its own
+    deadline. Retailers that miss their deadline are reported as 'timeout'
+    and the products from the others are returned without waiting for them.
+
+    Results are cached per retailer by normalized query and the geohash tile
+    of user_location. Fresh entries are served without scraping ('cached');
+    entries past the retailer's cache_ttl but within its stale_ttl are served
+    immediately while a background rescrape refreshes them ('stale'). Cache
+    misses already being scraped for another search join that scrape.
+
+    Args:
+        query: Search query
+        user_location: User's location {lat, lng} (optional)
+        deadline: Override for the per-retailer deadline in seconds
+        on_retailer: Optional callback(store, batch, timing) called as
+                     each retailer's results arrive
+
+    Returns:
+        Tuple of (ProductBatch sorted by price, per-retailer timing dict)
+    """
+    started = time.monotonic()
 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
+    batches = []
+    timings = {}
 
-    # Earth's radius in miles
-    R = 3959.0
-    distance = R * c
+    def collect(store, records, timing):
+        # Distances from the user are computed per batch, not stored on records
+        batch = ProductBatch.from_records(records, query, user_location)
+        batches.append(batch)
+        timings[store] = timing
 
-    return distance
+        if on_retailer:
+            on_retailer(store, batch, timing)
 
+    pending = {}
+    for adapter in get_retailer_adapters():
+        cache_key = _result_cache_key(adapter, query, user_location)
+        cached = product_cache.get(cache_key)
 
-def scrape_products(query, user_location=None):
-    """
-    Main function to scrape products from all retailers
-    """
-    all_products = []
+        if cached is not None:
+            fetched_at, products = cached
+            age = time.time() - fetched_at
+            status = 'cached' if age < adapter.cache_ttl else 'stale'
+
+            if status == 'stale':
+                _refresh_in_background(adapter, query, user_location, cache_key)
 
-    # Scrape from all retailers
-    all_products.extend(scrape_walmart(query, user_location))
-    all_products.extend(scrape_target(query, user_location))
-    all_products.extend(scrape_costco(query, user_location))
-    all_products.extend(scrape_kroger(query, user_location))
-    all_products.extend(scrape_cvs(query, user_location))
+            collect(adapter.store, products, {'status': status, 'elapsed_ms': 0.0, 'count': len(products)})
+            continue
 
-    # Add distance to each product if user location is provided
-    if user_location:
-        for product in all_products:
-            if product.get('location'):
-                product['distance'] = calculate_distance(user_location, product['location'])
-            else:
-                product['distance'] = 0
+        # Concurrent searches for the same retailer, query and tile share one scrape
+        seconds = deadline if deadline is not None else adapter.deadline
+        future, _ = scrape_flight.submit(
+            cache_key, retailer_executor, _timed_scrape, adapter, query, user_location, cache_key
+        )
+        pending[future] = (adapter.store, cache_key, started + seconds)
+
+    # Take results in arrival order until each retailer is done or past its
+    # own deadline; the total wait is bounded by the slowest deadline
+    while pending:
+        next_deadline = min(deadline_at for _, _, deadline_at in pending.values())
+        done, _ = wait(pending, timeout=max(0, next_deadline - time.monotonic()),
+                       return_when=FIRST_COMPLETED)
+
+        for future in done:
+            store, _, _ = pending.pop(future)
+            try:
+                products, status, elapsed = future.result()
+            except CancelledError:
+                # Another search abandoned the shared scrape before it started
+                products, status, elapsed = [], 'error', time.monotonic() - started
+            collect(store, products, {
+                'status': status,
+                'elapsed_ms': round(elapsed * 1000, 1),
+                'count': len(products)
+            })
+
+        now = time.monotonic()
+        for future, (store, cache_key, deadline_at) in list(pending.items()):
+            if deadline_at <= now and not future.done():
+                scrape_flight.abandon(cache_key, future)
+                del pending[future]
+                collect(store, [], {
+                    'status': 'timeout',
+                    'elapsed_ms': round((now - started) * 1000, 1),
+                    'count': 0
+                })
 
     # Sort by price
-    all_products.sort(key=lambda x: x['price'])
+    return ProductBatch.concat(batches).sort_by_price(), timings
+
+
+def scrape_products(query, user_location=None):
+    """
+    Main function to scrape products from all retailers
 
-    return all_products
+    Returns:
+        List of product dicts sorted by price
+    """
+    products, _ = scrape_products_with_timing(query, user_location)
+    return products.to_dicts()
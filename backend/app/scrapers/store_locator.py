@@ -0,0 +1,231 @@
+"""
+Store locator
+Resolves nearby store locations per chain with Google Maps Places, caching
+results per location tile and answering nearest-store queries from a
+geohash grid index
+"""
+import os
+import threading
+import googlemaps
+from app.utils.cache import LRUCache, SQLiteCache, TieredCache
+from app.utils.geo import (
+    location_tile, geohash_bbox, geohash_encode, geohash_neighbors, haversine_one_to_many
+)
+
+# Initialize Google Maps client
+GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
+gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY) if GOOGLE_MAPS_API_KEY else None
+
+# Store location cache settings
+STORE_CACHE_TTL = int(os.getenv('STORE_CACHE_TTL', str(7 * 24 * 3600)))
+STORE_CACHE_PATH = os.getenv('STORE_CACHE_PATH', 'store_locations.db')
+STORE_TILE_PRECISION = int(os.getenv('STORE_TILE_PRECISION', '5'))  # Tile resolved by one Places query
+STORE_INDEX_PRECISION = int(os.getenv('STORE_INDEX_PRECISION', '5'))  # Grid cell size of the spatial index
+
+# Offsets used for placeholder stores when Google Maps isn't configured
+DEFAULT_STORE_OFFSETS = {
+    'Walmart': (0.01, 0.01),
+    'Target': (0.02, -0.01),
+    'Costco': (-0.01, 0.02),
+    'Kroger': (0.03, 0.01),
+    'CVS': (-0.02, -0.01),
+}
+
+
+class StoreIndex:
+    """
+    Geohash grid of known store locations per chain
+
+    Stores are bucketed by geohash cell; nearest-N queries look in the
+    query's cell and its 8 neighbors and only scan the whole chain when
+    that ring can't prove it holds the N nearest stores.
+    """
+    def __init__(self, precision=STORE_INDEX_PRECISION):
+        self.precision = precision
+        self._cells = {}  # chain -> {cell: [store, ...]}
+        self._seen = {}  # chain -> set of (lat, lng) already indexed
+        self._lock = threading.Lock()
+
+    def add(self, chain, stores):
+        with self._lock:
+            cells = self._cells.setdefault(chain, {})
+            seen = self._seen.setdefault(chain, set())
+
+            for store in stores:
+                key = (round(store['lat'], 6), round(store['lng'], 6))
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                cell = geohash_encode(store['lat'], store['lng'], self.precision)
+                cells.setdefault(cell, []).append(store)
+
+    def nearest(self, chain, lat, lng, n=3, max_miles=None):
+        """
+        Up to n stores of a chain closest to (lat, lng)
+
+        The query's cell and its 8 neighbors answer on their own when their
+        n-th nearest store is no farther than the edge of that ring; otherwise
+        a store outside the ring could be closer and the whole chain is
+        scanned.
+        """
+        cell = geohash_encode(lat, lng, self.precision)
+        with self._lock:
+            cells = self._cells.get(chain, {})
+            candidates = [store for ring_cell in geohash_neighbors(cell) for store in cells.get(ring_cell, [])]
+
+        nearest = self._nearest(candidates, lat, lng, n)
+        if len(nearest) < n or nearest[-1][0] > self._ring_reach(cell, lat, lng):
+            with self._lock:
+                candidates = [store for stores in self._cells.get(chain, {}).values() for store in stores]
+            nearest = self._nearest(candidates, lat, lng, n)
+
+        return [store for distance, store in nearest if max_miles is None or distance <= max_miles]
+
+    def _nearest(self, candidates, lat, lng, n):
+        """Up to n (distance, store) pairs from candidates, nearest first"""
+        if not candidates:
+            return []
+
+        distances = haversine_one_to_many(
+            lat, lng, [s['lat'] for s in candidates], [s['lng'] for s in candidates]
+        )
+        return [(float(distances[idx]), candidates[idx]) for idx in distances.argsort()[:n]]
+
+    def _ring_reach(self, cell, lat, lng):
+        """Miles from (lat, lng) to the nearest edge of the ring around cell"""
+        min_lat, max_lat, min_lng, max_lng = geohash_bbox(cell)
+        lat_step = max_lat - min_lat
+        lng_step = max_lng - min_lng
+
+        edges = haversine_one_to_many(
+            lat, lng,
+            [min_lat - lat_step, max_lat + lat_step, lat, lat],
+            [lng, lng, min_lng - lng_step, max_lng + lng_step]
+        )
+        return float(edges.min())
+
+
+class StoreLocator:
+    """
+    Nearest-store lookups for retailer chains
+
+    Each (chain, location tile) pair is resolved with at most one Places
+    query; the result is cached in memory and on disk with a TTL and fed into
+    the spatial index that answers nearest-N queries without a network call.
+    """
+    def __init__(self, client=None, cache=None, index=None, tile_precision=STORE_TILE_PRECISION):
+        self.client = client
+        self.cache = cache if cache is not None else TieredCache(LRUCache(maxsize=4096, ttl=STORE_CACHE_TTL))
+        self.index = index if index is not None else StoreIndex()
+        self.tile_precision = tile_precision
+        self._indexed = set()  # Tile keys whose stores are in the index
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def nearest(self, chain, user_location, n=3, radius_miles=10):
+        """
+        Get up to n nearby stores of a chain
+
+        Args:
+            chain: Store chain name (e.g., "Walmart")
+            user_location: User's location {lat, lng}
+            n: Number of stores to return
+            radius_miles: Search radius
+
+        Returns:
+            List of store locations {lat, lng, name, address}, nearest first
+        """
+        if not self.client or not user_location:
+            return [self._default_location(chain, user_location)]
+
+        lat, lng = user_location['lat'], user_location['lng']
+
+        if not self._resolve(chain, user_location, radius_miles):
+            return [{'lat': lat, 'lng': lng}]
+
+        stores = self.index.nearest(chain, lat, lng, n=n, max_miles=radius_miles)
+        return stores if stores else [{'lat': lat, 'lng': lng}]
+
+    def _resolve(self, chain, user_location, radius_miles):
+        """
+        Make sure the chain's stores around this tile are in the index
+
+        Returns False if the lookup failed and nothing is known for the tile.
+        """
+        key = f"{chain}|{location_tile(user_location, self.tile_precision)}"
+
+        if key in self._indexed and self.cache.get(key) is not None:
+            return True
+
+        # Only one thread per (chain, tile) goes to the network
+        with self._locks_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        try:
+            with lock:
+                stores = self.cache.get(key)
+                if stores is None:
+                    stores = self._places_lookup(chain, user_location, radius_miles)
+                    if stores is None:
+                        return False
+                    self.cache.set(key, stores)
+
+                # Disk hits from an earlier process also need indexing
+                self.index.add(chain, stores)
+                self._indexed.add(key)
+        finally:
+            with self._locks_lock:
+                self._locks.pop(key, None)
+
+        return True
+
+    def _places_lookup(self, chain, user_location, radius_miles):
+        try:
+            places_result = self.client.places_nearby(
+                location=(user_location['lat'], user_location['lng']),
+                radius=radius_miles * 1609.34,  # Convert miles to meters
+                keyword=chain,
+                type='store'
+            )
+        except Exception as e:
+            print(f"Error getting store locations: {e}")
+            return None
+
+        stores = []
+        for place in places_result.get('results', []):
+            location = place.get('geometry', {}).get('location', {})
+            if location.get('lat') is None or location.get('lng') is None:
+                continue
+
+            stores.append({
+                'lat': location.get('lat'),
+                'lng': location.get('lng'),
+                'name': place.get('name'),
+                'address': place.get('vicinity')
+            })
+
+        return stores
+
+    def _default_location(self, chain, user_location):
+        # Return default locations if API not configured
+        dlat, dlng = DEFAULT_STORE_OFFSETS.get(chain, (0, 0))
+        return {'lat': user_location.get('lat', 0) + dlat, 'lng': user_location.get('lng', 0) + dlng}
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def _build_store_locator():
+    disk = None
+    if gmaps and STORE_CACHE_PATH:
+        try:
+            disk = SQLiteCache(STORE_CACHE_PATH, table='store_locations', ttl=STORE_CACHE_TTL)
+        except Exception as e:
+            print(f"Error opening store cache {STORE_CACHE_PATH}, using memory only: {e}")
+
+    cache = TieredCache(LRUCache(maxsize=4096, ttl=STORE_CACHE_TTL), disk)
+    return StoreLocator(client=gmaps, cache=cache)
+
+
+store_locator = _build_store_locator()
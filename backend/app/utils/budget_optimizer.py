@@ -0,0 +1,169 @@
+"""
+Budget optimizer
+Chooses one product per shopping list item so the whole basket fits a total
+budget, returning the cheapest basket and the next cheapest alternatives
+"""
+import heapq
+import os
+from app.utils.product_batch import ProductBatch
+
+# Budget optimizer settings
+BUDGET_OPTIONS_PER_ITEM = int(os.getenv('BUDGET_OPTIONS_PER_ITEM', '10'))  # Cheapest candidates kept per item
+BUDGET_ALTERNATIVES = int(os.getenv('BUDGET_ALTERNATIVES', '3'))
+
+
+def _distance(product):
+    """Distance of a product, or infinity when it is unknown"""
+    distance = product.get('distance')
+    return float('inf') if distance is None else distance
+
+
+def pareto_options(products, limit=BUDGET_OPTIONS_PER_ITEM):
+    """
+    Non-dominated choices for one item, cheapest first
+
+    A product is dominated when another is no more expensive and no farther
+    away; swapping it in could never improve a basket. A missing distance is
+    unknown, not zero: such a product is only kept when nothing is cheaper,
+    and it never hides a pricier product whose distance is known. Only the
+    `limit` cheapest products are considered, picked with a heap instead of
+    a full sort.
+
+    Args:
+        products: ProductBatch or list of product dicts
+    """
+    if isinstance(products, ProductBatch):
+        # Only the chosen few are turned into dicts
+        products = products.top_k(limit).to_dicts()
+
+    cheapest = heapq.nsmallest(
+        limit, (p for p in products if p.get('price') is not None),
+        key=lambda p: (p['price'], _distance(p))
+    )
+
+    options = []
+    best_distance = float('inf')
+    for product in cheapest:
+        distance = _distance(product)
+        if not options or distance < best_distance:
+            options.append(product)
+            best_distance = distance
+
+    return options
+
+
+class BudgetOptimizer:
+    """
+    Multiple-choice knapsack over a shopping list
+
+    Every item must get exactly one product and the total price must stay
+    within the budget. Each item's choices are pruned to its price/distance
+    Pareto front, then baskets are enumerated in increasing total price with
+    a heap: a basket's successors each move one item to its next pricier
+    option, only at or after the last item moved, so every basket is
+    generated once. The first basket popped is the cheapest; enumeration
+    stops at the budget or after the requested number of alternatives.
+    """
+    def __init__(self, item_products, budget=None):
+        """
+        Args:
+            item_products: Dictionary of item -> candidate products
+            budget: Total budget for the basket (optional)
+        """
+        self.budget = budget
+        self.items = []
+        self.options = []
+        self.unavailable = []
+
+        for item, products in item_products.items():
+            options = pareto_options(products)
+            if options:
+                self.items.append(item)
+                self.options.append(options)
+            else:
+                self.unavailable.append(item)
+
+    def baskets(self, count):
+        """
+        Up to count baskets within budget, cheapest first
+
+        Returns:
+            List of index tuples, one option index per item
+        """
+        if not self.items:
+            return []
+
+        start = tuple(0 for _ in self.items)
+        heap = [(self._price(start), start, 0)]
+        found = []
+
+        while heap and len(found) < count:
+            price, choice, pivot = heapq.heappop(heap)
+            if self.budget is not None and price > self.budget + 1e-9:
+                break
+            found.append(choice)
+
+            for position in range(pivot, len(choice)):
+                if choice[position] + 1 < len(self.options[position]):
+                    successor = choice[:position] + (choice[position] + 1,) + choice[position + 1:]
+                    step = self.options[position][successor[position]]['price'] - \
+                        self.options[position][choice[position]]['price']
+                    heapq.heappush(heap, (price + step, successor, position))
+
+        return found
+
+    def optimize(self, alternatives=BUDGET_ALTERNATIVES):
+        """
+        Cheapest basket within budget plus near alternatives
+
+        Returns:
+            Dictionary with feasible, basket, alternatives, unavailable and
+            budget. If even the cheapest basket is over budget, basket is
+            that cheapest basket and feasible is False.
+        """
+        found = self.baskets(alternatives + 1)
+        feasible = bool(found)
+
+        if not found and self.items:
+            found = [tuple(0 for _ in self.items)]
+
+        baskets = [self._basket(choice) for choice in found]
+
+        return {
+            'feasible': feasible,
+            'basket': baskets[0] if baskets else None,
+            'alternatives': baskets[1:],
+            'unavailable': self.unavailable,
+            'budget': self.budget
+        }
+
+    def _price(self, choice):
+        return sum(self.options[i][j]['price'] for i, j in enumerate(choice))
+
+    def _basket(self, choice):
+        products = [self.options[i][j] for i, j in enumerate(choice)]
+        total = sum(p['price'] for p in products)
+        # Unknown when any product has no distance
+        distance = sum(_distance(p) for p in products)
+
+        return {
+            'products': products,
+            'total_price': round(total, 2),
+            'total_distance': round(distance, 2) if distance != float('inf') else None,
+            'remaining_budget': round(self.budget - total, 2) if self.budget is not None else None
+        }
+
+
+def optimize_budget(item_products, budget=None, alternatives=BUDGET_ALTERNATIVES):
+    """
+    Pick one product per item so the basket fits the budget
+
+    Args:
+        item_products: Dictionary of item -> candidate products
+        budget: Total budget for the basket (optional)
+        alternatives: Number of next-cheapest baskets to return
+
+    Returns:
+        Dictionary with feasible, basket, alternatives, unavailable and budget
+    """
+    return BudgetOptimizer(item_products, budget).optimize(alternatives)
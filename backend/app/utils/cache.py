@@ -0,0 +1,230 @@
+"""
+Caching helpers
+In-process LRU with TTL, a SQLite-backed disk tier, and a two-tier cache
+combining them
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with optional per-entry TTL
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+
+            if entry is _MISSING or (entry[0] is not None and entry[0] <= time.time()):
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+class SQLiteCache:
+    """
+    Disk cache of JSON-serializable values with TTL, stored in SQLite
+
+    Each thread gets its own connection. WAL mode and a busy timeout let
+    several Flask worker processes share one cache file. Expired rows are
+    deleted when a read finds them and in bulk every purge_every writes, so
+    the file does not grow without bound.
+    """
+    def __init__(self, path, table='cache', ttl=86400, purge_every=256):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_entry(self, key):
+        """(value, expires_at) for a live key, or None"""
+        try:
+            row = self._connect().execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading cache {self.path}: {e}")
+            row = None
+
+        expired = row is not None and row[1] <= time.time()
+        if expired:
+            self._delete_expired(key)
+
+        with self._lock:
+            if row is None or expired:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return json.loads(row[0]), row[1]
+
+    def _delete_expired(self, key):
+        try:
+            conn = self._connect()
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ? AND expires_at <= ?", (key, time.time()))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing cache {self.path}: {e}")
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+
+        try:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing cache {self.path}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self.purge_every and self._writes % self.purge_every == 0
+
+        if due:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """Delete expired rows, returning how many were removed"""
+        try:
+            conn = self._connect()
+            cursor = conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error purging cache {self.path}: {e}")
+            return 0
+
+        with self._lock:
+            self.purged += cursor.rowcount
+        return cursor.rowcount
+
+    def stats(self):
+        return {'path': self.path, 'hits': self.hits, 'misses': self.misses, 'purged': self.purged}
+
+
+class TieredCache:
+    """
+    Memory-then-disk cache
+
+    Lookups check the in-process LRU first, then the disk tier, promoting
+    disk hits into memory for no longer than they have left on disk. Writes
+    go to both tiers.
+    """
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+
+        if value is _MISSING and self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                remaining = expires_at - time.time()
+                if self.memory.ttl:
+                    remaining = min(remaining, self.memory.ttl)
+                if remaining > 0:
+                    self.memory.set(key, value, ttl=remaining)
+
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk is not None else None
+        }
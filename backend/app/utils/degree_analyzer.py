@@ -3,6 +3,7 @@ Degree Requirement Analyzer
 Analyzes and calculates degree requirements for students
 """
 from app.models.database import GenEdRequirement
+from app.utils.prereq_graph import get_prerequisite_graph
 
 class DegreeAnalyzer:
     def __init__(self, session):
@@ -68,13 +69,18 @@ class DegreeAnalyzer:
     def _analyze_prerequisite_chains(self, courses):
         """Identify important prerequisite chains"""
         chains = []
+        graph = get_prerequisite_graph(self.session)
 
         for course in courses:
+            idx = graph.index_of_code.get(course.code)
+            if idx is None:
+                continue
+
             # Count how many courses this course unlocks
-            unlocked_count = len(course.unlocks)
+            unlocked_count = int(graph.unlock_counts[idx])
 
             # Count how many prerequisites this course needs
-            prereq_count = len(course.prerequisites_required)
+            prereq_count = int(graph.prereq_counts[idx])
 
             if unlocked_count >= 3 or prereq_count >= 3:
                 chains.append({
@@ -82,7 +88,7 @@ class DegreeAnalyzer:
                     'name': course.name,
                     'unlocks': unlocked_count,
                     'requires': prereq_count,
-                    'prerequisites': [p.code for p in course.prerequisites_required]
+                    'prerequisites': [graph.codes[p] for p in graph.prerequisites_of(idx).tolist()]
                 })
 
         # Sort by importance (courses that unlock the most)
@@ -1,14 +1,134 @@
 """
 Gemini AI integration for intelligent product search and matching
 """
+import hashlib
+import json
 import os
+import re
+import threading
+import numpy as np
 import google.generativeai as genai
+from app.utils.cache import LRUCache, SQLiteCache, TieredCache
+from app.utils.product_batch import take_products
+from app.utils.ranker import rank_products, token_coverage_matrix
+from app.utils.singleflight import SingleFlight
 
 # Configure Gemini
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-pro')
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# Response cache settings. Set LLM_CACHE_PATH to an empty string to keep
+# the cache in memory only
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '2048'))
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '86400'))
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'llm_cache.db')
+
+# Number of top local matches Gemini may rerank; 0 keeps matching fully local
+MATCH_RERANK_TOP_K = int(os.getenv('MATCH_RERANK_TOP_K', '0'))
+
+# Batch matching thresholds on the local token coverage score (0 to 1)
+MATCH_ACCEPT_SCORE = float(os.getenv('MATCH_ACCEPT_SCORE', '1.0'))  # Match without asking Gemini
+MATCH_REJECT_SCORE = float(os.getenv('MATCH_REJECT_SCORE', '0.0'))  # No match without asking Gemini
+MATCH_FALLBACK_SCORE = float(os.getenv('MATCH_FALLBACK_SCORE', '0.5'))  # Cutoff when Gemini can't decide
+MATCH_LLM_MAX_PAIRS = int(os.getenv('MATCH_LLM_MAX_PAIRS', '200'))  # Ambiguous pairs per Gemini request
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _build_llm_cache():
+    disk = None
+    if LLM_CACHE_PATH and GEMINI_API_KEY:
+        try:
+            disk = SQLiteCache(LLM_CACHE_PATH, table='llm_responses', ttl=LLM_CACHE_TTL)
+        except Exception as e:
+            print(f"Error opening LLM cache {LLM_CACHE_PATH}, using memory only: {e}")
+
+    return TieredCache(LRUCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL), disk)
+
+
+llm_cache = _build_llm_cache()
+
+# Identical prompts in flight at the same time share one Gemini call
+llm_flight = SingleFlight()
+
+
+def get_model():
+    """
+    Get the shared Gemini model handle, creating it on first use
+    """
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = genai.GenerativeModel(GEMINI_MODEL)
+
+    return _model
+
+
+def _cache_key(prompt):
+    """
+    Cache key for a prompt: model name plus the prompt with case and
+    whitespace normalized, so "Notebooks" and "notebooks " share an entry
+    """
+    normalized = re.sub(r'\s+', ' ', prompt).strip().lower()
+    return hashlib.sha256(f"{GEMINI_MODEL}\n{normalized}".encode('utf-8')).hexdigest()
+
+
+def generate_text(prompt):
+    """
+    Send a prompt to Gemini and return the response text
+
+    Responses are cached by normalized prompt and model name, so repeated
+    prompts skip the LLM entirely, and concurrent identical prompts wait on
+    one in-flight call. Errors propagate to every waiter and are not cached.
+    """
+    key = _cache_key(prompt)
+
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    return llm_flight.do(key, _generate_uncached, key, prompt)
+
+
+def _generate_uncached(key, prompt):
+    # Another caller may have filled the cache while we waited for the flight
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    response = get_model().generate_content(prompt)
+    text = response.text
+    llm_cache.set(key, text)
+
+    return text
+
+
+def get_cache_stats():
+    """
+    Hit/miss counters for the LLM response cache and coalesced calls
+    """
+    stats = llm_cache.stats()
+    stats['coalescing'] = llm_flight.stats()
+    return stats
+
+
+def _clean_enhanced_query(enhanced, query):
+    """
+    Return the enhanced query, or the original if the response is unusable
+    """
+    enhanced = (enhanced or '').strip()
+
+    # If response is too long or doesn't make sense, return original
+    if len(enhanced.split()) > 15 or not enhanced:
+        return query
+
+    return enhanced
+
 
 def enhance_search_query(query):
     """
@@ -24,8 +144,6 @@ def enhance_search_query(query):
         return query
 
     try:
-        model = genai.GenerativeModel('gemini-pro')
-
         prompt = f"""You are a shopping assistant. Enhance this product search query to include relevant variations and brand names.
 
 User query: "{query}"
@@ -37,40 +155,115 @@ Provide a single enhanced search query (max 10 words) that includes:
 
 Output only the enhanced query, nothing else."""
 
-        response = model.generate_content(prompt)
-        enhanced = response.text.strip()
-
-        # If response is too long or doesn't make sense, return original
-        if len(enhanced.split()) > 15 or not enhanced:
-            return query
-
-        return enhanced
+        return _clean_enhanced_query(generate_text(prompt), query)
 
     except Exception as e:
         print(f"Error enhancing query with Gemini: {e}")
         return query
 
 
+def enhance_search_queries(queries):
+    """
+    Use Gemini to enhance a whole shopping list in a single request
+
+    Args:
+        queries: List of user search queries (e.g., ["diapers", "soda"])
+
+    Returns:
+        List of enhanced queries in the same order. Any item Gemini doesn't
+        answer usefully keeps its original text.
+    """
+    queries = list(queries)
+    if not GEMINI_API_KEY or not queries:
+        return queries
+
+    try:
+        numbered = [f"{idx}. {query}" for idx, query in enumerate(queries)]
+
+        prompt = f"""You are a shopping assistant. Enhance each of these product search queries to include relevant variations and brand names.
+
+User queries:
+{chr(10).join(numbered)}
+
+For each query provide a single enhanced search query (max 10 words) that includes:
+- Common brand names
+- Product variations
+- Key specifications
+
+Output only a JSON array of {len(queries)} strings, one enhanced query per input in the same order, nothing else."""
+
+        enhanced = _parse_json_list(generate_text(prompt))
+
+        return [
+            _clean_enhanced_query(enhanced[idx] if idx < len(enhanced) and isinstance(enhanced[idx], str) else '', query)
+            for idx, query in enumerate(queries)
+        ]
+
+    except Exception as e:
+        print(f"Error enhancing queries with Gemini: {e}")
+        return queries
+
+
+def _parse_json_list(text):
+    """
+    Pull a JSON array out of a model response, tolerating code fences
+    """
+    text = (text or '').strip()
+    start, end = text.find('['), text.rfind(']')
+    if start == -1 or end < start:
+        return []
+
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except ValueError:
+        return []
+
+    return parsed if isinstance(parsed, list) else []
+
+
 def match_products(search_queries, products):
     """
-    Use Gemini to intelligently match and rank products based on search queries
+    Match and rank products based on search queries
+
+    Products are ranked locally with BM25 over their names, with no limit
+    on how many are considered. When MATCH_RERANK_TOP_K is set and Gemini
+    is configured, Gemini reorders just the top K matches.
 
     Args:
         search_queries: List of user's search queries
-        products: List of scraped products
+        products: ProductBatch or list of scraped product dicts
 
     Returns:
-        Filtered and ranked list of products
+        Ranked products, of the same type as products
     """
-    if not GEMINI_API_KEY or not products:
+    if not len(products):
         return products
 
-    try:
-        model = genai.GenerativeModel('gemini-pro')
+    ranked, scores = rank_products(search_queries, products)
+
+    top_k = min(MATCH_RERANK_TOP_K, int((scores > 0).sum()))
+    if not GEMINI_API_KEY or top_k < 2:
+        return ranked
 
+    order = rerank_order(search_queries, [ranked[idx] for idx in range(top_k)])
+    order += list(range(top_k, len(ranked)))
+    return take_products(ranked, order)
+
+
+def rerank_order(search_queries, products):
+    """
+    Use Gemini to reorder a short list of product dicts by relevance
+
+    Products Gemini leaves out keep their order after the ones it ranked.
+    Returns the original order on any error.
+
+    Returns:
+        List of indices into products, most relevant first
+    """
+    try:
         # Create a concise product summary for Gemini
         product_summary = []
-        for idx, product in enumerate(products[:50]):  # Limit to first 50 to avoid token limits
+        for idx, product in enumerate(products):
             product_summary.append(f"{idx}. {product['name']} - ${product['price']} at {product['store']}")
 
         prompt = f"""You are a shopping assistant. Match these products to the user's search.
@@ -85,65 +278,107 @@ Task: Return a comma-separated list of product indices (0-{len(product_summary)-
 Output format: Just the numbers separated by commas (e.g., "5,12,3,18")
 """
 
-        response = model.generate_content(prompt)
-        result = response.text.strip()
+        result = generate_text(prompt).strip()
+        indices = [int(x.strip()) for x in result.split(',') if x.strip().isdigit()]
 
-        # Parse the result
-        try:
-            indices = [int(x.strip()) for x in result.split(',') if x.strip().isdigit()]
-
-            # Reorder products based on Gemini's ranking
-            matched_products = []
-            for idx in indices:
-                if 0 <= idx < len(products):
-                    matched_products.append(products[idx])
+        # Reorder products based on Gemini's ranking
+        order = []
+        for idx in indices:
+            if 0 <= idx < len(products) and idx not in order:
+                order.append(idx)
 
-            # Add any unmatched products at the end
-            for idx, product in enumerate(products):
-                if idx not in indices:
-                    matched_products.append(product)
-
-            return matched_products if matched_products else products
-
-        except Exception as e:
-            print(f"Error parsing Gemini response: {e}")
-            return products
+        # Add any unranked products at the end
+        return order + [idx for idx in range(len(products)) if idx not in order]
 
     except Exception as e:
-        print(f"Error matching products with Gemini: {e}")
-        return products
+        print(f"Error reranking products with Gemini: {e}")
+        return list(range(len(products)))
 
 
-def is_product_match(product_name, query):
+def match_matrix(product_names, queries):
     """
-    Use Gemini to determine if a product matches the search query
+    Decide which products match which queries in one batch
+
+    Pairs are scored locally by the share of query tokens found in the
+    product name. Pairs at or above MATCH_ACCEPT_SCORE match, pairs at or
+    below MATCH_REJECT_SCORE don't, and only the ambiguous pairs in between
+    go to Gemini, all in one request of up to MATCH_LLM_MAX_PAIRS pairs.
+    Pairs Gemini doesn't answer fall back to MATCH_FALLBACK_SCORE.
 
     Args:
-        product_name: Name of the product
-        query: User's search query
+        product_names: List of product names
+        queries: List of search queries
 
     Returns:
-        Boolean indicating if it's a match
+        Tuple of (products x queries boolean match array, local score array)
     """
-    if not GEMINI_API_KEY:
-        # Fallback to simple string matching
-        return query.lower() in product_name.lower()
+    scores = token_coverage_matrix(product_names, queries)
+    matches = scores >= MATCH_ACCEPT_SCORE
 
-    try:
-        model = genai.GenerativeModel('gemini-pro')
+    ambiguous = np.argwhere((scores > MATCH_REJECT_SCORE) & ~matches)
+    if not len(ambiguous):
+        return matches, scores
+
+    # Resolve everything locally first; Gemini overrides what it answers
+    for i, j in ambiguous:
+        matches[i, j] = scores[i, j] >= MATCH_FALLBACK_SCORE
+
+    if GEMINI_API_KEY:
+        # Most uncertain pairs first, in case there are more than fit in one request
+        closeness = np.abs(scores[ambiguous[:, 0], ambiguous[:, 1]] - MATCH_FALLBACK_SCORE)
+        pairs = ambiguous[np.argsort(closeness, kind='stable')][:MATCH_LLM_MAX_PAIRS]
 
-        prompt = f"""Does this product match what the user is searching for?
+        answers = _match_pairs_with_gemini(
+            [(product_names[i], queries[j]) for i, j in pairs]
+        )
+        for (i, j), answer in zip(pairs, answers):
+            if answer is not None:
+                matches[i, j] = answer
+
+    return matches, scores
+
+
+def _match_pairs_with_gemini(pairs):
+    """
+    Ask Gemini about many (product name, query) pairs in one request
+
+    Returns:
+        List with True/False per pair, or None where Gemini gave no answer
+    """
+    try:
+        numbered = [f'{idx}. Search: "{query}" | Product: "{name}"' for idx, (name, query) in enumerate(pairs)]
 
-User search: "{query}"
-Product name: "{product_name}"
+        prompt = f"""For each numbered pair, does the product match what the user is searching for?
 
-Answer only "YES" or "NO"."""
+{chr(10).join(numbered)}
 
-        response = model.generate_content(prompt)
-        result = response.text.strip().upper()
+Output only a JSON array of {len(pairs)} booleans (true or false), one per pair in the same order, nothing else."""
 
-        return 'YES' in result
+        answers = _parse_json_list(generate_text(prompt))
 
     except Exception as e:
-        print(f"Error checking product match: {e}")
-        return query.lower() in product_name.lower()
+        print(f"Error checking product matches: {e}")
+        answers = []
+
+    return [
+        answers[idx] if idx < len(answers) and isinstance(answers[idx], bool) else None
+        for idx in range(len(pairs))
+    ]
+
+
+def is_product_match(product_name, query):
+    """
+    Determine if a product matches the search query
+
+    Single-pair form of match_matrix; filter many products with
+    match_matrix directly so ambiguous pairs share one Gemini call.
+
+    Args:
+        product_name: Name of the product
+        query: User's search query
+
+    Returns:
+        Boolean indicating if it's a match
+    """
+    matches, _ = match_matrix([product_name], [query])
+    return bool(matches[0, 0])
@@ -0,0 +1,155 @@
+"""
+Geographic helpers
+Geohash tiles for bucketing nearby locations and vectorized great circle
+distances shared by the scrapers and the route optimizer
+"""
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959.0
+
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat, lng, precision=5):
+    """
+    Encode a coordinate as a geohash string
+
+    Precision 5 cells are roughly 4.9km x 4.9km, precision 6 roughly
+    1.2km x 0.6km.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits = bits << 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def location_tile(location, precision=5):
+    """
+    Geohash tile for a {lat, lng} location, or None without a location
+    """
+    if not location or location.get('lat') is None or location.get('lng') is None:
+        return None
+
+    return geohash_encode(float(location['lat']), float(location['lng']), precision)
+
+
+def geohash_bbox(geohash):
+    """
+    Bounding box of a geohash cell as (min_lat, max_lat, min_lng, max_lng)
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = _GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def geohash_neighbors(geohash):
+    """
+    The cell itself plus its 8 surrounding cells at the same precision
+    """
+    min_lat, max_lat, min_lng, max_lng = geohash_bbox(geohash)
+    lat_step = max_lat - min_lat
+    lng_step = max_lng - min_lng
+    center_lat = (min_lat + max_lat) / 2
+    center_lng = (min_lng + max_lng) / 2
+
+    cells = []
+    for dlat in (-1, 0, 1):
+        for dlng in (-1, 0, 1):
+            lat = center_lat + dlat * lat_step
+            if not -90 <= lat <= 90:
+                continue
+            lng = (center_lng + dlng * lng_step + 180) % 360 - 180
+            cell = geohash_encode(lat, lng, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+
+    return cells
+
+
+def location_arrays(locations):
+    """
+    Latitude and longitude arrays (degrees) for a list of {lat, lng} dicts
+    """
+    lats = np.fromiter((loc['lat'] for loc in locations), dtype=float, count=len(locations))
+    lngs = np.fromiter((loc['lng'] for loc in locations), dtype=float, count=len(locations))
+    return lats, lngs
+
+
+def _haversine(lat1, lng1, lat2, lng2):
+    """Broadcasting haversine over radian arrays"""
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return EARTH_RADIUS_MILES * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_one_to_many(lat, lng, lats, lngs):
+    """
+    Distances in miles from one point to every point in lats/lngs
+    """
+    return _haversine(
+        np.radians(lat), np.radians(lng),
+        np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lngs, dtype=float))
+    )
+
+
+def haversine_matrix(lats, lngs, other_lats=None, other_lngs=None):
+    """
+    Matrix of distances in miles between two point sets
+
+    With only one point set, returns its N x N pairwise matrix.
+    """
+    if other_lats is None:
+        other_lats, other_lngs = lats, lngs
+
+    lat1 = np.radians(np.asarray(lats, dtype=float))[:, None]
+    lng1 = np.radians(np.asarray(lngs, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(other_lats, dtype=float))[None, :]
+    lng2 = np.radians(np.asarray(other_lngs, dtype=float))[None, :]
+
+    return _haversine(lat1, lng1, lat2, lng2)
+
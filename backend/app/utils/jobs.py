@@ -0,0 +1,180 @@
+"""
+Background jobs
+Runs long searches on a worker pool so clients can submit a request, get a
+job id back right away and poll for progress and partial results
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Job settings
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', '900'))  # Seconds finished jobs are kept
+JOB_MAX_JOBS = int(os.getenv('JOB_MAX_JOBS', '256'))
+
+
+def request_hash(kind, params):
+    """Stable hash of a job request, used to deduplicate submissions"""
+    canonical = json.dumps({'kind': kind, 'params': params}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class Job:
+    """
+    State of one background job
+
+    Handlers report progress with set_total(), add_partial() and advance();
+    the manager records the final result or error with finish(). A job
+    counts as finished once finished_at is set, and finish() sets it
+    together with the result and status under the job lock.
+    """
+    def __init__(self, key, kind, params):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.kind = kind
+        self.params = params
+        self.status = 'queued'
+        self.total = 0
+        self.completed = 0
+        self.partial = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def set_total(self, total):
+        with self._lock:
+            self.total = total
+
+    def add_partial(self, partial):
+        with self._lock:
+            self.partial.append(partial)
+            self.completed += 1
+
+    def advance(self, steps=1):
+        with self._lock:
+            self.completed += steps
+
+    def start(self):
+        with self._lock:
+            self.status = 'running'
+
+    def finish(self, result=None, error=None):
+        """Record the outcome; error is a message, or None on success"""
+        with self._lock:
+            self.finished_at = time.time()
+            self.result = result
+            self.error = error
+            self.status = 'done' if error is None else 'error'
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def to_dict(self):
+        """Snapshot of the job for API responses"""
+        with self._lock:
+            return {
+                'jobId': self.id,
+                'status': self.status,
+                'progress': {'completed': self.completed, 'total': self.total},
+                'partialResults': list(self.partial),
+                'result': self.result,
+                'error': self.error
+            }
+
+
+class JobManager:
+    """
+    Worker pool plus a registry of submitted jobs
+
+    Identical submissions (same kind and params) share one job while it is
+    queued, running or finished within JOB_RESULT_TTL. Failed jobs are not
+    shared, so resubmitting retries. Finished jobs are evicted after the
+    TTL, and the oldest finished jobs go first once JOB_MAX_JOBS is reached.
+    """
+    def __init__(self, workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL, max_jobs=JOB_MAX_JOBS):
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}  # job id -> Job
+        self._by_key = {}  # request hash -> job id
+        self._lock = threading.Lock()
+
+    def submit(self, kind, params, handler):
+        """
+        Submit a job, or join an identical one already known
+
+        Args:
+            kind: Job type name, part of the deduplication key
+            params: JSON-serializable job parameters
+            handler: Callable(job) run on the worker pool; its return value
+                     becomes the job result
+
+        Returns:
+            Tuple of (job, created) where created is False for a shared job
+        """
+        key = request_hash(kind, params)
+
+        with self._lock:
+            self._evict()
+
+            existing = self._jobs.get(self._by_key.get(key))
+            if existing is not None and existing.status != 'error':
+                return existing, False
+
+            job = Job(key, kind, params)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+
+        self._executor.submit(self._run, job, handler)
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, handler):
+        # Failures are reported to clients through the job's error field
+        job.start()
+        try:
+            result = handler(job)
+        except Exception as e:
+            job.finish(error=str(e) or type(e).__name__)
+        else:
+            job.finish(result=result)
+
+    def _evict(self):
+        """Drop expired finished jobs, then the oldest finished ones over the limit"""
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at
+        )
+
+        overflow = len(self._jobs) - self.max_jobs + 1
+        for job in finished:
+            if job.finished_at + self.result_ttl > now and overflow <= 0:
+                break
+            self._remove(job)
+            overflow -= 1
+
+    def _remove(self, job):
+        self._jobs.pop(job.id, None)
+        if self._by_key.get(job.key) == job.id:
+            del self._by_key[job.key]
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {'jobs': len(self._jobs), 'by_status': counts}
+
+
+job_manager = JobManager()
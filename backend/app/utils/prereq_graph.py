@@ -0,0 +1,290 @@
+"""
+Prerequisite Graph
+Compiled, in-memory view of the course prerequisite graph with integer
+course indices, bitset transitive closures and critical path lengths
+"""
+import threading
+import numpy as np
+from sqlalchemy import select
+from app.models.database import Course, prerequisites, get_catalog_version
+
+
+class PrerequisiteGraph:
+    """
+    Course prerequisite DAG indexed by integers
+
+    Courses are numbered 0..n-1. Direct prerequisites and unlocks are kept
+    as CSR adjacency arrays, and every course also has Python int bitsets
+    (bit j = course j) of its direct prerequisites, all transitive
+    prerequisites and everything it eventually unlocks, so eligibility and
+    closure queries are a couple of integer operations.
+
+    depth[i] is the length of the longest prerequisite chain ending at i
+    (0 for entry courses); height[i] is the length of the longest chain of
+    courses i unlocks, so depth + height + 1 is the longest path through i.
+    Courses on a prerequisite cycle are reported in cycles and ignored for
+    ordering.
+
+    For batch work the direct prerequisite bitsets are also packed into a
+    (courses x words) uint64 array, so many students' completed sets can be
+    checked against every course in one vectorized pass.
+    """
+    def __init__(self, courses, edges, version=None):
+        """
+        Args:
+            courses: List of (id, code, name, credits, workload, category) rows
+            edges: List of (course_id, prerequisite_id) rows
+            version: Catalog version the rows were read at
+        """
+        self.version = version
+        self.ids = np.array([row[0] for row in courses], dtype=np.int64)
+        self.codes = [row[1] for row in courses]
+        self.names = [row[2] for row in courses]
+        self.credits = np.array([row[3] or 0 for row in courses], dtype=np.int64)
+        self.workloads = [row[4] or 'Moderate' for row in courses]
+        self.categories = [row[5] or 'Core' for row in courses]
+
+        self.size = len(courses)
+        self.index_of_id = {course_id: idx for idx, course_id in enumerate(self.ids.tolist())}
+        self.index_of_code = {code: idx for idx, code in enumerate(self.codes)}
+
+        pairs = [
+            (self.index_of_id[course_id], self.index_of_id[prereq_id])
+            for course_id, prereq_id in edges
+            if course_id in self.index_of_id and prereq_id in self.index_of_id
+        ]
+        course_idx = np.array([c for c, _ in pairs], dtype=np.int64)
+        prereq_idx = np.array([p for _, p in pairs], dtype=np.int64)
+
+        self.prereq_ptr, self.prereq_idx = self._csr(course_idx, prereq_idx)
+        self.unlock_ptr, self.unlock_idx = self._csr(prereq_idx, course_idx)
+
+        self.prereq_mask = [0] * self.size
+        for c, p in pairs:
+            self.prereq_mask[c] |= 1 << p
+
+        self.words = max(1, -(-self.size // 64))
+        self.prereq_words = np.zeros((self.size, self.words), dtype=np.uint64)
+        if len(pairs):
+            np.bitwise_or.at(
+                self.prereq_words, (course_idx, prereq_idx // 64),
+                np.left_shift(np.uint64(1), (prereq_idx % 64).astype(np.uint64))
+            )
+
+        self._compile()
+
+    def _csr(self, rows, cols):
+        order = np.lexsort((cols, rows))
+        counts = np.bincount(rows, minlength=self.size) if len(rows) else np.zeros(self.size, dtype=np.int64)
+        ptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return ptr, cols[order]
+
+    def prerequisites_of(self, idx):
+        """Direct prerequisite indices of course idx"""
+        return self.prereq_idx[self.prereq_ptr[idx]:self.prereq_ptr[idx + 1]]
+
+    def unlocked_by(self, idx):
+        """Indices of courses that list course idx as a direct prerequisite"""
+        return self.unlock_idx[self.unlock_ptr[idx]:self.unlock_ptr[idx + 1]]
+
+    def _compile(self):
+        # Kahn's algorithm gives a topological order; leftovers are on cycles
+        indegree = np.diff(self.prereq_ptr).copy()
+        order = [idx for idx in range(self.size) if indegree[idx] == 0]
+        for idx in order:
+            for nxt in self.unlocked_by(idx).tolist():
+                indegree[nxt] -= 1
+                if indegree[nxt] == 0:
+                    order.append(nxt)
+
+        self.order = order
+        in_order = set(order)
+        self.cycles = [self.codes[idx] for idx in range(self.size) if idx not in in_order]
+
+        self.depth = np.zeros(self.size, dtype=np.int64)
+        self.height = np.zeros(self.size, dtype=np.int64)
+        self.ancestors = [0] * self.size
+        self.descendants = [0] * self.size
+
+        for idx in order:
+            mask = 0
+            depth = 0
+            for p in self.prerequisites_of(idx).tolist():
+                mask |= (1 << p) | self.ancestors[p]
+                depth = max(depth, self.depth[p] + 1)
+            self.ancestors[idx] = mask
+            self.depth[idx] = depth
+
+        for idx in reversed(order):
+            mask = 0
+            height = 0
+            for nxt in self.unlocked_by(idx).tolist():
+                mask |= (1 << nxt) | self.descendants[nxt]
+                height = max(height, self.height[nxt] + 1)
+            self.descendants[idx] = mask
+            self.height[idx] = height
+
+        self.unlock_counts = np.diff(self.unlock_ptr)
+        self.prereq_counts = np.diff(self.prereq_ptr)
+
+    # Bitset helpers
+
+    def mask_of(self, codes):
+        """Bitset of the known courses among codes"""
+        mask = 0
+        for code in codes:
+            idx = self.index_of_code.get(code)
+            if idx is not None:
+                mask |= 1 << idx
+        return mask
+
+    def codes_of(self, mask):
+        """Course codes in a bitset, in index order"""
+        codes = []
+        while mask:
+            low = mask & -mask
+            codes.append(self.codes[low.bit_length() - 1])
+            mask ^= low
+        return codes
+
+    # Queries by course code
+
+    def eventually_unlocks(self, code):
+        """Codes of every course that transitively requires code"""
+        idx = self.index_of_code.get(code)
+        return self.codes_of(self.descendants[idx]) if idx is not None else []
+
+    def all_prerequisites(self, code):
+        """Codes of every course code transitively requires"""
+        idx = self.index_of_code.get(code)
+        return self.codes_of(self.ancestors[idx]) if idx is not None else []
+
+    def is_eligible(self, code, completed_mask):
+        """Whether every direct prerequisite of code is in completed_mask"""
+        idx = self.index_of_code.get(code)
+        return idx is not None and self.prereq_mask[idx] & ~completed_mask == 0
+
+    def unlock_count(self, code):
+        """Number of courses that list code as a direct prerequisite"""
+        idx = self.index_of_code.get(code)
+        return int(self.unlock_counts[idx]) if idx is not None else 0
+
+    def critical_path(self, code):
+        """Length in courses of the longest prerequisite chain through code"""
+        idx = self.index_of_code.get(code)
+        return int(self.depth[idx] + self.height[idx] + 1) if idx is not None else 0
+
+    def pack(self, completed_sets):
+        """
+        Pack lists of completed course codes into a (students x words) uint64 array
+
+        Unknown codes are ignored.
+        """
+        packed = np.zeros((len(completed_sets), self.words), dtype=np.uint64)
+
+        rows = []
+        cols = []
+        for row, codes in enumerate(completed_sets):
+            for code in codes:
+                idx = self.index_of_code.get(code)
+                if idx is not None:
+                    rows.append(row)
+                    cols.append(idx)
+
+        if rows:
+            cols = np.array(cols, dtype=np.int64)
+            np.bitwise_or.at(
+                packed, (np.array(rows, dtype=np.int64), cols // 64),
+                np.left_shift(np.uint64(1), (cols % 64).astype(np.uint64))
+            )
+
+        return packed
+
+    def eligibility_matrix(self, completed_sets, course_codes=None, include_completed=False):
+        """
+        Which courses each student may take next
+
+        A course is eligible when every direct prerequisite is in the
+        student's completed set; courses already completed are excluded
+        unless include_completed is set.
+
+        Args:
+            completed_sets: List of completed course code lists, one per student
+            course_codes: Courses to check (default: the whole catalog)
+            include_completed: Keep courses the student has already completed
+
+        Returns:
+            Tuple of (students x courses boolean array, course codes checked)
+        """
+        if course_codes is None:
+            course_codes = self.codes
+        course_codes = [code for code in course_codes if code in self.index_of_code]
+        columns = np.array([self.index_of_code[code] for code in course_codes], dtype=np.int64)
+
+        completed = self.pack(completed_sets)
+        required = self.prereq_words[columns]
+
+        # One (students x courses) pass per word that holds any prerequisite,
+        # rather than materializing students x courses x words at once
+        eligible = np.ones((len(completed_sets), len(columns)), dtype=bool)
+        for word in np.flatnonzero(required.any(axis=0)).tolist():
+            eligible &= (required[None, :, word] & ~completed[:, word, None]) == 0
+
+        if not include_completed and len(columns):
+            word = columns // 64
+            bit = np.left_shift(np.uint64(1), (columns % 64).astype(np.uint64))
+            eligible &= (completed[:, word] & bit) == 0
+
+        return eligible, course_codes
+
+    @classmethod
+    def from_session(cls, session, version=None):
+        """Build the graph with one query per table"""
+        if version is None:
+            version = get_catalog_version(session)
+        courses = session.execute(
+            select(Course.id, Course.code, Course.name, Course.credits, Course.workload, Course.category)
+            .order_by(Course.id)
+        ).all()
+        edges = session.execute(select(prerequisites.c.course_id, prerequisites.c.prerequisite_id)).all()
+        return cls(courses, edges, version)
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_prerequisite_graph(session):
+    """
+    Get the compiled prerequisite graph, building it on first use
+
+    The graph is shared by the whole process and rebuilt when the catalog
+    version in the database changes, e.g. after populate_database() ran in
+    another process. The version is read once per transaction, so a request
+    sees one consistent graph.
+    """
+    global _graph
+
+    cached = session.info.get('catalog_version')
+    if cached is not None and cached[0] is session.get_transaction():
+        version = cached[1]
+    else:
+        version = get_catalog_version(session)
+        session.info['catalog_version'] = (session.get_transaction(), version)
+
+    graph = _graph
+    if graph is None or graph.version != version:
+        with _graph_lock:
+            if _graph is None or _graph.version != version:
+                _graph = PrerequisiteGraph.from_session(session, version)
+            graph = _graph
+
+    return graph
+
+
+def invalidate_prerequisite_graph():
+    """Drop the compiled graph so the next request rebuilds it"""
+    global _graph
+
+    with _graph_lock:
+        _graph = None
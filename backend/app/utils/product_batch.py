@@ -0,0 +1,198 @@
+"""
+Compact product records
+Slotted product records plus a struct-of-arrays batch with NumPy price and
+distance columns, converted to the JSON dict shape only at the API boundary
+"""
+import numpy as np
+from app.utils.geo import location_arrays, haversine_one_to_many
+
+_FIELDS = ('name', 'price', 'store', 'image', 'url', 'location')
+
+
+def _parse_price(value):
+    """
+    Price as a float, or None if it is missing or not a finite number
+
+    Strings such as "$1,299.99" are accepted.
+    """
+    if isinstance(value, str):
+        value = value.strip().lstrip('$').replace(',', '')
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if np.isfinite(price) else None
+
+
+class Product:
+    """
+    One scraped listing
+
+    Records are never modified once created, so cached results and every
+    batch built from them share the same objects. Per-search values (the
+    search query and distance from the user) live in the batch instead.
+    Keys an adapter returns beyond the common fields are kept in extra.
+    price is None when the listing had no usable price; batches skip those.
+    """
+    __slots__ = _FIELDS + ('extra',)
+
+    def __init__(self, name, price, store, image=None, url=None, location=None, extra=None):
+        self.name = name
+        self.price = _parse_price(price)
+        self.store = store
+        self.image = image
+        self.url = url
+        self.location = location
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        extra = {k: v for k, v in data.items() if k not in _FIELDS and k not in ('search_query', 'distance')}
+        return cls(
+            data.get('name'), data.get('price'), data.get('store'),
+            image=data.get('image'), url=data.get('url'), location=data.get('location'),
+            extra=extra or None
+        )
+
+    def to_dict(self):
+        data = {'name': self.name, 'price': self.price, 'store': self.store, 'image': self.image}
+        if self.url is not None:
+            data['url'] = self.url
+        data['location'] = self.location
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"Product({self.name!r}, {self.price!r}, {self.store!r})"
+
+
+class ProductBatch:
+    """
+    Products for one search as parallel columns
+
+    records holds the shared Product objects; price and distance are NumPy
+    columns and query is the search query each product was found for.
+    Filtering, sorting and top-K work on index arrays and return new
+    batches that reference the same records, without copying any product.
+    distance is NaN where it was never computed (no user location).
+    """
+    __slots__ = ('records', 'price', 'distance', 'query')
+
+    def __init__(self, records, price, distance, query):
+        self.records = records
+        self.price = price
+        self.distance = distance
+        self.query = query
+
+    @classmethod
+    def empty(cls):
+        return cls([], np.zeros(0), np.zeros(0), np.empty(0, dtype=object))
+
+    @classmethod
+    def from_records(cls, records, query, user_location=None):
+        """
+        Batch of records found for one query, with distances from user_location
+
+        Records without a usable price are skipped, so one malformed listing
+        does not cost the rest of a retailer's results. Products without a
+        store location get a distance of 0.
+        """
+        records = [r for r in records if r.price is not None]
+        price = np.fromiter((r.price for r in records), dtype=float, count=len(records))
+
+        distance = np.full(len(records), np.nan)
+        if user_location and records:
+            distance[:] = 0.0
+            located = [idx for idx, r in enumerate(records) if r.location]
+            if located:
+                lats, lngs = location_arrays([records[idx].location for idx in located])
+                distance[located] = haversine_one_to_many(
+                    user_location['lat'], user_location['lng'], lats, lngs
+                )
+
+        queries = np.empty(len(records), dtype=object)
+        queries[:] = query
+        return cls(records, price, distance, queries)
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        records = []
+        for batch in batches:
+            records.extend(batch.records)
+
+        return cls(
+            records,
+            np.concatenate([b.price for b in batches]),
+            np.concatenate([b.distance for b in batches]),
+            np.concatenate([b.query for b in batches])
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, idx):
+        """Product idx in the API dict shape"""
+        return self._to_dict(idx)
+
+    @property
+    def names(self):
+        return [r.name for r in self.records]
+
+    def take(self, indices):
+        """New batch with the products at indices, in that order"""
+        indices = np.asarray(indices, dtype=np.int64)
+        records = self.records
+        return ProductBatch(
+            [records[idx] for idx in indices.tolist()],
+            self.price[indices], self.distance[indices], self.query[indices]
+        )
+
+    def filter(self, mask):
+        return self.take(np.flatnonzero(mask))
+
+    def sort_by_price(self):
+        return self.take(np.argsort(self.price, kind='stable'))
+
+    def top_k(self, k, column='price'):
+        """The k products with the smallest values of a column, in order"""
+        values = getattr(self, column)
+        if k <= 0 or not len(values):
+            return self.take([])
+        if k < len(values):
+            # Partition first so only the k smallest get sorted
+            candidates = np.argpartition(values, k - 1)[:k]
+        else:
+            candidates = np.arange(len(values))
+        return self.take(candidates[np.lexsort((candidates, values[candidates]))])
+
+    def to_dicts(self):
+        """Products in the API dict shape"""
+        return [self._to_dict(idx) for idx in range(len(self.records))]
+
+    def _to_dict(self, idx):
+        data = self.records[idx].to_dict()
+        data['search_query'] = self.query[idx]
+        if not np.isnan(self.distance[idx]):
+            data['distance'] = float(self.distance[idx])
+        return data
+
+
+def take_products(products, indices):
+    """Reorder/select products by index, for either a ProductBatch or a list"""
+    if isinstance(products, ProductBatch):
+        return products.take(indices)
+    return [products[idx] for idx in indices]
+
+
+def product_names(products):
+    """Names of a ProductBatch or a list of product dicts"""
+    if isinstance(products, ProductBatch):
+        return products.names
+    return [product.get('name', '') for product in products]
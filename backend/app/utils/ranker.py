@@ -0,0 +1,144 @@
+"""
+Local product ranking
+BM25 index and token coverage scores over product names, built
+in-process so matching products to search queries needs no network round trip
+"""
+import os
+import re
+import numpy as np
+from app.utils.product_batch import product_names, take_products
+
+# BM25 settings
+BM25_K1 = float(os.getenv('BM25_K1', '1.2'))  # Term frequency saturation
+BM25_B = float(os.getenv('BM25_B', '0.75'))  # Document length normalization
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens with a light plural stem ("notebooks" -> "notebook")
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of documents
+
+    Postings are stored per term as parallel arrays of document ids and term
+    frequencies, so scoring a query is one vectorized update per query term
+    rather than a loop over documents.
+    """
+    def __init__(self, documents, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+
+        postings = {}
+        lengths = np.zeros(self.size)
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths[doc_id] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        average = lengths.mean() if self.size and lengths.mean() > 0 else 1.0
+        self._norm = k1 * (1 - b + b * lengths / average)
+
+        self._postings = {}
+        for token, counts in postings.items():
+            doc_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            freqs = np.fromiter(counts.values(), dtype=float, count=len(counts))
+            idf = np.log(1 + (self.size - len(counts) + 0.5) / (len(counts) + 0.5))
+            self._postings[token] = (doc_ids, freqs, idf)
+
+    def scores(self, query):
+        """BM25 score of every document for a query, as an array"""
+        scores = np.zeros(self.size)
+        for token in set(tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            doc_ids, freqs, idf = posting
+            scores[doc_ids] += idf * freqs * (self.k1 + 1) / (freqs + self._norm[doc_ids])
+        return scores
+
+    def score_matrix(self, queries):
+        """queries x documents array of BM25 scores"""
+        if not queries:
+            return np.zeros((0, self.size))
+        return np.vstack([self.scores(query) for query in queries])
+
+
+def rank_products(search_queries, products):
+    """
+    Order products by relevance to the search queries
+
+    Each product is scored against every query and keeps its best score.
+    Products that match no query term keep their relative order at the end.
+
+    Args:
+        search_queries: List of user's search queries
+        products: ProductBatch or list of product dicts
+
+    Returns:
+        Tuple of (ranked products of the same type, their scores as an array)
+    """
+    if not len(products):
+        return products, np.zeros(0)
+
+    index = BM25Index(product_names(products))
+    scores = index.score_matrix(search_queries).max(axis=0) if search_queries else np.zeros(len(products))
+
+    # Stable sort keeps the incoming (price) order among equal scores
+    order = np.argsort(-scores, kind='stable')
+    return take_products(products, order), scores[order]
+
+
+def token_coverage_matrix(product_names, queries):
+    """
+    Fraction of each query's tokens found in each product name
+
+    A query that appears verbatim in a name scores 1.0 even if tokenizing
+    splits it differently.
+
+    Returns:
+        products x queries array of scores in [0, 1]
+    """
+    vocabulary = {}
+    query_tokens = []
+    for query in queries:
+        tokens = set(tokenize(query))
+        query_tokens.append(tokens)
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    scores = np.zeros((len(product_names), len(queries)))
+    if not product_names or not queries:
+        return scores
+
+    # Binary token incidence; only query tokens matter
+    query_matrix = np.zeros((len(queries), len(vocabulary)))
+    for row, tokens in enumerate(query_tokens):
+        query_matrix[row, [vocabulary[token] for token in tokens]] = 1
+
+    name_matrix = np.zeros((len(product_names), len(vocabulary)))
+    for row, name in enumerate(product_names):
+        columns = [vocabulary[token] for token in set(tokenize(name)) if token in vocabulary]
+        name_matrix[row, columns] = 1
+
+    lengths = query_matrix.sum(axis=1)
+    scores = (name_matrix @ query_matrix.T) / np.maximum(lengths, 1)
+
+    names = np.array([(name or '').lower() for name in product_names])[:, None]
+    phrases = np.array([(query or '').lower().strip() for query in queries])[None, :]
+    verbatim = (np.char.find(names, phrases) >= 0) & (phrases != '')
+
+    return np.where(verbatim, 1.0, scores)
@@ -1,73 +1,157 @@
 """
-A* algorithm for optimal route calculation
+Optimal route calculation
+Builds the distance matrix for a trip and picks a route solver for it
 """
 import heapq
-from math import radians, sin, cos, sqrt, atan2
 import os
 import googlemaps
+import numpy as np
+from app.utils.cache import LRUCache
+from app.utils.geo import location_arrays, haversine_matrix
+from app.utils.route_solvers import held_karp_path, local_search_path, MSTLowerBound
 
 # Initialize Google Maps client
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
 gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY) if GOOGLE_MAPS_API_KEY else None
 
+# Distance Matrix settings. A 10 x 10 chunk keeps each request at the
+# API's 100-element limit
+DISTANCE_MATRIX_CHUNK = 10
+DISTANCE_CACHE_SIZE = int(os.getenv('DISTANCE_CACHE_SIZE', '20000'))
+DISTANCE_CACHE_TTL = int(os.getenv('DISTANCE_CACHE_TTL', str(24 * 3600)))
 
-def haversine_distance(coord1, coord2):
-    """
-    Calculate the great circle distance between two points
-    on the earth (specified in decimal degrees)
-    Returns distance in miles
+# Largest number of stores solved exactly with Held-Karp
+HELD_KARP_MAX_STOPS = int(os.getenv('HELD_KARP_MAX_STOPS', '15'))
+
+ROUTE_SOLVERS = ('held_karp', 'local_search', 'astar')
+
+# Default time budget for the local search solver on larger routes
+ROUTE_TIME_BUDGET_MS = float(os.getenv('ROUTE_TIME_BUDGET_MS', '250'))
+
+# Driving distances by rounded (origin, destination), shared across requests
+distance_cache = LRUCache(maxsize=DISTANCE_CACHE_SIZE, ttl=DISTANCE_CACHE_TTL)
+
+
+def _pair_key(origin, destination):
+    return (
+        round(origin['lat'], 5), round(origin['lng'], 5),
+        round(destination['lat'], 5), round(destination['lng'], 5)
+    )
+
+
+def _fetch_distances(origins, destinations):
     """
-    lat1, lon1 = coord1['lat'], coord1['lng']
-    lat2, lon2 = coord2['lat'], coord2['lng']
+    Fetch driving distances for every origin/destination pair
 
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    Uses the multi-origin/multi-destination form of the Distance Matrix API,
+    chunked to stay within its per-request element limit. Returns a dict of
+    (origin index, destination index) -> miles for the pairs that came back OK.
+    """
+    distances = {}
+
+    for o_start in range(0, len(origins), DISTANCE_MATRIX_CHUNK):
+        o_chunk = origins[o_start:o_start + DISTANCE_MATRIX_CHUNK]
+
+        for d_start in range(0, len(destinations), DISTANCE_MATRIX_CHUNK):
+            d_chunk = destinations[d_start:d_start + DISTANCE_MATRIX_CHUNK]
+
+            try:
+                result = gmaps.distance_matrix(
+                    origins=[(o['lat'], o['lng']) for o in o_chunk],
+                    destinations=[(d['lat'], d['lng']) for d in d_chunk],
+                    mode='driving'
+                )
+            except Exception as e:
+                print(f"Error getting actual distance: {e}")
+                continue
 
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
+            for i, row in enumerate(result.get('rows', [])):
+                for j, element in enumerate(row.get('elements', [])):
+                    if element.get('status') == 'OK':
+                        # Distance in miles
+                        distances[(o_start + i, d_start + j)] = element['distance']['value'] / 1609.34
 
-    # Radius of earth in miles
-    r = 3959
-    return r * c
+    return distances
 
 
-def get_actual_distance(origin, destination):
+def build_distance_matrix(points):
     """
-    Get actual driving distance using Google Maps Distance Matrix API
+    Build an N x N matrix of travel distances in miles between points
+
+    With Google Maps configured, pairs missing from the cross-request cache
+    are fetched in batched Distance Matrix requests; anything the API can't
+    answer falls back to haversine distance.
+
+    Args:
+        points: List of locations {lat, lng}
+
+    Returns:
+        numpy array where matrix[i][j] is the distance from points[i] to points[j]
     """
+    n = len(points)
+    lats, lngs = location_arrays(points)
+    straight_line = haversine_matrix(lats, lngs)
+
     if not gmaps:
         # Fall back to haversine distance if API not configured
-        return haversine_distance(origin, destination)
+        return straight_line
+
+    matrix = np.zeros((n, n))
+
+    missing = []
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                continue
 
-    try:
-        result = gmaps.distance_matrix(
-            origins=[(origin['lat'], origin['lng'])],
-            destinations=[(destination['lat'], destination['lng'])],
-            mode='driving'
+            cached = distance_cache.get(_pair_key(points[i], points[j]))
+            if cached is None:
+                missing.append((i, j))
+            else:
+                matrix[i, j] = cached
+
+    if missing:
+        origin_ids = sorted({i for i, _ in missing})
+        destination_ids = sorted({j for _, j in missing})
+        fetched = _fetch_distances(
+            [points[i] for i in origin_ids],
+            [points[j] for j in destination_ids]
         )
 
-        if result['rows'][0]['elements'][0]['status'] == 'OK':
-            # Return distance in miles
-            distance_meters = result['rows'][0]['elements'][0]['distance']['value']
-            return distance_meters / 1609.34
-        else:
-            return haversine_distance(origin, destination)
+        origin_pos = {i: pos for pos, i in enumerate(origin_ids)}
+        destination_pos = {j: pos for pos, j in enumerate(destination_ids)}
 
-    except Exception as e:
-        print(f"Error getting actual distance: {e}")
-        return haversine_distance(origin, destination)
+        for i, j in missing:
+            distance = fetched.get((origin_pos[i], destination_pos[j]))
+            if distance is None:
+                matrix[i, j] = straight_line[i, j]
+            else:
+                matrix[i, j] = distance
+                distance_cache.set(_pair_key(points[i], points[j]), distance)
+
+    return matrix
+
+
+def get_actual_distance(origin, destination):
+    """
+    Get actual driving distance using Google Maps Distance Matrix API
+    """
+    return float(build_distance_matrix([origin, destination])[0, 1])
 
 
 class AStarNode:
     """
     Node for A* algorithm
+
+    index is the node's row in the distance matrix: 0 is the user's
+    location and stores are 1..n. visited_mask has bit i set once store
+    i+1 has been visited.
     """
-    def __init__(self, location, stores_visited, g_cost, h_cost, parent=None):
-        self.location = location
-        self.stores_visited = frozenset(stores_visited)
+    __slots__ = ('index', 'visited_mask', 'g_cost', 'h_cost', 'f_cost', 'parent')
+
+    def __init__(self, index, visited_mask, g_cost, h_cost, parent=None):
+        self.index = index
+        self.visited_mask = visited_mask
         self.g_cost = g_cost  # Cost from start to current node
         self.h_cost = h_cost  # Heuristic cost to goal
         self.f_cost = g_cost + h_cost  # Total cost
@@ -76,26 +160,14 @@ class AStarNode:
     def __lt__(self, other):
         return self.f_cost < other.f_cost
 
-    def __eq__(self, other):
-        return (self.location == other.location and
-                self.stores_visited == other.stores_visited)
-
-    def __hash__(self):
-        return hash((str(self.location), self.stores_visited))
-
 
-def calculate_optimal_route(products, user_location):
+def group_stores(products):
     """
-    Calculate optimal route using A* algorithm
-
-    Args:
-        products: List of selected products with store locations
-        user_location: User's starting location {lat, lng}
+    Group products by store location
 
     Returns:
-        List of stores in optimal visit order
+        List of stores {lat, lng, name, address, products} in first-seen order
     """
-    # Group products by store location
     stores_dict = {}
     for product in products:
         if product.get('location'):
@@ -113,7 +185,33 @@ def calculate_optimal_route(products, user_location):
 
             stores_dict[key]['products'].append(product['name'])
 
-    stores = list(stores_dict.values())
+    return list(stores_dict.values())
+
+
+def calculate_optimal_route(products, user_location, solver=None, time_budget_ms=None):
+    """
+    Calculate optimal route through the stores of the selected products
+
+    Up to HELD_KARP_MAX_STOPS stores are solved exactly with the bitmask
+    dynamic program. Larger routes use the anytime local search, which
+    returns the best route it finds within time_budget_ms.
+
+    Args:
+        products: List of selected products with store locations
+        user_location: User's starting location {lat, lng}
+        solver: Force a solver ('held_karp', 'local_search' or 'astar')
+        time_budget_ms: Time budget for the local search solver
+
+    Returns:
+        List of stores in optimal visit order
+
+    Raises:
+        ValueError: If solver is not one of the names above
+    """
+    if solver is not None and solver not in ROUTE_SOLVERS:
+        raise ValueError(f"Unknown route solver: {solver}")
+
+    stores = group_stores(products)
 
     if not stores:
         return []
@@ -122,18 +220,54 @@ def calculate_optimal_route(products, user_location):
     if len(stores) == 1:
         return stores
 
-    # Use A* to find optimal route
+    # All distances are fetched up front; the solvers only do array lookups
+    matrix = build_distance_matrix([user_location] + stores)
+
+    if solver is None:
+        solver = 'held_karp' if len(stores) <= HELD_KARP_MAX_STOPS else 'local_search'
+
+    if solver == 'held_karp':
+        order, _ = held_karp_path(matrix)
+    elif solver == 'astar':
+        order, _ = astar_route(matrix)
+    else:
+        order, _ = local_search_path(matrix, time_budget_ms or ROUTE_TIME_BUDGET_MS)
+
+    # If no route found, fall back to nearest neighbor
+    if not order:
+        return nearest_neighbor_route(user_location, stores, matrix)
+
+    return [stores[idx - 1] for idx in order]
+
+
+def astar_route(matrix):
+    """
+    Shortest open path from node 0 through every other node using A*
+
+    The heuristic is the cheapest edge into the unvisited stores plus their
+    MST weight, served from a per-request memo keyed by unvisited bitmask.
+
+    Args:
+        matrix: Distance matrix; row 0 is the start, rows 1..n are stores
+
+    Returns:
+        Tuple of (store indices in visit order, total distance)
+    """
+    n = matrix.shape[0] - 1
+    full = (1 << n) - 1
+    bounds = MSTLowerBound(matrix)
+    distances = np.asarray(matrix, dtype=float).tolist()
+
     start_node = AStarNode(
-        location=user_location,
-        stores_visited=set(),
+        index=0,
+        visited_mask=0,
         g_cost=0,
-        h_cost=calculate_min_spanning_tree_cost(user_location, stores),
+        h_cost=bounds.bound(0, full),
         parent=None
     )
 
-    open_set = []
-    heapq.heappush(open_set, start_node)
-    closed_set = set()
+    open_set = [start_node]
+    best_g = {(0, 0): 0}
 
     best_route = None
     best_cost = float('inf')
@@ -141,114 +275,80 @@ def calculate_optimal_route(products, user_location):
     while open_set:
         current = heapq.heappop(open_set)
 
-        # If all stores visited, we found a complete route
-        if len(current.stores_visited) == len(stores):
-            if current.g_cost < best_cost:
-                best_cost = current.g_cost
-                best_route = reconstruct_path(current, stores)
+        # The heuristic is admissible, so nothing left can beat the best route
+        if current.f_cost >= best_cost:
+            break
+
+        # Skip entries superseded by a cheaper path to the same state
+        if current.g_cost > best_g.get((current.index, current.visited_mask), float('inf')):
             continue
 
-        state = (str(current.location), current.stores_visited)
-        if state in closed_set:
+        # If all stores visited, we found a complete route
+        if current.visited_mask == full:
+            best_cost = current.g_cost
+            best_route = reconstruct_path(current)
             continue
-        closed_set.add(state)
+
+        row = distances[current.index]
 
         # Try visiting each unvisited store
-        for idx, store in enumerate(stores):
-            if idx in current.stores_visited:
+        for bit in range(n):
+            if current.visited_mask >> bit & 1:
                 continue
 
-            # Calculate cost to this store
-            distance = get_actual_distance(current.location, store)
-            new_g_cost = current.g_cost + distance
+            idx = bit + 1
+            visited_mask = current.visited_mask | (1 << bit)
+            new_g_cost = current.g_cost + row[idx]
 
-            # Calculate heuristic (remaining minimum cost)
-            unvisited = [s for i, s in enumerate(stores) if i not in current.stores_visited and i != idx]
-            h_cost = calculate_min_spanning_tree_cost(store, unvisited) if unvisited else 0
+            state = (idx, visited_mask)
+            if new_g_cost >= best_g.get(state, float('inf')):
+                continue
+            best_g[state] = new_g_cost
 
-            new_stores_visited = set(current.stores_visited)
-            new_stores_visited.add(idx)
+            # Calculate heuristic (remaining minimum cost)
+            h_cost = bounds.bound(idx, full ^ visited_mask)
 
-            neighbor = AStarNode(
-                location=store,
-                stores_visited=new_stores_visited,
+            heapq.heappush(open_set, AStarNode(
+                index=idx,
+                visited_mask=visited_mask,
                 g_cost=new_g_cost,
                 h_cost=h_cost,
-                parent=(current, idx)
-            )
+                parent=current
+            ))
 
-            heapq.heappush(open_set, neighbor)
-
-    # If no route found, fall back to nearest neighbor
-    if not best_route:
-        best_route = nearest_neighbor_route(user_location, stores)
+    return best_route or [], best_cost
 
-    return best_route
 
-
-def calculate_min_spanning_tree_cost(start, stores):
-    """
-    Calculate minimum spanning tree cost as heuristic
-    This is an admissible heuristic for A*
-    """
-    if not stores:
-        return 0
-
-    # Use Prim's algorithm to calculate MST cost
-    visited = set()
-    min_cost = 0
-
-    # Start from the nearest store to current location
-    current = min(stores, key=lambda s: haversine_distance(start, s))
-    visited.add(id(current))
-
-    while len(visited) < len(stores):
-        min_edge = float('inf')
-        next_store = None
-
-        for v_store in [s for s in stores if id(s) in visited]:
-            for u_store in [s for s in stores if id(s) not in visited]:
-                edge_cost = haversine_distance(v_store, u_store)
-                if edge_cost < min_edge:
-                    min_edge = edge_cost
-                    next_store = u_store
-
-        if next_store:
-            min_cost += min_edge
-            visited.add(id(next_store))
-        else:
-            break
-
-    return min_cost
-
-
-def reconstruct_path(node, stores):
+def reconstruct_path(node):
     """
-    Reconstruct the path from A* result
+    Reconstruct the path of store indices from A* result
     """
     path = []
     current = node
 
     while current.parent:
-        parent, store_idx = current.parent
-        path.append(stores[store_idx])
-        current = parent
+        path.append(current.index)
+        current = current.parent
 
     return list(reversed(path))
 
 
-def nearest_neighbor_route(start, stores):
+def nearest_neighbor_route(start, stores, matrix=None):
     """
     Fallback: Simple nearest neighbor algorithm
     """
+    if matrix is None:
+        matrix = build_distance_matrix([start] + list(stores))
+
     route = []
-    remaining = list(stores)
-    current_location = start
+    remaining = list(range(1, len(stores) + 1))
+    current = 0
 
     while remaining:
-        nearest = min(remaining, key=lambda s: haversine_distance(current_location, s))
-        route.append(nearest)
+        nearest = min(remaining, key=lambda s: matrix[current, s])
+        route.append(stores[nearest - 1])
         remaining.remove(nearest)
-        current_location = nearest
+        current = nearest
 
     return route
+
@@ -0,0 +1,398 @@
+"""
+Route solvers over a precomputed distance matrix
+All solvers find an open path that starts at node 0 and visits every other
+node once; they return (node indices in visit order, total distance)
+"""
+import time
+import numpy as np
+
+
+def _popcounts(size, bits):
+    """Number of set bits for every mask in range(size)"""
+    masks = np.arange(size)
+    counts = np.zeros(size, dtype=np.int8)
+    for bit in range(bits):
+        counts += ((masks >> bit) & 1).astype(np.int8)
+    return counts
+
+
+def held_karp_table(matrix):
+    """
+    Fill the Held-Karp dynamic programming table
+
+    dp[mask, k] is the cheapest way to leave node 0, visit exactly the
+    stores in mask and end at store k (bit k is matrix row k+1). Masks are
+    processed one popcount layer at a time so every layer is a handful of
+    NumPy operations. Time O(2^n * n^2), memory O(2^n * n).
+
+    Args:
+        matrix: (n+1) x (n+1) distance matrix; row 0 is the start
+
+    Returns:
+        Tuple of (dp, parent) arrays of shape (2^n, n)
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n = matrix.shape[0] - 1
+
+    size = 1 << n
+    between = matrix[1:, 1:]
+
+    dp = np.full((size, n), np.inf)
+    parent = np.full((size, n), -1, dtype=np.int8)
+
+    # Paths visiting a single store come straight from the start
+    singles = np.arange(n)
+    dp[1 << singles, singles] = matrix[0, 1:]
+
+    masks = np.arange(size)
+    popcounts = _popcounts(size, n)
+
+    for layer_size in range(2, n + 1):
+        layer = masks[popcounts == layer_size]
+
+        for k in range(n):
+            ending_at_k = layer[(layer >> k) & 1 == 1]
+            previous = ending_at_k ^ (1 << k)
+
+            # candidates[m, j]: reach previous[m] ending at j, then go j -> k.
+            # dp is inf wherever j isn't in the previous mask
+            candidates = dp[previous] + between[:, k]
+            best = candidates.argmin(axis=1)
+
+            dp[ending_at_k, k] = candidates[np.arange(len(ending_at_k)), best]
+            parent[ending_at_k, k] = best
+
+    return dp, parent
+
+
+def held_karp_order(dp, parent, mask):
+    """
+    Read the visit order for the stores in mask back out of the table
+
+    Returns:
+        Tuple of (store indices in visit order, total distance)
+    """
+    if not mask:
+        return [], 0.0
+
+    last = int(dp[mask].argmin())
+    cost = float(dp[mask, last])
+
+    order = []
+    while last >= 0:
+        order.append(last + 1)
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+
+    return list(reversed(order)), cost
+
+
+def held_karp_path(matrix):
+    """
+    Exact shortest open path using Held-Karp bitmask dynamic programming
+
+    Fine up to about 15 stores.
+
+    Args:
+        matrix: (n+1) x (n+1) distance matrix; row 0 is the start
+
+    Returns:
+        Tuple of (store indices 1..n in visit order, total distance)
+    """
+    n = np.asarray(matrix).shape[0] - 1
+    if n <= 0:
+        return [], 0.0
+
+    dp, parent = held_karp_table(matrix)
+    return held_karp_order(dp, parent, (1 << n) - 1)
+
+
+def path_cost(matrix, order):
+    """Total distance of an open path starting at node 0"""
+    cost = 0.0
+    current = 0
+    for node in order:
+        cost += matrix[current][node]
+        current = node
+    return float(cost)
+
+
+def nearest_neighbor_order(matrix):
+    """Visit order built by always driving to the closest unvisited store"""
+    matrix = np.asarray(matrix, dtype=float)
+    remaining = np.ones(matrix.shape[0], dtype=bool)
+    remaining[0] = False
+
+    order = []
+    current = 0
+    while remaining.any():
+        distances = np.where(remaining, matrix[current], np.inf)
+        current = int(distances.argmin())
+        remaining[current] = False
+        order.append(current)
+
+    return order
+
+
+def greedy_insertion_order(matrix, deadline=None):
+    """
+    Visit order built by cheapest insertion
+
+    Each step inserts the store whose cheapest insertion point (between two
+    consecutive stops, or at the end of the path) adds the least distance.
+    Construction is O(n^3), so it gives up and returns None if the
+    perf_counter deadline passes before every store is placed.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n = matrix.shape[0]
+    if n <= 1:
+        return []
+
+    path = [0]
+    remaining = list(range(1, n))
+
+    while remaining:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+
+        stops = np.array(path)
+        candidates = np.array(remaining)
+
+        # Inserting r between stops[i] and stops[i+1]
+        before = stops[:-1]
+        after = stops[1:]
+        between = (matrix[before][:, candidates] + matrix[candidates][:, after].T
+                   - matrix[before, after][:, None])
+
+        # Appending r after the last stop
+        at_end = matrix[stops[-1], candidates][None, :]
+        costs = np.vstack([between, at_end]) if len(before) else at_end
+
+        position, choice = np.unravel_index(costs.argmin(), costs.shape)
+        path.insert(int(position) + 1, int(candidates[choice]))
+        remaining.remove(int(candidates[choice]))
+
+    return path[1:]
+
+
+def two_opt(matrix, order, deadline):
+    """
+    Improve a path by reversing segments while that shortens it
+
+    Moves are scored with the symmetric 2-opt delta and confirmed against
+    the real path cost, so asymmetric driving distances stay correct.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    path = np.array([0] + list(order))
+    best_cost = path_cost(matrix, path[1:])
+    last = len(path) - 1
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+
+        for i in range(1, last):
+            if time.perf_counter() >= deadline:
+                break
+
+            j = np.arange(i + 1, last + 1)
+            a, b = path[i - 1], path[i]
+            c = path[j]
+            d = path[np.minimum(j + 1, last)]
+
+            delta = matrix[a, c] - matrix[a, b]
+            # Reversing up to the end leaves no edge after the segment
+            delta += np.where(j < last, matrix[b, d] - matrix[c, d], 0.0)
+
+            for k in np.argsort(delta):
+                if delta[k] >= -1e-9 or time.perf_counter() >= deadline:
+                    break
+
+                candidate = path.copy()
+                candidate[i:j[k] + 1] = candidate[i:j[k] + 1][::-1]
+                cost = path_cost(matrix, candidate[1:])
+
+                if cost < best_cost - 1e-9:
+                    path, best_cost = candidate, cost
+                    improved = True
+                    break
+
+    return [int(node) for node in path[1:]], best_cost
+
+
+def or_opt(matrix, order, deadline, max_segment=3):
+    """
+    Improve a path by moving short segments (optionally reversed) elsewhere
+
+    Like two_opt, moves are scored with an O(1) edge delta and confirmed
+    against the real path cost before being applied.
+    """
+    dist = np.asarray(matrix, dtype=float).tolist()
+    path = [0] + list(order)
+    best_cost = path_cost(dist, path[1:])
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+
+        for length in range(1, max_segment + 1):
+            start = 1
+            while start + length <= len(path):
+                if time.perf_counter() >= deadline:
+                    return path[1:], best_cost
+
+                segment = path[start:start + length]
+                prev = path[start - 1]
+                after = start + length
+
+                # Distance saved by cutting the segment out
+                removed = -dist[prev][segment[0]]
+                if after < len(path):
+                    removed += dist[prev][path[after]] - dist[segment[-1]][path[after]]
+
+                rest = path[:start] + path[after:]
+                moved = False
+
+                for position in range(1, len(rest) + 1):
+                    if position == start:
+                        continue
+                    if time.perf_counter() >= deadline:
+                        return path[1:], best_cost
+
+                    u = rest[position - 1]
+                    v = rest[position] if position < len(rest) else None
+
+                    for piece in (segment, segment[::-1]):
+                        added = dist[u][piece[0]]
+                        if v is not None:
+                            added += dist[piece[-1]][v] - dist[u][v]
+
+                        if removed + added >= -1e-9:
+                            continue
+
+                        candidate = rest[:position] + piece + rest[position:]
+                        cost = path_cost(dist, candidate[1:])
+                        if cost < best_cost - 1e-9:
+                            path, best_cost = candidate, cost
+                            moved = True
+                            break
+
+                    if moved:
+                        break
+
+                if moved:
+                    improved = True
+                else:
+                    start += 1
+
+    return path[1:], best_cost
+
+
+def local_search_path(matrix, time_budget_ms=200):
+    """
+    Anytime heuristic for routes too large to solve exactly
+
+    Builds a path with nearest neighbor and with greedy insertion, keeps the
+    shorter, then alternates 2-opt and Or-opt until neither improves it or
+    the time budget runs out. Every step checks the deadline, so the solve
+    overruns the budget by at most one step; if greedy insertion cannot
+    finish in time the nearest neighbor path is improved instead. Always
+    returns the best path found so far.
+
+    Args:
+        matrix: (n+1) x (n+1) distance matrix; row 0 is the start
+        time_budget_ms: Wall-clock budget for the whole solve
+
+    Returns:
+        Tuple of (store indices 1..n in visit order, total distance)
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000.0
+    matrix = np.asarray(matrix, dtype=float)
+
+    best_order = nearest_neighbor_order(matrix)
+    best_cost = path_cost(matrix, best_order)
+
+    order = greedy_insertion_order(matrix, deadline)
+    if order is not None:
+        cost = path_cost(matrix, order)
+        if cost < best_cost:
+            best_order, best_cost = order, cost
+
+    while time.perf_counter() < deadline:
+        order, cost = two_opt(matrix, best_order, deadline)
+        order, cost = or_opt(matrix, order, deadline)
+
+        if cost >= best_cost - 1e-9:
+            if cost < best_cost:
+                best_order, best_cost = order, cost
+            break
+
+        best_order, best_cost = order, cost
+
+    return best_order, best_cost
+
+
+def mst_cost(matrix, nodes):
+    """
+    Minimum spanning tree weight over a subset of nodes with O(k^2) Prim
+
+    Edge weights are min(d[i][j], d[j][i]) so the result is still a lower
+    bound when driving distances are asymmetric.
+    """
+    nodes = np.asarray(nodes, dtype=int)
+    if len(nodes) <= 1:
+        return 0.0
+
+    matrix = np.asarray(matrix, dtype=float)
+    sub = matrix[np.ix_(nodes, nodes)]
+    sub = np.minimum(sub, sub.T)
+
+    in_tree = np.zeros(len(nodes), dtype=bool)
+    in_tree[0] = True
+    best_edge = sub[0].copy()
+    total = 0.0
+
+    for _ in range(len(nodes) - 1):
+        candidates = np.where(in_tree, np.inf, best_edge)
+        nxt = int(candidates.argmin())
+        total += candidates[nxt]
+        in_tree[nxt] = True
+        best_edge = np.minimum(best_edge, sub[nxt])
+
+    return float(total)
+
+
+class MSTLowerBound:
+    """
+    Memoized MST lower bounds for one route request
+
+    Store subsets are bitmasks (bit i is matrix row i+1). Each subset's MST
+    is computed at most once; bound() adds the cheapest edge from the
+    current node into the subset, which keeps it admissible for A*.
+    """
+    def __init__(self, matrix):
+        self.matrix = np.asarray(matrix, dtype=float)
+        self.n = self.matrix.shape[0] - 1
+        self._mst = {0: 0.0}
+
+    def nodes(self, mask):
+        """Matrix rows of the stores in mask"""
+        return [bit + 1 for bit in range(self.n) if mask >> bit & 1]
+
+    def mst(self, mask):
+        cost = self._mst.get(mask)
+        if cost is None:
+            cost = mst_cost(self.matrix, self.nodes(mask))
+            self._mst[mask] = cost
+        return cost
+
+    def bound(self, current, mask):
+        """Lower bound on the cost of visiting every store in mask from current"""
+        if not mask:
+            return 0.0
+        nodes = self.nodes(mask)
+        return float(self.matrix[current, nodes].min()) + self.mst(mask)
+
+    def __len__(self):
+        return len(self._mst)
@@ -2,7 +2,26 @@
 Schedule Generator
 Creates balanced semester schedules based on prerequisites and workload
 """
-from app.models.database import Course
+import os
+import re
+import numpy as np
+from app.utils.prereq_graph import get_prerequisite_graph
+
+# Multi-semester plan settings
+PLAN_MAX_HEAVY = int(os.getenv('PLAN_MAX_HEAVY', '2'))  # Heavy courses allowed per term
+PLAN_SEARCH_SLACK = int(os.getenv('PLAN_SEARCH_SLACK', '4'))  # Extra terms tried past the lower bound
+
+
+def _semester_label(first, offset):
+    """Label of the semester offset terms after first, alternating Fall/Spring"""
+    match = re.match(r'\s*(Fall|Spring)\s+(\d{4})\s*$', first or '', re.IGNORECASE)
+    if not match:
+        return f"Semester {offset + 1}"
+
+    term = 0 if match.group(1).lower() == 'spring' else 1
+    position = int(match.group(2)) * 2 + term + offset
+    return f"{'Spring' if position % 2 == 0 else 'Fall'} {position // 2}"
+
 
 class ScheduleGenerator:
     def __init__(self, session):
@@ -12,6 +31,7 @@ class ScheduleGenerator:
             'standard': (15, 16),
             'heavy': (18, 21)
         }
+        self.max_heavy_per_term = PLAN_MAX_HEAVY
 
     def generate_schedule(self, major, minor, semester, credit_load, completed_courses):
         """
@@ -67,18 +87,209 @@ class ScheduleGenerator:
             )
         }
 
+    def generate_plan(self, major, minor, semester, credit_load, completed_courses):
+        """
+        Lay out every remaining term through graduation
+
+        Required courses (plus any of their prerequisites not yet taken) are
+        assigned to terms by list scheduling on the prerequisite graph: each
+        term takes the eligible courses with the least slack first, where
+        slack is how many terms a course can wait before its longest chain
+        of dependent courses no longer fits. Terms stay within the
+        credit_load maximum and at most max_heavy_per_term heavy courses.
+        The minimum is not enforced: each term already takes every eligible
+        course that fits, so a term only falls short when too few courses
+        have their prerequisites met, and such terms (other than the last)
+        carry a warning. The number of terms is searched upward from a lower
+        bound (credits / max load, and the longest remaining prerequisite
+        chain) for at most PLAN_SEARCH_SLACK extra terms before falling back
+        to an unbounded critical-path order.
+
+        Args:
+            major: Major object
+            minor: Minor object (optional)
+            semester: First semester of the plan (e.g., "Fall 2025")
+            credit_load: "light", "standard", or "heavy"
+            completed_courses: List of course codes already completed
+
+        Returns:
+            Dictionary with one schedule per semester and plan totals
+        """
+        min_credits, max_credits = self.credit_loads.get(credit_load, (15, 16))
+        graph = get_prerequisite_graph(self.session)
+
+        completed = graph.mask_of(completed_courses)
+
+        required = 0
+        for course in list(major.required_courses) + (list(minor.required_courses) if minor else []):
+            idx = graph.index_of_code.get(course.code)
+            if idx is not None:
+                required |= 1 << idx
+        required &= ~completed
+
+        # Prerequisites outside the degree requirements still have to be taken
+        needed = required
+        for idx in graph.codes_of(required):
+            needed |= graph.ancestors[graph.index_of_code[idx]]
+        needed &= ~completed
+        added = needed & ~required
+
+        cyclic = graph.mask_of(graph.cycles) & needed
+        needed &= ~cyclic
+
+        plan_courses = [graph.index_of_code[code] for code in graph.codes_of(needed)]
+        heights = self._remaining_heights(graph, needed)
+
+        credits = sum(int(graph.credits[idx]) for idx in plan_courses)
+        lower_bound = max(
+            -(-credits // max_credits) if credits else 0,
+            max((heights[idx] + 1 for idx in plan_courses), default=0)
+        )
+
+        terms = None
+        for term_count in range(lower_bound, lower_bound + PLAN_SEARCH_SLACK + 1):
+            terms = self._assign_terms(graph, plan_courses, heights, completed, max_credits, term_count)
+            if terms is not None:
+                break
+        else:
+            terms = self._assign_terms(graph, plan_courses, heights, completed, max_credits, None)
+
+        semesters = []
+        for offset, term in enumerate(terms):
+            schedule = [self._plan_entry(graph, idx, added) for idx in term]
+            term_credits = sum(c['credits'] for c in schedule)
+            warnings = []
+            if offset < len(terms) - 1:
+                warnings = self._analyze_workload(schedule)
+                if term_credits < min_credits:
+                    warnings.append({
+                        'level': 'info',
+                        'message': f'Below the {min_credits}-credit minimum for this load: '
+                                   'too few courses have their prerequisites met.'
+                    })
+
+            semesters.append({
+                'semester': _semester_label(semester, offset),
+                'total_credits': term_credits,
+                'courses': schedule,
+                'warnings': warnings
+            })
+
+        return {
+            'semesters': semesters,
+            'total_semesters': len(semesters),
+            'total_credits': credits,
+            'minimum_semesters': lower_bound,
+            'credit_range': [min_credits, max_credits],
+            'added_prerequisites': graph.codes_of(added),
+            'unschedulable': graph.codes_of(cyclic)
+        }
+
+    def _remaining_heights(self, graph, needed):
+        """Longest chain of still-needed courses after each needed course"""
+        heights = {}
+        for idx in reversed(graph.order):
+            if not needed >> idx & 1:
+                continue
+            heights[idx] = max(
+                (heights[nxt] + 1 for nxt in graph.unlocked_by(idx).tolist() if nxt in heights),
+                default=0
+            )
+        return heights
+
+    def _assign_terms(self, graph, plan_courses, heights, completed, max_credits, term_count):
+        """
+        List-schedule courses into terms
+
+        With term_count, a course must start by term term_count - 1 - height
+        for its dependents to fit; returns None as soon as one can't. With
+        term_count None the same priority order runs without a limit.
+        """
+        left = set(plan_courses)
+        done = completed
+        terms = []
+
+        def priority(idx):
+            latest = (term_count - 1 if term_count else 0) - heights[idx]
+            return (latest, -heights[idx], -int(graph.unlock_counts[idx]), -int(graph.credits[idx]), idx)
+
+        while left:
+            term = len(terms)
+            eligible = sorted((idx for idx in left if graph.prereq_mask[idx] & ~done == 0), key=priority)
+            if not eligible:
+                return None
+
+            chosen = []
+            term_credits = 0
+            heavy = 0
+            for idx in eligible:
+                course_credits = int(graph.credits[idx])
+                is_heavy = graph.workloads[idx] == 'Heavy'
+
+                # An empty term always takes its first course, even if oversized
+                if chosen and (term_credits + course_credits > max_credits or
+                               (is_heavy and heavy >= self.max_heavy_per_term)):
+                    continue
+
+                chosen.append(idx)
+                term_credits += course_credits
+                heavy += is_heavy
+
+            for idx in chosen:
+                left.discard(idx)
+                done |= 1 << idx
+            terms.append(chosen)
+
+            if term_count is not None:
+                if len(terms) > term_count:
+                    return None
+                # Anything that had to start this term but didn't can't finish in time
+                if any(term_count - 1 - heights[idx] <= term for idx in left):
+                    return None
+
+        return terms
+
+    def _plan_entry(self, graph, idx, added):
+        return {
+            'code': graph.codes[idx],
+            'name': graph.names[idx],
+            'credits': int(graph.credits[idx]),
+            'workload': graph.workloads[idx],
+            'category': graph.categories[idx],
+            'prerequisites': [graph.codes[p] for p in graph.prerequisites_of(idx).tolist()],
+            'prerequisites_met': True,
+            'required_by_degree': not added >> idx & 1
+        }
+
     def _filter_by_prerequisites(self, courses, completed_courses):
         """Filter courses by whether prerequisites are met"""
-        available = []
+        graph = get_prerequisite_graph(self.session)
+        completed = graph.mask_of(completed_courses)
+
+        # Check if all prerequisites are completed: one mask test per course
+        return [course for course in courses if graph.is_eligible(course.code, completed)]
 
-        for course in courses:
-            prereqs = [p.code for p in course.prerequisites_required]
+    def cohort_eligibility(self, students, course_codes=None):
+        """
+        Eligible courses for many students at once
 
-            # Check if all prerequisites are completed
-            if all(prereq in completed_courses for prereq in prereqs):
-                available.append(course)
+        Args:
+            students: List of {id, completed_courses} dicts
+            course_codes: Courses to consider (default: the whole catalog)
 
-        return available
+        Returns:
+            List of {id, eligible} dicts, eligible being course codes the
+            student hasn't taken and has every prerequisite for
+        """
+        graph = get_prerequisite_graph(self.session)
+        eligible, codes = graph.eligibility_matrix(
+            [student.get('completed_courses') or [] for student in students], course_codes
+        )
+
+        return [
+            {'id': student.get('id'), 'eligible': [codes[c] for c in np.flatnonzero(row).tolist()]}
+            for student, row in zip(students, eligible)
+        ]
 
     def _build_balanced_schedule(self, available_courses, min_credits, max_credits):
         """Build a balanced schedule within credit range"""
@@ -87,9 +298,10 @@ class ScheduleGenerator:
         workload_distribution = {'Heavy': 0, 'Moderate': 0, 'Light': 0}
 
         # Sort courses by importance (prerequisite to many others)
+        graph = get_prerequisite_graph(self.session)
         sorted_courses = sorted(
             available_courses,
-            key=lambda c: len(c.unlocks),
+            key=lambda c: graph.unlock_count(c.code),
             reverse=True
         )
 
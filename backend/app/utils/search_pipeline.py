@@ -0,0 +1,245 @@
+"""
+Pipelined multi-item product search
+Runs enhance, scrape and rank as concurrent stages joined by bounded queues
+"""
+import os
+import queue
+import threading
+import time
+from app.scrapers.product_scraper import scrape_products_with_timing
+from app.utils.gemini_search import enhance_search_queries
+from app.utils.product_batch import ProductBatch
+
+# Pipeline settings
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '8'))
+PIPELINE_ENHANCE_WORKERS = int(os.getenv('PIPELINE_ENHANCE_WORKERS', '4'))
+PIPELINE_SCRAPE_WORKERS = int(os.getenv('PIPELINE_SCRAPE_WORKERS', '8'))
+PIPELINE_RANK_WORKERS = int(os.getenv('PIPELINE_RANK_WORKERS', '2'))
+PIPELINE_ENHANCE_BATCH = int(os.getenv('PIPELINE_ENHANCE_BATCH', '25'))  # Items per Gemini request
+PIPELINE_ENHANCE_LINGER = float(os.getenv('PIPELINE_ENHANCE_LINGER', '0.01'))  # Seconds to wait for a fuller batch
+
+# Sentinel passed down a queue once its producer has finished
+_DONE = object()
+
+
+def rank_item_products(products, budget=None):
+    """
+    Order one item's products by price and apply the budget
+
+    With a budget, keep the 5 cheapest products that fit it, or the single
+    cheapest product if nothing does. No single product can use more than
+    the whole budget; fitting the full list is left to the budget optimizer.
+
+    Args:
+        products: ProductBatch for the item
+        budget: Budget (optional)
+    """
+    if not budget:
+        return products.sort_by_price()
+
+    affordable = products.filter(products.price <= budget)
+    if len(affordable):
+        return affordable.top_k(5)
+
+    # If nothing is affordable, include cheapest option anyway
+    return products.top_k(1)
+
+
+class SearchPipeline:
+    """
+    Three-stage search pipeline: enhance -> scrape -> rank
+
+    Every item of a shopping list flows through the stages independently, so
+    while one item is being scraped the next can already be enhanced and the
+    previous ranked. End-to-end latency for N items is close to that of one.
+
+    The enhance stage works on batches: enhance takes a list of queries and
+    returns the enhanced list, so a typical shopping list costs one Gemini
+    round trip instead of one per item.
+    """
+    def __init__(self, enhance=None, scrape=None, rank=None,
+                 enhance_workers=PIPELINE_ENHANCE_WORKERS,
+                 scrape_workers=PIPELINE_SCRAPE_WORKERS,
+                 rank_workers=PIPELINE_RANK_WORKERS,
+                 queue_size=PIPELINE_QUEUE_SIZE,
+                 enhance_batch=PIPELINE_ENHANCE_BATCH,
+                 enhance_linger=PIPELINE_ENHANCE_LINGER):
+        self.enhance = enhance or enhance_search_queries
+        self.scrape = scrape or scrape_products_with_timing
+        self.rank = rank or rank_item_products
+        self.enhance_workers = enhance_workers
+        self.scrape_workers = scrape_workers
+        self.rank_workers = rank_workers
+        self.queue_size = queue_size
+        self.enhance_batch = max(1, enhance_batch)
+        self.enhance_linger = enhance_linger
+
+    def run(self, items, user_location=None, budget=None, on_event=None):
+        """
+        Search for every item in a shopping list
+
+        Args:
+            items: List of item queries (e.g., ["notebooks", "pencils"])
+            user_location: User's location {lat, lng} (optional)
+            budget: Per-item budget (optional)
+            on_event: Optional callback(event, data) for progress, called
+                      from worker threads. Events are 'retailer' as each
+                      retailer answers for an item, and 'item' once an
+                      item has been ranked
+
+        Returns:
+            List of result dicts in item order, each with the original item,
+            the query used, the ranked products (a ProductBatch) and
+            per-retailer timings
+        """
+        if not items:
+            return []
+
+        results = [None] * len(items)
+
+        # Room for a full batch so one enhance worker can collect it
+        enhance_queue = queue.Queue(maxsize=max(self.queue_size, self.enhance_batch))
+        scrape_queue = queue.Queue(maxsize=self.queue_size)
+        rank_queue = queue.Queue(maxsize=self.queue_size)
+
+        def store_result(record):
+            results[record['index']] = record
+            if on_event:
+                on_event('item', record)
+
+        threads = []
+        threads += self._start_stage(
+            enhance_queue, scrape_queue, self._enhance_batch, self.enhance_workers,
+            len(items), batch_size=self.enhance_batch, linger=self.enhance_linger
+        )
+        threads += self._start_stage(
+            scrape_queue, rank_queue, lambda batch: [self._scrape_item(r, user_location, on_event) for r in batch],
+            self.scrape_workers, len(items)
+        )
+        threads += self._start_stage(
+            rank_queue, store_result, lambda batch: [self._rank_item(r, budget) for r in batch],
+            self.rank_workers, len(items)
+        )
+
+        # Feed items in; put() blocks while the enhance stage is backed up
+        for index, item in enumerate(items):
+            enhance_queue.put({'index': index, 'item': item, 'query': item,
+                               'products': ProductBatch.empty(), 'timings': {}})
+        enhance_queue.put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        # Items whose records were lost to a stage error come back empty
+        for index, item in enumerate(items):
+            if results[index] is None:
+                results[index] = {'index': index, 'item': item, 'query': item,
+                                  'products': ProductBatch.empty(), 'timings': {}}
+
+        return results
+
+    def _start_stage(self, inbox, outbox, handler, workers, item_count, batch_size=1, linger=0):
+        """
+        Start worker threads that move records from inbox through handler
+
+        Workers take up to batch_size records at a time (waiting up to linger
+        seconds for more after the first) and handler maps that list of
+        records to the processed list. outbox is either the next stage's queue
+        or a callable receiving finished records. Once every worker has seen
+        _DONE the stage passes _DONE on to its outbox.
+        """
+        workers = max(1, min(workers, item_count))
+        remaining = [workers]
+        lock = threading.Lock()
+
+        def collect():
+            record = inbox.get()
+            if record is _DONE:
+                return [], True
+
+            batch = [record]
+            linger_until = time.monotonic() + linger
+            while len(batch) < batch_size:
+                try:
+                    record = inbox.get(timeout=max(0, linger_until - time.monotonic()))
+                except queue.Empty:
+                    break
+                if record is _DONE:
+                    return batch, True
+                batch.append(record)
+
+            return batch, False
+
+        def worker():
+            done = False
+            try:
+                while not done:
+                    batch, done = collect()
+                    if not batch:
+                        continue
+
+                    # A failing batch (e.g. an on_event consumer that raises)
+                    # loses its records but must not stop the worker
+                    try:
+                        for record in handler(batch):
+                            if callable(outbox):
+                                outbox(record)
+                            else:
+                                outbox.put(record)
+                    except Exception as e:
+                        print(f"Error in search pipeline stage: {e}")
+            finally:
+                # Leave the sentinel for sibling workers
+                inbox.put(_DONE)
+
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+
+                if last and not callable(outbox):
+                    outbox.put(_DONE)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        return threads
+
+    def _enhance_batch(self, records):
+        items = [record['item'] for record in records]
+        try:
+            queries = self.enhance(items)
+        except Exception as e:
+            print(f"Error enhancing queries with Gemini: {e}")
+            queries = items
+
+        for idx, record in enumerate(records):
+            record['query'] = queries[idx] if idx < len(queries) else record['item']
+        return records
+
+    def _scrape_item(self, record, user_location, on_event=None):
+        kwargs = {}
+        if on_event:
+            def on_retailer(store, products, timing):
+                on_event('retailer', {
+                    'index': record['index'],
+                    'item': record['item'],
+                    'query': record['query'],
+                    'store': store,
+                    'products': products,
+                    'timing': timing
+                })
+            kwargs['on_retailer'] = on_retailer
+
+        try:
+            record['products'], record['timings'] = self.scrape(record['query'], user_location, **kwargs)
+        except Exception as e:
+            print(f"Error scraping products for {record['item']}: {e}")
+        return record
+
+    def _rank_item(self, record, budget):
+        try:
+            record['products'] = self.rank(record['products'], budget)
+        except Exception as e:
+            print(f"Error ranking products for {record['item']}: {e}")
+        return record
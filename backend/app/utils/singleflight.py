@@ -0,0 +1,125 @@
+"""
+Request coalescing
+Concurrent calls with the same key share one in-flight computation instead
+of each doing the same upstream work
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work by key
+
+    do() runs fn in the first caller's thread and blocks later callers with
+    the same key until it finishes; everyone gets the same result or
+    exception. submit() does the same for work run on an executor, handing
+    every caller the same Future so nobody ties up a worker thread waiting.
+    Nothing is remembered once a call finishes; caching is a separate layer.
+    """
+    def __init__(self):
+        self._calls = {}  # key -> _Call
+        self._futures = {}  # key -> [future, waiters]
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) unless a call with this key is in flight,
+        in which case wait for that call and return its result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def submit(self, key, executor, fn, *args, **kwargs):
+        """
+        Submit fn to executor unless a call with this key is in flight
+
+        Returns:
+            Tuple of (future, shared) where shared is True if the future
+            belongs to an earlier caller
+        """
+        with self._lock:
+            entry = self._futures.get(key)
+            if entry is not None:
+                entry[1] += 1
+                self.shared += 1
+                return entry[0], True
+
+            future = executor.submit(fn, *args, **kwargs)
+            self._futures[key] = [future, 1]
+            self.leaders += 1
+
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future, False
+
+    def abandon(self, key, future):
+        """
+        Stop waiting on a submitted future; it is cancelled only once every
+        caller sharing it has given up
+
+        A future that has not started is taken out of the in-flight map in
+        the same critical section that drops its last waiter, so a caller
+        arriving while it is being cancelled starts a fresh one instead of
+        joining it. A running future stays shared until it finishes.
+        """
+        with self._lock:
+            entry = self._futures.get(key)
+            if entry is None or entry[0] is not future:
+                return
+
+            entry[1] -= 1
+            if entry[1] > 0 or future.running():
+                return
+
+            del self._futures[key]
+
+        # Outside the lock: a successful cancel runs _forget synchronously
+        future.cancel()
+
+    def _forget(self, key, future):
+        with self._lock:
+            entry = self._futures.get(key)
+            if entry is not None and entry[0] is future:
+                del self._futures[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls) + len(self._futures),
+                'leaders': self.leaders,
+                'shared': self.shared
+            }
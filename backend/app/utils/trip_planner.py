@@ -0,0 +1,270 @@
+"""
+Trip planner
+Chooses which store to buy each item at and the order to visit those stores,
+minimizing total price plus a cost per mile driven
+"""
+import os
+import time
+import numpy as np
+from app.utils.route_optimizer import build_distance_matrix, group_stores
+from app.utils.route_solvers import held_karp_table, held_karp_order, local_search_path
+
+# Trip planning settings
+TRIP_COST_PER_MILE = float(os.getenv('TRIP_COST_PER_MILE', '0.50'))
+TRIP_EXACT_MAX_STOPS = int(os.getenv('TRIP_EXACT_MAX_STOPS', '15'))  # Candidate stores solved exactly
+TRIP_TIME_BUDGET_MS = float(os.getenv('TRIP_TIME_BUDGET_MS', '500'))  # Budget for larger candidate sets
+
+
+def _subset_min_prices(prices):
+    """
+    Cheapest price of every item over every subset of stores
+
+    Args:
+        prices: items x stores array (inf where a store doesn't carry an item)
+
+    Returns:
+        (2^stores) x items array; row mask holds each item's cheapest price
+        among the stores in mask
+    """
+    n_items, n_stores = prices.shape
+    table = np.full((1 << n_stores, n_items), np.inf)
+
+    # Masks in [2^b, 2^(b+1)) are the masks below 2^b plus store b
+    for b in range(n_stores):
+        low = 1 << b
+        table[low:low << 1] = np.minimum(table[:low], prices[:, b])
+
+    return table
+
+
+class TripPlanner:
+    """
+    Joint store selection and routing for a shopping list
+
+    The candidate table keeps only the cheapest product per (item, store
+    location). Stores that can't be part of a better plan than buying every
+    item at its cheapest store are pruned by a lower bound. Up to
+    TRIP_EXACT_MAX_STOPS remaining stores are solved exactly: one Held-Karp
+    table gives the route cost of every store subset and a subset-min table
+    gives its price, so every subset is scored in one vectorized pass.
+    Larger candidate sets use a drop/add/swap local search over the
+    candidate stores.
+    """
+    def __init__(self, products, user_location, cost_per_mile=None):
+        self.user_location = user_location
+        self.cost_per_mile = TRIP_COST_PER_MILE if cost_per_mile is None else float(cost_per_mile)
+
+        self.items = []
+        self.locations = []
+        self.unavailable = []
+        self._candidates = {}  # (item idx, location idx) -> cheapest product
+
+        self._build_candidates(products)
+
+    def _build_candidates(self, products):
+        item_index = {}
+        location_index = {}
+        seen_items = []
+
+        for product in products:
+            item = product.get('search_query') or product.get('name')
+            if item not in seen_items:
+                seen_items.append(item)
+
+            location = product.get('location')
+            if not location or product.get('price') is None:
+                continue
+
+            if item not in item_index:
+                item_index[item] = len(self.items)
+                self.items.append(item)
+
+            key = f"{location['lat']},{location['lng']}"
+            if key not in location_index:
+                location_index[key] = len(self.locations)
+                self.locations.append({'lat': location['lat'], 'lng': location['lng']})
+
+            # Dominance: only the cheapest product per item at a location matters
+            slot = (item_index[item], location_index[key])
+            current = self._candidates.get(slot)
+            if current is None or product['price'] < current['price']:
+                self._candidates[slot] = product
+
+        self.unavailable = [item for item in seen_items if item not in item_index]
+
+        self.prices = np.full((len(self.items), len(self.locations)), np.inf)
+        for (i, j), product in self._candidates.items():
+            self.prices[i, j] = product['price']
+
+    def plan(self, time_budget_ms=None):
+        """
+        Find the cheapest combination of purchases and route
+
+        Returns:
+            Dictionary with the selected products, the store visit order and
+            the price, distance and travel cost totals
+        """
+        if not self.items:
+            return self._result([], [], 0.0)
+
+        matrix = build_distance_matrix([self.user_location] + self.locations)
+
+        # Incumbent: buy every item where it's cheapest
+        cheapest = sorted(set(self.prices.argmin(axis=1).tolist()))
+        incumbent_stores, incumbent_order, incumbent_distance = self._route_for(
+            matrix, cheapest, time_budget_ms
+        )
+        incumbent_total = self._total(incumbent_stores, incumbent_distance)
+
+        # Any plan using store j pays at least the cheapest prices plus the
+        # drive from the start to j
+        price_floor = self.prices.min(axis=1).sum()
+        candidates = [
+            j for j in range(len(self.locations))
+            if j in cheapest or price_floor + self.cost_per_mile * matrix[0, j + 1] < incumbent_total
+        ]
+
+        if len(candidates) <= TRIP_EXACT_MAX_STOPS:
+            stores, order, distance = self._solve_exact(matrix, candidates)
+        else:
+            stores, order, distance = self._solve_local(matrix, candidates, time_budget_ms)
+
+        if self._total(stores, distance) > incumbent_total:
+            stores, order, distance = incumbent_stores, incumbent_order, incumbent_distance
+
+        return self._result(stores, order, distance)
+
+    def _solve_exact(self, matrix, candidates):
+        rows = [0] + [j + 1 for j in candidates]
+        sub_matrix = matrix[np.ix_(rows, rows)]
+
+        dp, parent = held_karp_table(sub_matrix)
+        route_costs = dp.min(axis=1)
+        route_costs[0] = 0.0
+
+        item_prices = _subset_min_prices(self.prices[:, candidates])
+
+        # Masks missing an item sum to inf and drop out of the argmin
+        totals = item_prices.sum(axis=1) + self.cost_per_mile * route_costs
+        mask = int(totals.argmin())
+
+        order, distance = held_karp_order(dp, parent, mask)
+        stores = [candidates[bit] for bit in range(len(candidates)) if mask >> bit & 1]
+        return stores, [candidates[idx - 1] for idx in order], distance
+
+    def _solve_local(self, matrix, candidates, time_budget_ms):
+        """
+        Local search over store sets drawn from candidates
+
+        Starts from every item's cheapest store and applies the first
+        improving move among dropping a store, adding a candidate store and
+        swapping a store for a candidate, until no move improves the total
+        or the time budget runs out. A move is only routed when its price
+        alone could still beat the best total.
+        """
+        budget_ms = time_budget_ms or TRIP_TIME_BUDGET_MS
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        step_budget = max(5.0, budget_ms / 20)
+
+        current = sorted(set(self.prices.argmin(axis=1).tolist()))
+        stores, order, distance = self._route_for(matrix, current, step_budget)
+        best_total = self._total(stores, distance)
+
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+
+            for trial_stores in self._neighbors(stores, candidates):
+                if time.perf_counter() >= deadline:
+                    break
+
+                price = self.prices[:, trial_stores].min(axis=1).sum()
+                if not np.isfinite(price) or price >= best_total:
+                    continue
+
+                trial = self._route_for(matrix, trial_stores, step_budget)
+                total = self._total(trial[0], trial[2])
+                if total < best_total - 1e-9:
+                    stores, order, distance = trial
+                    best_total = total
+                    improved = True
+                    break
+
+        return stores, order, distance
+
+    def _neighbors(self, stores, candidates):
+        """Store sets one drop, add or swap away from stores"""
+        outside = [c for c in candidates if c not in stores]
+
+        for j in stores:
+            if len(stores) > 1:
+                yield sorted(s for s in stores if s != j)
+        for c in outside:
+            yield sorted(stores + [c])
+        for j in stores:
+            for c in outside:
+                yield sorted([s for s in stores if s != j] + [c])
+
+    def _route_for(self, matrix, stores, time_budget_ms=None):
+        """Route through a fixed set of store locations"""
+        rows = [0] + [j + 1 for j in stores]
+        sub_matrix = matrix[np.ix_(rows, rows)]
+
+        if len(stores) <= TRIP_EXACT_MAX_STOPS:
+            dp, parent = held_karp_table(sub_matrix)
+            order, distance = held_karp_order(dp, parent, (1 << len(stores)) - 1)
+        else:
+            order, distance = local_search_path(sub_matrix, time_budget_ms or TRIP_TIME_BUDGET_MS)
+
+        return list(stores), [stores[idx - 1] for idx in order], distance
+
+    def _total(self, stores, distance):
+        price = self.prices[:, stores].min(axis=1).sum() if stores else np.inf
+        return float(price + self.cost_per_mile * distance)
+
+    def _result(self, stores, order, distance):
+        selected = []
+        if stores:
+            choices = np.array(stores)[self.prices[:, stores].argmin(axis=1)]
+            selected = [self._candidates[(i, int(j))] for i, j in enumerate(choices)]
+
+        # Lay the stores out in visit order
+        store_groups = {f"{s['lat']},{s['lng']}": s for s in group_stores(selected)}
+        route = []
+        for j in order:
+            key = f"{self.locations[j]['lat']},{self.locations[j]['lng']}"
+            if key in store_groups:
+                route.append(store_groups[key])
+
+        price = sum(p['price'] for p in selected)
+        travel_cost = self.cost_per_mile * distance
+
+        return {
+            'selected_products': selected,
+            'route': route,
+            'unavailable': self.unavailable,
+            'totals': {
+                'price': round(price, 2),
+                'distance': round(distance, 2),
+                'travel_cost': round(travel_cost, 2),
+                'total': round(price + travel_cost, 2)
+            },
+            'cost_per_mile': self.cost_per_mile
+        }
+
+
+def plan_trip(products, user_location, cost_per_mile=None, time_budget_ms=None):
+    """
+    Pick where to buy each item and the order to visit those stores
+
+    Args:
+        products: Candidate products for every item, each with search_query,
+                  price, store and location
+        user_location: User's starting location {lat, lng}
+        cost_per_mile: Dollar cost charged per mile driven
+        time_budget_ms: Time budget when too many stores to solve exactly
+
+    Returns:
+        Dictionary with selected_products, route, unavailable items and totals
+    """
+    return TripPlanner(products, user_location, cost_per_mile).plan(time_budget_ms)
@@ -0,0 +1,88 @@
+"""
+Haversine benchmark
+Times a scalar math-module haversine loop, the way distances were computed
+before the vectorized kernel, against haversine_one_to_many and
+haversine_matrix.
+
+Many-to-many is computed in row chunks so 10k x 10k points (800 MB as one
+float64 array) fits in memory; each chunk is reduced to its row minima
+and dropped. The scalar N x N loop is skipped above scalar_matrix_max.
+
+Run from backend/:
+    python -m bench.haversine
+"""
+import time
+from math import radians, sin, cos, sqrt, atan2
+import numpy as np
+from app.utils.geo import EARTH_RADIUS_MILES, haversine_one_to_many, haversine_matrix
+
+ORIGIN = (34.36, -89.52)
+
+
+def haversine_miles(lat1, lng1, lat2, lng2):
+    """Scalar great circle distance, as the scrapers and optimizer used to compute it"""
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
+
+    return EARTH_RADIUS_MILES * 2 * atan2(sqrt(a), sqrt(1-a))
+
+
+def chunked_nearest(lats, lngs, chunk=1000):
+    """Distance from every point to its nearest other point, chunk rows at a time"""
+    nearest = np.empty(len(lats))
+    for start in range(0, len(lats), chunk):
+        block = haversine_matrix(lats[start:start + chunk], lngs[start:start + chunk], lats, lngs)
+        block[np.arange(len(block)), np.arange(start, start + len(block))] = np.inf
+        nearest[start:start + chunk] = block.min(axis=1)
+    return nearest
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def benchmark_haversine(sizes=(10, 100, 1000, 10000), scalar_matrix_max=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for n in sizes:
+        lats = ORIGIN[0] + rng.uniform(-0.5, 0.5, n)
+        lngs = ORIGIN[1] + rng.uniform(-0.5, 0.5, n)
+        pairs = list(zip(lats.tolist(), lngs.tolist()))
+
+        started = time.perf_counter()
+        scalar = [haversine_miles(ORIGIN[0], ORIGIN[1], lat, lng) for lat, lng in pairs]
+        scalar_ms = _elapsed_ms(started)
+
+        started = time.perf_counter()
+        vector = haversine_one_to_many(ORIGIN[0], ORIGIN[1], lats, lngs)
+        vector_ms = _elapsed_ms(started)
+        assert np.allclose(scalar, vector)
+
+        scalar_matrix_ms = None
+        if n <= scalar_matrix_max:
+            started = time.perf_counter()
+            for lat1, lng1 in pairs:
+                for lat2, lng2 in pairs:
+                    haversine_miles(lat1, lng1, lat2, lng2)
+            scalar_matrix_ms = _elapsed_ms(started)
+
+        started = time.perf_counter()
+        chunked_nearest(lats, lngs)
+        matrix_ms = _elapsed_ms(started)
+
+        rows.append({'points': n, 'scalar_ms': scalar_ms, 'vector_ms': vector_ms,
+                     'scalar_matrix_ms': scalar_matrix_ms, 'matrix_ms': matrix_ms})
+
+    return rows
+
+
+if __name__ == '__main__':
+    print(f"{'points':>7} {'scalar 1:N ms':>14} {'numpy 1:N ms':>13} {'scalar NxN ms':>14} {'numpy NxN ms':>13}")
+    for row in benchmark_haversine():
+        scalar_matrix = f"{row['scalar_matrix_ms']:.1f}" if row['scalar_matrix_ms'] is not None else '-'
+        print(f"{row['points']:>7} {row['scalar_ms']:>14.2f} {row['vector_ms']:>13.3f} "
+              f"{scalar_matrix:>14} {row['matrix_ms']:>13.1f}")
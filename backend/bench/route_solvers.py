@@ -0,0 +1,155 @@
+"""
+Route solver benchmark
+Times the Held-Karp solver against the original A* route search on random
+store sets around one point.
+
+The original solver is copied below as it was before the distance matrix
+and Held-Karp changes: A* over frozenset states with a haversine MST
+heuristic recomputed at every expansion. Google Maps is left out so both
+solvers see the same straight-line distances.
+
+Run from backend/:
+    python -m bench.route_solvers
+"""
+import heapq
+import random
+import time
+from math import radians, sin, cos, sqrt, atan2
+from app.utils.geo import location_arrays, haversine_matrix
+from app.utils.route_solvers import held_karp_path, path_cost
+
+
+def haversine_distance(coord1, coord2):
+    lat1, lon1, lat2, lon2 = map(radians, [coord1['lat'], coord1['lng'], coord2['lat'], coord2['lng']])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 3959 * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+class BaselineNode:
+    def __init__(self, location, stores_visited, g_cost, h_cost, parent=None):
+        self.location = location
+        self.stores_visited = frozenset(stores_visited)
+        self.g_cost = g_cost
+        self.h_cost = h_cost
+        self.f_cost = g_cost + h_cost
+        self.parent = parent
+
+    def __lt__(self, other):
+        return self.f_cost < other.f_cost
+
+
+def baseline_mst_cost(start, stores):
+    if not stores:
+        return 0
+
+    visited = set()
+    min_cost = 0
+    current = min(stores, key=lambda s: haversine_distance(start, s))
+    visited.add(id(current))
+
+    while len(visited) < len(stores):
+        min_edge = float('inf')
+        next_store = None
+
+        for v_store in [s for s in stores if id(s) in visited]:
+            for u_store in [s for s in stores if id(s) not in visited]:
+                edge_cost = haversine_distance(v_store, u_store)
+                if edge_cost < min_edge:
+                    min_edge = edge_cost
+                    next_store = u_store
+
+        if next_store:
+            min_cost += min_edge
+            visited.add(id(next_store))
+        else:
+            break
+
+    return min_cost
+
+
+def baseline_astar(user_location, stores):
+    """The original A* search; returns store indices 1..n in visit order"""
+    start_node = BaselineNode(user_location, set(), 0, baseline_mst_cost(user_location, stores))
+
+    open_set = [start_node]
+    closed_set = set()
+    best_node = None
+    best_cost = float('inf')
+
+    while open_set:
+        current = heapq.heappop(open_set)
+
+        if len(current.stores_visited) == len(stores):
+            if current.g_cost < best_cost:
+                best_cost = current.g_cost
+                best_node = current
+            continue
+
+        state = (str(current.location), current.stores_visited)
+        if state in closed_set:
+            continue
+        closed_set.add(state)
+
+        for idx, store in enumerate(stores):
+            if idx in current.stores_visited:
+                continue
+
+            new_g_cost = current.g_cost + haversine_distance(current.location, store)
+            unvisited = [s for i, s in enumerate(stores) if i not in current.stores_visited and i != idx]
+            h_cost = baseline_mst_cost(store, unvisited) if unvisited else 0
+
+            heapq.heappush(open_set, BaselineNode(
+                store, set(current.stores_visited) | {idx}, new_g_cost, h_cost, (current, idx)
+            ))
+
+    order = []
+    node = best_node
+    while node is not None and node.parent:
+        node, idx = node.parent
+        order.append(idx + 1)
+
+    return list(reversed(order))
+
+
+def benchmark_solvers(sizes=(4, 5, 6, 7, 8, 10, 12, 15), astar_max=8, seed=0):
+    """
+    Time Held-Karp against the original A* on the same random points
+
+    The original A* is only run up to astar_max stores; beyond that it
+    takes too long to be worth waiting for.
+    """
+    rng = random.Random(seed)
+    rows = []
+
+    for n in sizes:
+        points = [{'lat': 34.36 + rng.uniform(-0.1, 0.1), 'lng': -89.52 + rng.uniform(-0.1, 0.1)}
+                  for _ in range(n + 1)]
+        matrix = haversine_matrix(*location_arrays(points))
+
+        started = time.perf_counter()
+        _, hk_cost = held_karp_path(matrix)
+        hk_ms = (time.perf_counter() - started) * 1000
+
+        astar_ms = astar_cost = None
+        if n <= astar_max:
+            started = time.perf_counter()
+            order = baseline_astar(points[0], points[1:])
+            astar_ms = (time.perf_counter() - started) * 1000
+            astar_cost = path_cost(matrix, order)
+
+        rows.append({'stores': n, 'held_karp_ms': hk_ms, 'astar_ms': astar_ms,
+                     'held_karp_cost': hk_cost, 'astar_cost': astar_cost})
+
+    return rows
+
+
+if __name__ == '__main__':
+    print(f"{'stores':>6} {'held-karp ms':>13} {'original a* ms':>15} {'speedup':>8} {'same cost':>10}")
+    for row in benchmark_solvers():
+        if row['astar_ms'] is None:
+            print(f"{row['stores']:>6} {row['held_karp_ms']:>13.1f} {'-':>15} {'-':>8} {'-':>10}")
+            continue
+        speedup = row['astar_ms'] / row['held_karp_ms']
+        same = abs(row['astar_cost'] - row['held_karp_cost']) < 1e-6
+        print(f"{row['stores']:>6} {row['held_karp_ms']:>13.1f} {row['astar_ms']:>15.1f} "
+              f"{speedup:>7.0f}x {str(same):>10}")
@@ -0,0 +1,32 @@
+"""
+Shared fixtures
+"""
+import pytest
+from app.models.database import dispose_engine, init_db
+from app.scrapers.catalog_scraper import OleMissCatalogScraper
+from app.utils.prereq_graph import invalidate_prerequisite_graph
+
+
+@pytest.fixture
+def catalog_db(tmp_path, monkeypatch):
+    """SQLite database populated with the sample catalog; yields its URL"""
+    url = f"sqlite:///{tmp_path / 'catalog.db'}"
+    monkeypatch.setenv('DATABASE_URL', url)
+    dispose_engine()
+    invalidate_prerequisite_graph()
+
+    init_db()
+    OleMissCatalogScraper().populate_database()
+    yield url
+
+    dispose_engine()
+    invalidate_prerequisite_graph()
+
+
+@pytest.fixture
+def client(catalog_db):
+    from app import create_app
+
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
@@ -0,0 +1,67 @@
+"""
+Tests for the shopping list budget optimizer
+"""
+import itertools
+from app.utils.budget_optimizer import optimize_budget, pareto_options
+
+
+def _product(name, price, distance=None):
+    product = {'name': name, 'price': price}
+    if distance is not None:
+        product['distance'] = distance
+    return product
+
+
+ITEMS = {
+    'milk': [_product('milk a', 3.0, 2.0), _product('milk b', 4.0, 1.0), _product('milk c', 5.0, 0.5)],
+    'eggs': [_product('eggs a', 2.0, 3.0), _product('eggs b', 2.5, 1.0)],
+}
+
+
+def test_feasible_plan_is_cheapest_basket_within_budget():
+    plan = optimize_budget(ITEMS, budget=6.0)
+
+    assert plan['feasible']
+    assert [p['name'] for p in plan['basket']['products']] == ['milk a', 'eggs a']
+    assert plan['basket']['total_price'] == 5.0
+    assert plan['basket']['remaining_budget'] == 1.0
+
+
+def test_infeasible_budget_returns_cheapest_basket_flagged():
+    plan = optimize_budget(ITEMS, budget=4.0)
+
+    assert not plan['feasible']
+    assert plan['basket']['total_price'] == 5.0
+    assert plan['basket']['remaining_budget'] == -1.0
+    assert plan['alternatives'] == []
+
+
+def test_alternatives_follow_total_price_order():
+    plan = optimize_budget(ITEMS, budget=100.0, alternatives=5)
+    totals = [plan['basket']['total_price']] + [b['total_price'] for b in plan['alternatives']]
+
+    expected = sorted(
+        sum(choice) for choice in itertools.product(
+            *[[p['price'] for p in pareto_options(products)] for products in ITEMS.values()]
+        )
+    )
+    assert totals == expected
+
+
+def test_missing_distance_is_unknown_not_zero():
+    products = [_product('near', 2.0, 1.0), _product('unknown', 3.0), _product('far', 1.5, 4.0)]
+
+    options = pareto_options(products)
+
+    # A pricier product of unknown distance is not treated as the nearest
+    assert [p['name'] for p in options] == ['far', 'near']
+
+
+def test_unknown_distance_kept_when_cheapest():
+    products = [_product('unknown', 1.0), _product('near', 2.0, 1.0)]
+
+    plan = optimize_budget({'milk': products}, budget=10.0)
+
+    assert [p['name'] for p in pareto_options(products)] == ['unknown', 'near']
+    assert plan['basket']['total_distance'] is None
+    assert plan['alternatives'][0]['total_distance'] == 1.0
@@ -0,0 +1,76 @@
+"""
+Tests for the SQLite cache tier
+"""
+import sqlite3
+import time
+from app.utils.cache import LRUCache, SQLiteCache, TieredCache
+
+
+def _rows(cache):
+    conn = sqlite3.connect(cache.path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {cache.table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_purge_expired_removes_only_expired_rows(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), purge_every=0)
+    cache.set('old', 1, ttl=0.01)
+    cache.set('new', 2, ttl=60)
+    time.sleep(0.02)
+
+    assert cache.purge_expired() == 1
+    assert _rows(cache) == 1
+    assert cache.get('new') == 2
+
+
+def test_writes_purge_expired_rows_periodically(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), purge_every=10)
+    for idx in range(9):
+        cache.set(f'old{idx}', idx, ttl=0.01)
+    time.sleep(0.02)
+    assert _rows(cache) == 9
+
+    # The tenth write triggers a purge
+    cache.set('new', 'value', ttl=60)
+    assert _rows(cache) == 1
+    assert cache.stats()['purged'] == 9
+
+
+def test_expired_read_deletes_row(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), purge_every=0)
+    tiered = TieredCache(LRUCache(maxsize=8), cache)
+    cache.set('key', 'value', ttl=0.01)
+    time.sleep(0.02)
+
+    assert tiered.get('key') is None
+    assert _rows(cache) == 0
+
+
+def test_promoted_entry_keeps_its_disk_expiry(tmp_path):
+    disk = SQLiteCache(str(tmp_path / 'cache.db'), purge_every=0)
+    tiered = TieredCache(LRUCache(maxsize=8, ttl=3600), disk)
+    disk.set('key', 'value', ttl=0.05)
+
+    assert tiered.get('key') == 'value'
+    time.sleep(0.06)
+    # The memory copy expires with the disk row, not an hour later
+    assert tiered.get('key') is None
+
+
+def test_lru_evicts_least_recently_used_and_expires_entries():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+    cache.set('short', 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('short') is None
+    assert cache.stats()['hits'] == 3
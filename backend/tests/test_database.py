@@ -0,0 +1,72 @@
+"""
+Tests for the shared engine and per-thread session registry
+"""
+import threading
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, StaticPool
+from app.models import database
+from app.models.database import dispose_engine, get_engine, get_session, remove_session
+
+
+def _in_threads(target, count=8):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(slot):
+        barrier.wait()
+        results[slot] = target()
+
+    threads = [threading.Thread(target=run, args=(slot,)) for slot in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_engine_is_created_once_per_process(catalog_db):
+    dispose_engine()
+
+    engines = _in_threads(get_engine)
+
+    assert len({id(engine) for engine in engines}) == 1
+    assert isinstance(engines[0].pool, QueuePool)
+
+
+def test_sessions_are_per_thread_until_removed(catalog_db):
+    session = get_session()
+    assert get_session() is session
+
+    def thread_session():
+        other = get_session()
+        remove_session()
+        return other
+
+    assert all(other is not session for other in _in_threads(thread_session, 4))
+
+    remove_session()
+    assert get_session() is not session
+
+
+def test_requests_return_their_session(client):
+    response = client.get('/api/majors')
+
+    assert response.status_code == 200
+    assert not database.db_session.registry.has()
+    assert get_engine().pool.checkedout() == 0
+
+
+def test_sqlite_files_use_write_ahead_logging(catalog_db):
+    with get_engine().connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+
+
+def test_in_memory_database_shares_one_connection(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite://')
+    dispose_engine()
+    try:
+        engine = get_engine()
+        assert isinstance(engine.pool, StaticPool)
+        assert get_session().get_bind() is engine
+    finally:
+        dispose_engine()
@@ -0,0 +1,70 @@
+"""
+Tests for the degree planning endpoints
+"""
+import warnings
+from app.models.database import (
+    Course, Major, bump_catalog_version, count_queries, get_engine, get_session, remove_session
+)
+
+# Statements one /degree-requirements request runs, whatever the size of
+# the degree: the major, its courses, their prerequisites and unlocks, the
+# GenEd requirements and the catalog version. The first request after a
+# catalog change also reads courses and prerequisites to compile the graph
+DEGREE_REQUIREMENTS_QUERIES = 6
+GRAPH_BUILD_QUERIES = 2
+
+
+def _add_chained_courses(count):
+    session = get_session()
+    major = session.get(Major, 1)
+    previous = session.query(Course).filter_by(code='CSCI 211').one()
+
+    for idx in range(count):
+        course = Course(
+            code=f'CSCI {600 + idx}', name=f'Topic {idx}', credits=3,
+            workload='Moderate', category='Core', prerequisites_required=[previous]
+        )
+        session.add(course)
+        major.required_courses.append(course)
+        previous = course
+
+    bump_catalog_version(session)
+    session.commit()
+    remove_session()
+
+
+def _count_degree_requirements(client):
+    body = {'major_id': 1, 'classification': 'Sophomore'}
+    counts = []
+    for _ in range(2):
+        with count_queries(get_engine()) as queries:
+            response = client.post('/api/degree-requirements', json=body)
+        assert response.status_code == 200
+        counts.append(queries.count)
+    return counts, response.json
+
+
+def test_degree_requirements_query_count_is_fixed(client):
+    small, analysis = _count_degree_requirements(client)
+    _add_chained_courses(200)
+    large, larger_analysis = _count_degree_requirements(client)
+
+    assert len(larger_analysis['courses']['major']) == len(analysis['courses']['major']) + 200
+    expected = [DEGREE_REQUIREMENTS_QUERIES + GRAPH_BUILD_QUERIES, DEGREE_REQUIREMENTS_QUERIES]
+    assert small == large == expected
+
+
+def test_degree_endpoints_reject_missing_or_malformed_ids(client):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        for body in ({}, {'major_id': None}, {'major_id': 'abc'}, {'major_id': 1.5},
+                     {'major_id': True}, {'major_id': 1, 'minor_id': 'x'}):
+            for url in ('/api/degree-requirements', '/api/generate-schedule', '/api/generate-plan'):
+                response = client.post(url, json=body)
+                assert response.status_code == 400, (url, body)
+
+
+def test_degree_endpoints_accept_string_ids(client):
+    # The schedule builder page sends the id it read from a <select>
+    assert client.post('/api/generate-schedule', json={'major_id': '1'}).status_code == 200
+    assert client.post('/api/degree-requirements', json={'major_id': 99}).status_code == 404
@@ -0,0 +1,99 @@
+"""
+Tests for the Gemini helpers, with the model replaced by a stub
+"""
+import pytest
+from app.utils import gemini_search
+from app.utils.gemini_search import enhance_search_queries, match_products
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Record prompts and answer them from a queue of canned responses"""
+    calls = []
+    responses = []
+
+    def generate_text(prompt):
+        calls.append(prompt)
+        return responses.pop(0)
+
+    monkeypatch.setattr(gemini_search, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(gemini_search, 'generate_text', generate_text)
+    return calls, responses
+
+
+def test_whole_list_is_enhanced_in_one_request(gemini):
+    calls, responses = gemini
+    responses.append('```json\n["BIC ballpoint pens", "Five Star notebooks", "Ticonderoga pencils"]\n```')
+
+    enhanced = enhance_search_queries(['pens', 'notebooks', 'pencils'])
+
+    assert enhanced == ['BIC ballpoint pens', 'Five Star notebooks', 'Ticonderoga pencils']
+    assert len(calls) == 1
+    assert '2. pencils' in calls[0]
+
+
+def test_unusable_answers_keep_the_original_query(gemini):
+    _, responses = gemini
+    responses.append('["", 42, "' + 'word ' * 20 + '"]')
+
+    assert enhance_search_queries(['pens', 'glue', 'tape', 'paper']) == ['pens', 'glue', 'tape', 'paper']
+
+
+def test_malformed_response_keeps_every_query(gemini):
+    _, responses = gemini
+    responses.append('Sorry, I can only help with one query at a time.')
+
+    assert enhance_search_queries(['pens', 'glue']) == ['pens', 'glue']
+
+
+def test_no_request_without_api_key(gemini, monkeypatch):
+    calls, _ = gemini
+    monkeypatch.setattr(gemini_search, 'GEMINI_API_KEY', None)
+
+    assert enhance_search_queries(['pens']) == ['pens']
+    assert calls == []
+
+
+PRODUCTS = [
+    {'name': 'Spiral Notebook', 'price': 2.0, 'store': 'A'},
+    {'name': 'Glue Stick', 'price': 1.0, 'store': 'B'},
+    {'name': 'Composition Notebook Notebook', 'price': 3.0, 'store': 'C'},
+]
+
+
+def test_matching_is_local_by_default(gemini, monkeypatch):
+    calls, _ = gemini
+    monkeypatch.setattr(gemini_search, 'MATCH_RERANK_TOP_K', 0)
+
+    ranked = match_products(['notebooks'], PRODUCTS)
+
+    assert [p['store'] for p in ranked] == ['C', 'A', 'B']
+    assert calls == []
+
+
+def test_gemini_only_reorders_the_top_matches(gemini, monkeypatch):
+    calls, responses = gemini
+    monkeypatch.setattr(gemini_search, 'MATCH_RERANK_TOP_K', 5)
+    responses.append('1, 0')
+
+    ranked = match_products(['notebooks'], PRODUCTS)
+
+    # Only the two products matching a query term are sent
+    assert [p['store'] for p in ranked] == ['A', 'C', 'B']
+    assert 'Glue Stick' not in calls[0]
+
+
+def test_only_ambiguous_pairs_go_to_gemini_in_one_request(gemini, monkeypatch):
+    calls, responses = gemini
+    monkeypatch.setattr(gemini_search, 'MATCH_ACCEPT_SCORE', 1.0)
+    monkeypatch.setattr(gemini_search, 'MATCH_REJECT_SCORE', 0.0)
+    responses.append('[false]')
+
+    names = ['Black Pens', 'Blue Pens', 'Red Pencil', 'Glue Stick']
+    matches, scores = gemini_search.match_matrix(names, ['black pens', 'pencil'])
+
+    # Only "Blue Pens" for "black pens" is half covered; Gemini overrides the fallback
+    assert len(calls) == 1
+    assert calls[0].count('Search:') == 1
+    assert matches.tolist() == [[True, False], [False, False], [False, True], [False, False]]
+    assert scores[1, 0] == 0.5
@@ -0,0 +1,35 @@
+"""
+Tests for the geohash and distance helpers
+"""
+from app.utils.geo import geohash_bbox, geohash_encode, geohash_neighbors, location_tile
+
+
+def test_geohash_matches_reference_values():
+    assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert geohash_encode(42.6, -5.6, 5) == 'ezs42'
+
+
+def test_location_tile_needs_both_coordinates():
+    assert location_tile({'lat': '42.6', 'lng': '-5.6'}) == 'ezs42'
+    assert location_tile({'lat': 42.6}) is None
+    assert location_tile(None) is None
+
+
+def test_geohash_neighbors_surround_the_cell():
+    cell = geohash_encode(34.3665, -89.5192, 5)
+    neighbors = geohash_neighbors(cell)
+    min_lat, max_lat, min_lng, max_lng = geohash_bbox(cell)
+
+    assert len(set(neighbors)) == 9 and cell in neighbors
+    for other in neighbors:
+        lat0, lat1, lng0, lng1 = geohash_bbox(other)
+        # Each neighbor shares an edge or a corner with the cell
+        assert lat0 <= max_lat + 1e-9 and lat1 >= min_lat - 1e-9
+        assert lng0 <= max_lng + 1e-9 and lng1 >= min_lng - 1e-9
+
+
+def test_geohash_neighbors_wrap_the_antimeridian_and_stop_at_the_poles():
+    east = geohash_encode(0.0, 179.99, 4)
+    assert any(geohash_bbox(cell)[2] < 0 for cell in geohash_neighbors(east))
+
+    assert len(geohash_neighbors(geohash_encode(89.99, 0.0, 4))) == 6
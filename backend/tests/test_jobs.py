@@ -0,0 +1,65 @@
+"""
+Tests for the background job manager
+"""
+import threading
+import time
+from app.utils.jobs import Job, JobManager
+
+
+def _wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.001)
+    assert job.finished
+
+
+def test_failed_job_records_error():
+    manager = JobManager(workers=1)
+
+    def handler(job):
+        raise ValueError('boom')
+
+    job, created = manager.submit('search', {'items': ['x']}, handler)
+    _wait(job)
+
+    assert created
+    assert job.to_dict()['status'] == 'error'
+    assert job.error == 'boom'
+    assert job.finished_at is not None
+
+
+def test_finished_jobs_always_have_finished_at():
+    job = Job('key', 'search', {})
+    job.status = 'done'
+
+    # A status set without finished_at must not count as finished
+    assert not job.finished
+
+
+def test_submit_while_a_job_is_finishing(monkeypatch):
+    # Hold the worker at the moment it stamps finish time, then submit from
+    # this thread so eviction runs in the middle of the job's final update
+    manager = JobManager(workers=1, result_ttl=0)
+    real_time = time.time
+    in_window = threading.Event()
+    release = threading.Event()
+
+    def paused_time():
+        if threading.current_thread().name.startswith('job') and not release.is_set():
+            in_window.set()
+            release.wait(5)
+        return real_time()
+
+    monkeypatch.setattr(time, 'time', paused_time)
+
+    first, _ = manager.submit('search', {'n': 1}, lambda job: 'first')
+    assert in_window.wait(5)
+
+    second, created = manager.submit('search', {'n': 2}, lambda job: 'second')
+    release.set()
+    _wait(first)
+    _wait(second)
+
+    assert created
+    assert first.status == 'done' and first.result == 'first'
+    assert second.result == 'second'
@@ -0,0 +1,90 @@
+"""
+Tests for the compiled prerequisite graph
+"""
+import os
+import random
+import subprocess
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.models.database import Course, bump_catalog_version, get_session, remove_session
+from app.utils.prereq_graph import PrerequisiteGraph, get_prerequisite_graph
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _graph_for_request():
+    # Each request gets a fresh session from the registry
+    remove_session()
+    return get_prerequisite_graph(get_session())
+
+
+def test_graph_is_shared_until_the_catalog_changes(catalog_db):
+    graph = _graph_for_request()
+    assert graph.is_eligible('CSCI 112', graph.mask_of(['CSCI 111']))
+    assert _graph_for_request() is graph
+
+
+def test_graph_rebuilds_after_change_through_another_engine(catalog_db):
+    graph = _graph_for_request()
+    assert 'CSCI 311' not in graph.index_of_code
+
+    # Another process edits the catalog through its own engine
+    engine = create_engine(catalog_db)
+    with Session(engine) as other:
+        prereq = other.query(Course).filter_by(code='CSCI 211').one()
+        other.add(Course(code='CSCI 311', name='Systems', credits=3, prerequisites_required=[prereq]))
+        bump_catalog_version(other)
+        other.commit()
+    engine.dispose()
+
+    rebuilt = _graph_for_request()
+    assert rebuilt is not graph
+    assert rebuilt.is_eligible('CSCI 311', rebuilt.mask_of(['CSCI 211']))
+    assert 'CSCI 311' in rebuilt.eventually_unlocks('CSCI 111')
+
+
+def test_graph_rebuilds_after_repopulating_from_the_command_line(catalog_db):
+    graph = _graph_for_request()
+
+    subprocess.run(
+        [sys.executable, '-m', 'app.scrapers.catalog_scraper'],
+        cwd=BACKEND_DIR, env={**os.environ, 'DATABASE_URL': catalog_db},
+        check=True, capture_output=True
+    )
+
+    rebuilt = _graph_for_request()
+    assert rebuilt is not graph
+    assert rebuilt.version == graph.version + 1
+    assert rebuilt.codes == graph.codes
+
+
+def test_eligibility_matrix_matches_is_eligible():
+    rng = random.Random(7)
+    # More than two 64-bit words of courses, prerequisites on earlier courses only
+    size = 150
+    courses = [(idx + 1, f'C {idx}', f'Course {idx}', 3, None, None) for idx in range(size)]
+    edges = [
+        (idx + 1, prereq + 1)
+        for idx in range(1, size)
+        for prereq in rng.sample(range(idx), min(idx, rng.randint(0, 3)))
+    ]
+    graph = PrerequisiteGraph(courses, edges)
+
+    completed_sets = [
+        rng.sample(graph.codes, rng.randint(0, size)) + ['UNKNOWN 1']
+        for _ in range(40)
+    ] + [[]]
+    checked = rng.sample(graph.codes, 60) + ['UNKNOWN 2']
+
+    for include_completed in (False, True):
+        eligible, codes = graph.eligibility_matrix(completed_sets, checked, include_completed)
+        assert codes == checked[:-1]
+
+        for row, completed in zip(eligible, completed_sets):
+            mask = graph.mask_of(completed)
+            expected = [
+                graph.is_eligible(code, mask) and (include_completed or code not in completed)
+                for code in codes
+            ]
+            assert row.tolist() == expected
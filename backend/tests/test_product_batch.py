@@ -0,0 +1,35 @@
+"""
+Tests for product records and batches
+"""
+from app.scrapers.product_scraper import _timed_scrape
+from app.utils.product_batch import Product, ProductBatch
+
+
+class _Adapter:
+    store = 'Test Store'
+    cache_ttl = 60
+    stale_ttl = 60
+
+    def search(self, query, user_location):
+        return [
+            {'name': 'Notebook', 'price': 2.5, 'store': self.store},
+            {'name': 'Broken listing', 'price': None, 'store': self.store},
+            {'name': 'Odd listing', 'price': 'see store', 'store': self.store},
+            {'name': 'Binder', 'price': '$1,299.00', 'store': self.store},
+        ]
+
+
+def test_bad_prices_are_skipped_not_fatal():
+    records, status, _ = _timed_scrape(_Adapter(), 'notebook', None)
+    assert status == 'ok'
+
+    batch = ProductBatch.from_records(records, 'notebook')
+    assert batch.names == ['Notebook', 'Binder']
+    assert batch.price.tolist() == [2.5, 1299.0]
+
+
+def test_record_round_trip_keeps_extra_fields():
+    data = {'name': 'Pen', 'price': 1, 'store': 'S', 'image': None, 'location': None, 'rating': 4.5}
+    product = Product.from_dict(data)
+    assert product.price == 1.0
+    assert product.to_dict() == data
@@ -0,0 +1,194 @@
+"""
+Tests for the concurrent retailer scraper
+"""
+from concurrent.futures import Future
+import json
+import threading
+import time
+import pytest
+from app.scrapers import http_client, product_scraper
+from app.scrapers.product_scraper import (
+    ADAPTER_TYPES, RetailerAdapter, build_retailer_adapters, load_retailer_config,
+    register_adapter, scrape_products_with_timing
+)
+
+
+class FakeAdapter(RetailerAdapter):
+    """Adapter returning fixed listings, optionally after a delay or an error"""
+    def __init__(self, store, prices=(1.0,), delay=0.0, error=None, **options):
+        super().__init__(store, **options)
+        self.prices = prices
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        # Set to end a delay early
+        self.release = threading.Event()
+
+    def search(self, query, user_location):
+        self.calls += 1
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return [{'name': f'{query} {self.store} {idx}', 'price': price, 'store': self.store}
+                for idx, price in enumerate(self.prices)]
+
+
+@pytest.fixture
+def adapters(monkeypatch):
+    """Replace the configured retailers with the adapters a test appends"""
+    configured = []
+    monkeypatch.setattr(product_scraper, '_retailer_adapters', configured)
+    product_scraper.product_cache.clear()
+    yield configured
+    for adapter in configured:
+        adapter.release.set()
+    product_scraper.product_cache.clear()
+
+
+def test_cancelled_shared_scrape_is_reported_not_raised(adapters, monkeypatch):
+    adapters.append(FakeAdapter('Store'))
+    cancelled = Future()
+    cancelled.cancel()
+    cancelled.set_running_or_notify_cancel()
+    monkeypatch.setattr(product_scraper.scrape_flight, 'submit', lambda *args, **kwargs: (cancelled, True))
+
+    products, timings = scrape_products_with_timing('pens')
+
+    assert len(products) == 0
+    assert timings['Store']['status'] == 'error'
+
+
+def test_slow_retailer_times_out_without_holding_back_the_others(adapters):
+    adapters.extend([
+        FakeAdapter('Fast', prices=(3.0, 1.0)),
+        FakeAdapter('Slow', prices=(0.5,), delay=5.0),
+        FakeAdapter('Broken', error=RuntimeError('blocked')),
+    ])
+
+    started = time.monotonic()
+    products, timings = scrape_products_with_timing('pens', deadline=0.2)
+
+    assert time.monotonic() - started < 2.0
+    assert products.price.tolist() == [1.0, 3.0]
+    assert {store: t['status'] for store, t in timings.items()} == \
+        {'Fast': 'ok', 'Slow': 'timeout', 'Broken': 'error'}
+
+
+def test_deadline_is_per_retailer(adapters):
+    adapters.extend([
+        FakeAdapter('Patient', delay=0.3, deadline=2.0),
+        FakeAdapter('Hasty', delay=0.3, deadline=0.05),
+    ])
+
+    products, timings = scrape_products_with_timing('pens')
+
+    assert timings['Patient']['status'] == 'ok'
+    assert timings['Hasty']['status'] == 'timeout'
+    assert products.to_dicts()[0]['store'] == 'Patient'
+
+
+def test_results_are_reported_as_each_retailer_arrives(adapters):
+    adapters.extend([FakeAdapter('Slow', delay=0.2), FakeAdapter('Fast')])
+    arrivals = []
+
+    scrape_products_with_timing('pens', on_retailer=lambda store, batch, timing: arrivals.append(store))
+
+    assert arrivals == ['Fast', 'Slow']
+
+
+def test_registered_adapter_types_are_built_from_config(monkeypatch):
+    monkeypatch.setitem(ADAPTER_TYPES, 'fake', None)
+    register_adapter('fake')(FakeAdapter)
+
+    adapters = build_retailer_adapters([
+        {'key': 'a', 'store': 'A', 'type': 'fake', 'prices': [2.0], 'deadline': 1.5},
+        {'key': 'b', 'store': 'B', 'type': 'missing'},
+        {'key': 'c', 'store': 'C'},
+    ])
+
+    assert [type(a).__name__ for a in adapters] == ['FakeAdapter', 'SampleRetailerAdapter']
+    assert adapters[0].prices == [2.0]
+    assert adapters[0].deadline == 1.5
+    assert adapters[1].options == {}
+
+
+def test_config_file_and_enabled_subset(tmp_path, monkeypatch):
+    config_file = tmp_path / 'retailers.json'
+    config_file.write_text(json.dumps([
+        {'key': 'one', 'store': 'One'}, {'key': 'two', 'store': 'Two'}, {'key': 'three', 'store': 'Three'}
+    ]))
+    monkeypatch.setenv('RETAILER_CONFIG_FILE', str(config_file))
+    monkeypatch.setenv('RETAILERS', ' Three, one ')
+
+    assert [entry['store'] for entry in load_retailer_config()] == ['One', 'Three']
+
+
+def test_unreadable_config_file_falls_back_to_defaults(tmp_path, monkeypatch):
+    monkeypatch.setenv('RETAILER_CONFIG_FILE', str(tmp_path / 'missing.json'))
+    monkeypatch.delenv('RETAILERS', raising=False)
+
+    assert load_retailer_config() == product_scraper.DEFAULT_RETAILER_CONFIG
+
+
+def test_http_client_is_shared_across_threads(monkeypatch):
+    monkeypatch.setattr(http_client, '_client', None)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(http_client.get_http_client())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
+    adapter = clients[0].get_adapter('https://example.com')
+    assert adapter._pool_maxsize == http_client.HTTP_POOL_MAXSIZE
+    assert adapter._pool_block
+
+
+OXFORD = {'lat': 34.3665, 'lng': -89.5192}
+# About 150m away, in the same precision 5 tile
+OXFORD_NEARBY = {'lat': 34.3675, 'lng': -89.5180}
+MEMPHIS = {'lat': 35.1495, 'lng': -90.0490}
+
+
+def test_results_are_cached_per_query_and_tile(adapters):
+    adapter = FakeAdapter('Store')
+    adapters.append(adapter)
+
+    _, first = scrape_products_with_timing('Pens', OXFORD)
+    products, again = scrape_products_with_timing('  pens ', OXFORD_NEARBY)
+    _, elsewhere = scrape_products_with_timing('pens', MEMPHIS)
+
+    assert (first['Store']['status'], again['Store']['status'], elsewhere['Store']['status']) == \
+        ('ok', 'cached', 'ok')
+    assert adapter.calls == 2
+    # Served from the first scrape
+    assert products.to_dicts()[0]['name'] == 'Pens Store 0'
+
+
+def test_stale_results_are_served_while_refreshing(adapters):
+    adapter = FakeAdapter('Store', cache_ttl=0, stale_ttl=60)
+    adapters.append(adapter)
+
+    scrape_products_with_timing('pens', OXFORD)
+    _, timings = scrape_products_with_timing('pens', OXFORD)
+
+    assert timings['Store']['status'] == 'stale'
+    # The refresh key is released once the new results are cached
+    deadline = time.monotonic() + 2
+    while (adapter.calls < 2 or product_scraper._refreshing) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert adapter.calls == 2
+    assert not product_scraper._refreshing
+
+
+def test_failed_scrapes_are_not_cached(adapters):
+    adapter = FakeAdapter('Store', error=RuntimeError('blocked'))
+    adapters.append(adapter)
+
+    scrape_products_with_timing('pens', OXFORD)
+    _, timings = scrape_products_with_timing('pens', OXFORD)
+
+    assert timings['Store']['status'] == 'error'
+    assert adapter.calls == 2
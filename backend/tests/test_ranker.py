@@ -0,0 +1,97 @@
+"""
+Tests for local BM25 ranking and token coverage matching
+"""
+import math
+import numpy as np
+from app.utils.product_batch import Product, ProductBatch
+from app.utils.ranker import BM25Index, rank_products, token_coverage_matrix, tokenize
+
+NAMES = [
+    'Five Star Spiral Notebook, 3 Subject',
+    'BIC Round Stic Ballpoint Pens, Black, 10 Pack',
+    'Composition Notebook Notebook College Ruled',
+    'Ticonderoga Pencils #2, 24 Count',
+    'Glue Stick',
+]
+
+
+def _reference_bm25(documents, query, k1=1.2, b=0.75):
+    docs = [tokenize(doc) for doc in documents]
+    average = sum(len(doc) for doc in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in set(tokenize(query)):
+            containing = sum(term in other for other in docs)
+            if not containing:
+                continue
+            idf = math.log(1 + (len(docs) - containing + 0.5) / (containing + 0.5))
+            freq = doc.count(term)
+            score += idf * freq * (k1 + 1) / (freq + k1 * (1 - b + b * len(doc) / average))
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_lowercases_and_stems_plurals():
+    assert tokenize('Notebooks, GLASS pens & 24 Markers') == ['notebook', 'glass', 'pen', '24', 'marker']
+
+
+def test_bm25_matches_the_reference_formula():
+    index = BM25Index(NAMES)
+    for query in ('notebooks', 'black pens', 'college ruled notebook', 'stapler'):
+        assert np.allclose(index.scores(query), _reference_bm25(NAMES, query))
+
+
+def test_products_are_ordered_by_best_query_score():
+    products = [{'name': name, 'price': price, 'store': 'Store'} for name, price in zip(NAMES, range(5))]
+
+    ranked, scores = rank_products(['notebooks', 'pencils'], products)
+
+    # The rarer term and the repeated term score higher; unmatched
+    # products keep their price order at the end
+    assert [p['name'] for p in ranked] == [NAMES[3], NAMES[2], NAMES[0], NAMES[1], NAMES[4]]
+    assert list(scores) == sorted(scores, reverse=True)
+    assert scores[-1] == 0
+
+
+def test_batches_rank_like_lists():
+    records = [Product(name, float(price), 'Store') for price, name in enumerate(NAMES)]
+    batch = ProductBatch.from_records(records, 'notebooks')
+
+    ranked, scores = rank_products(['notebooks'], batch)
+    listed, list_scores = rank_products(['notebooks'], batch.to_dicts())
+
+    assert isinstance(ranked, ProductBatch)
+    assert [p['name'] for p in ranked.to_dicts()] == [p['name'] for p in listed]
+    assert np.allclose(scores, list_scores)
+
+
+QUERIES = ['notebook', 'black pens', 'Glue Stick', 'pencils #2', 'stapler', '3 subject']
+
+
+def test_coverage_matrix_matches_per_pair_scores():
+    scores = token_coverage_matrix(NAMES, QUERIES)
+
+    for i, name in enumerate(NAMES):
+        for j, query in enumerate(QUERIES):
+            tokens = set(tokenize(query))
+            expected = len(tokens & set(tokenize(name))) / len(tokens)
+            if query.lower() in name.lower():
+                expected = 1.0
+            assert scores[i, j] == expected
+
+
+def test_coverage_keeps_every_substring_match():
+    scores = token_coverage_matrix(NAMES, QUERIES)
+    substring = np.array([[query.lower() in name.lower() for query in QUERIES] for name in NAMES])
+
+    # The old matcher's hits score 1.0, so they pass MATCH_ACCEPT_SCORE
+    assert (scores[substring] == 1.0).all()
+    # Word order and plurals no longer hide a match
+    assert scores[NAMES.index('BIC Round Stic Ballpoint Pens, Black, 10 Pack'), 1] == 1.0
+
+
+def test_coverage_matrix_handles_empty_inputs():
+    assert token_coverage_matrix([], QUERIES).shape == (0, len(QUERIES))
+    assert token_coverage_matrix(NAMES, []).shape == (len(NAMES), 0)
+    assert not token_coverage_matrix(NAMES, ['']).any()
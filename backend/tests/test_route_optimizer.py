@@ -0,0 +1,87 @@
+"""
+Tests for the route distance matrix
+"""
+import numpy as np
+import pytest
+from app.utils import route_optimizer
+from app.utils.geo import haversine_matrix, location_arrays
+from app.utils.route_optimizer import build_distance_matrix, get_actual_distance
+
+# Driving distance the fake API reports, relative to the straight line
+DETOUR = 1.25
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{'lat': 34.36 + rng.uniform(-0.2, 0.2), 'lng': -89.52 + rng.uniform(-0.2, 0.2)}
+            for _ in range(n)]
+
+
+class FakeDistanceMatrix:
+    """Distance Matrix client reporting DETOUR x the straight line distance"""
+    def __init__(self, missing=()):
+        self.requests = []
+        self.missing = set(missing)
+
+    def distance_matrix(self, origins, destinations, mode):
+        self.requests.append((len(origins), len(destinations)))
+        rows = []
+        for o in origins:
+            elements = []
+            for d in destinations:
+                if (o, d) in self.missing:
+                    elements.append({'status': 'ZERO_RESULTS'})
+                    continue
+                miles = haversine_matrix([o[0], d[0]], [o[1], d[1]])[0, 1]
+                elements.append({'status': 'OK', 'distance': {'value': miles * DETOUR * 1609.34}})
+            rows.append({'elements': elements})
+        return {'rows': rows}
+
+
+@pytest.fixture
+def gmaps(monkeypatch):
+    client = FakeDistanceMatrix()
+    monkeypatch.setattr(route_optimizer, 'gmaps', client)
+    route_optimizer.distance_cache.clear()
+    yield client
+    route_optimizer.distance_cache.clear()
+
+
+def test_without_google_maps_the_matrix_is_straight_line(monkeypatch):
+    monkeypatch.setattr(route_optimizer, 'gmaps', None)
+    points = _points(6)
+
+    matrix = build_distance_matrix(points)
+
+    assert np.allclose(matrix, haversine_matrix(*location_arrays(points)))
+    assert np.allclose(matrix, matrix.T) and not matrix.diagonal().any()
+
+
+def test_pairs_are_fetched_in_chunks_then_cached(gmaps):
+    points = _points(12)
+
+    matrix = build_distance_matrix(points)
+
+    assert np.allclose(matrix, haversine_matrix(*location_arrays(points)) * DETOUR)
+    assert all(o <= 10 and d <= 10 for o, d in gmaps.requests)
+    assert sum(o * d for o, d in gmaps.requests) == 12 * 12
+    assert len(route_optimizer.distance_cache) == 12 * 11
+
+    gmaps.requests.clear()
+    assert np.array_equal(build_distance_matrix(points[::-1]), matrix[::-1, ::-1])
+    assert gmaps.requests == []
+
+
+def test_unanswered_pairs_fall_back_to_straight_line_and_are_retried(gmaps):
+    points = _points(3)
+    a, b = ((p['lat'], p['lng']) for p in points[:2])
+    gmaps.missing.add((a, b))
+
+    matrix = build_distance_matrix(points)
+    straight = haversine_matrix(*location_arrays(points))
+
+    assert matrix[0, 1] == pytest.approx(straight[0, 1])
+    assert matrix[1, 0] == pytest.approx(straight[1, 0] * DETOUR)
+
+    gmaps.missing.clear()
+    assert get_actual_distance(points[0], points[1]) == pytest.approx(straight[0, 1] * DETOUR)
@@ -0,0 +1,158 @@
+"""
+Tests for the route solvers
+"""
+import itertools
+import time
+import pytest
+import numpy as np
+from app.utils.geo import haversine_matrix
+from app.utils import route_solvers
+from app.utils.route_optimizer import astar_route, calculate_optimal_route
+from app.utils.route_solvers import (
+    MSTLowerBound, greedy_insertion_order, held_karp_path, local_search_path, mst_cost,
+    nearest_neighbor_order, path_cost
+)
+
+
+def _random_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = 34.36 + rng.uniform(-0.3, 0.3, n + 1)
+    lngs = -89.52 + rng.uniform(-0.3, 0.3, n + 1)
+    return haversine_matrix(lats, lngs)
+
+
+def _random_products(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {'name': f'Item {idx}', 'store': f'Store {idx}',
+         'location': {'lat': 34.36 + rng.uniform(-0.3, 0.3), 'lng': -89.52 + rng.uniform(-0.3, 0.3)}}
+        for idx in range(n)
+    ]
+
+
+def test_held_karp_matches_brute_force():
+    for seed in range(5):
+        matrix = _random_matrix(7, seed)
+        best = min(path_cost(matrix, order) for order in itertools.permutations(range(1, 8)))
+        order, cost = held_karp_path(matrix)
+
+        assert sorted(order) == list(range(1, 8))
+        assert abs(cost - best) < 1e-9
+        assert abs(path_cost(matrix, order) - cost) < 1e-9
+
+
+def test_astar_agrees_with_held_karp():
+    matrix = _random_matrix(8, seed=3)
+    _, expected = held_karp_path(matrix)
+    order, cost = astar_route(matrix)
+
+    assert sorted(order) == list(range(1, 9))
+    assert abs(cost - expected) < 1e-9
+
+
+def _asymmetric_matrix(n, seed):
+    # Driving distances: the straight line plus a one-way detour
+    rng = np.random.default_rng(seed)
+    return _random_matrix(n, seed) * rng.uniform(1.0, 1.6, (n + 1, n + 1))
+
+
+def _kruskal(matrix, nodes):
+    edges = sorted((min(matrix[a][b], matrix[b][a]), a, b) for a, b in itertools.combinations(nodes, 2))
+    parent = {node: node for node in nodes}
+
+    def find(node):
+        while parent[node] != node:
+            node = parent[node]
+        return node
+
+    total = 0.0
+    for weight, a, b in edges:
+        if find(a) != find(b):
+            parent[find(a)] = find(b)
+            total += weight
+    return total
+
+
+def test_mst_cost_matches_kruskal():
+    for seed in range(5):
+        matrix = _asymmetric_matrix(9, seed)
+        nodes = [0, 2, 3, 5, 6, 8, 9]
+        assert abs(mst_cost(matrix, nodes) - _kruskal(matrix, nodes)) < 1e-9
+
+
+def test_mst_bound_never_exceeds_the_remaining_path():
+    matrix = _asymmetric_matrix(6, seed=4)
+    bounds = MSTLowerBound(matrix)
+
+    for mask in range(1, 1 << 6):
+        stores = bounds.nodes(mask)
+        for current in [0] + [idx for idx in range(1, 7) if idx not in stores]:
+            best = min(
+                sum(matrix[a][b] for a, b in zip((current,) + order, order))
+                for order in itertools.permutations(stores)
+            )
+            assert bounds.bound(current, mask) <= best + 1e-9
+
+
+def test_mst_bound_is_computed_once_per_subset(monkeypatch):
+    calls = []
+    original = route_solvers.mst_cost
+
+    def counting_mst_cost(matrix, nodes):
+        calls.append(nodes)
+        return original(matrix, nodes)
+
+    monkeypatch.setattr(route_solvers, 'mst_cost', counting_mst_cost)
+    bounds = MSTLowerBound(_random_matrix(5))
+
+    for current in range(6):
+        bounds.bound(current, 0b10110)
+    bounds.bound(0, 0b00001)
+
+    assert len(calls) == 2
+    assert len(bounds) == 3
+
+
+def test_astar_handles_asymmetric_distances():
+    matrix = _asymmetric_matrix(7, seed=5)
+    _, expected = held_karp_path(matrix)
+    order, cost = astar_route(matrix)
+
+    assert abs(path_cost(matrix, order) - expected) < 1e-9
+    assert abs(cost - expected) < 1e-9
+
+
+def test_unknown_solver_is_rejected():
+    with pytest.raises(ValueError):
+        calculate_optimal_route(_random_products(1), {'lat': 34.36, 'lng': -89.52}, solver='dijkstra')
+
+
+def test_local_search_stays_within_its_time_budget():
+    matrix = _random_matrix(1000)
+    budget_ms = 100
+
+    started = time.perf_counter()
+    order, cost = local_search_path(matrix, budget_ms)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    assert elapsed_ms < 3 * budget_ms
+    assert sorted(order) == list(range(1, 1001))
+    assert cost <= path_cost(matrix, nearest_neighbor_order(matrix)) + 1e-9
+
+
+def test_large_route_returns_within_a_small_multiple_of_the_budget():
+    products = _random_products(800)
+    budget_ms = 100
+
+    started = time.perf_counter()
+    route = calculate_optimal_route(products, {'lat': 34.36, 'lng': -89.52}, time_budget_ms=budget_ms)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    assert len(route) == 800
+    assert elapsed_ms < 3 * budget_ms
+
+
+def test_greedy_insertion_gives_up_at_the_deadline():
+    matrix = _random_matrix(400)
+    assert greedy_insertion_order(matrix, deadline=time.perf_counter()) is None
+    assert sorted(greedy_insertion_order(matrix[:30, :30])) == list(range(1, 30))
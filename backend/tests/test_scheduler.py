@@ -0,0 +1,71 @@
+"""
+Tests for multi-semester plan generation
+"""
+from app.models.database import Course, Major, bump_catalog_version, get_session
+from app.utils.scheduler import PLAN_MAX_HEAVY, ScheduleGenerator
+
+
+def _plan(credit_load='standard', completed=()):
+    session = get_session()
+    major = session.get(Major, 1)
+    return ScheduleGenerator(session).generate_plan(major, None, 'Fall 2025', credit_load, list(completed))
+
+
+def _add_required_courses(count, workload):
+    session = get_session()
+    major = session.get(Major, 1)
+    for idx in range(count):
+        course = Course(code=f'CSCI {700 + idx}', name=f'Elective {idx}', credits=3,
+                        workload=workload, category='Core')
+        session.add(course)
+        major.required_courses.append(course)
+
+    bump_catalog_version(session)
+    session.commit()
+
+
+def _assert_prerequisites_come_first(plan, completed=()):
+    taken = set(completed)
+    for semester in plan['semesters']:
+        for course in semester['courses']:
+            assert set(course['prerequisites']) <= taken, course['code']
+        taken.update(c['code'] for c in semester['courses'])
+
+
+def test_plan_meets_lower_bound_with_prerequisites_ordered(catalog_db):
+    plan = _plan()
+
+    assert plan['total_semesters'] == plan['minimum_semesters']
+    assert [s['semester'] for s in plan['semesters']][:3] == ['Fall 2025', 'Spring 2026', 'Fall 2026']
+    assert sum(s['total_credits'] for s in plan['semesters']) == plan['total_credits']
+    _assert_prerequisites_come_first(plan)
+
+
+def test_completed_courses_are_left_out(catalog_db):
+    completed = ['CSCI 111', 'MATH 261']
+    plan = _plan(completed=completed)
+
+    codes = [c['code'] for s in plan['semesters'] for c in s['courses']]
+    assert not set(codes) & set(completed)
+    _assert_prerequisites_come_first(plan, completed)
+
+
+def test_heavy_courses_are_capped_per_term(catalog_db):
+    _add_required_courses(8, 'Heavy')
+    plan = _plan('heavy')
+
+    for semester in plan['semesters']:
+        assert sum(c['workload'] == 'Heavy' for c in semester['courses']) <= PLAN_MAX_HEAVY
+        assert semester['total_credits'] <= plan['credit_range'][1]
+    _assert_prerequisites_come_first(plan)
+
+
+def test_short_terms_are_flagged_below_the_minimum(catalog_db):
+    _add_required_courses(10, 'Light')
+    plan = _plan('standard')
+    minimum = plan['credit_range'][0]
+
+    for semester in plan['semesters'][:-1]:
+        flagged = any('minimum' in w['message'] for w in semester['warnings'])
+        assert flagged == (semester['total_credits'] < minimum)
+    assert plan['semesters'][-1]['warnings'] == []
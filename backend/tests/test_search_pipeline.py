@@ -0,0 +1,107 @@
+"""
+Tests for the pipelined multi-item search
+"""
+import random
+import threading
+import time
+from app.utils.product_batch import Product, ProductBatch
+from app.utils.search_pipeline import SearchPipeline
+
+
+def _scrape(query, user_location=None, on_retailer=None):
+    records = [Product(f'{query} {idx}', price, 'Store') for idx, price in enumerate((3.0, 1.0, 2.0))]
+    batch = ProductBatch.from_records(records, query)
+    if on_retailer:
+        on_retailer('Store', batch, {'status': 'ok'})
+    return batch, {'Store': {'status': 'ok'}}
+
+
+def _pipeline(**kwargs):
+    return SearchPipeline(enhance=lambda items: [item.upper() for item in items], scrape=_scrape, **kwargs)
+
+
+def _run_with_timeout(pipeline, items, timeout=5, **kwargs):
+    output = {}
+    thread = threading.Thread(target=lambda: output.setdefault('results', pipeline.run(items, **kwargs)),
+                              daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'pipeline did not finish'
+    return output['results']
+
+
+def test_results_come_back_in_item_order():
+    delays = random.Random(3).sample(range(20), 20)
+
+    def scrape(query, user_location=None, on_retailer=None):
+        # Later items often finish first
+        time.sleep(delays[int(query.split()[-1])] / 1000)
+        return _scrape(query, user_location, on_retailer)
+
+    pipeline = SearchPipeline(enhance=lambda items: [item.upper() for item in items], scrape=scrape)
+    results = _run_with_timeout(pipeline, [f'item {idx}' for idx in range(20)])
+
+    assert [r['item'] for r in results] == [f'item {idx}' for idx in range(20)]
+    assert results[3]['query'] == 'ITEM 3'
+    assert results[3]['products'].price.tolist() == [1.0, 2.0, 3.0]
+
+
+def test_events_and_budget():
+    events = []
+    lock = threading.Lock()
+
+    def on_event(event, record):
+        with lock:
+            events.append((event, record['index']))
+
+    results = _run_with_timeout(_pipeline(), ['a', 'b'], budget=2.5, on_event=on_event)
+
+    assert sorted(events) == [('item', 0), ('item', 1), ('retailer', 0), ('retailer', 1)]
+    assert results[0]['products'].price.tolist() == [1.0, 2.0]
+
+
+def test_raising_on_event_does_not_hang_the_pipeline():
+    def on_event(event, record):
+        raise RuntimeError('client went away')
+
+    items = [f'item {idx}' for idx in range(30)]
+    results = _run_with_timeout(_pipeline(scrape_workers=2, rank_workers=1, queue_size=2), items,
+                                on_event=on_event)
+
+    assert [r['item'] for r in results] == items
+
+
+def test_raising_stage_handler_yields_empty_results():
+    pipeline = _pipeline(rank_workers=1)
+    pipeline._rank_item = lambda record, budget: 1 / 0
+
+    results = _run_with_timeout(pipeline, ['a', 'b', 'c'])
+
+    assert [r['item'] for r in results] == ['a', 'b', 'c']
+    assert all(len(r['products']) == 0 for r in results)
+
+
+def test_enhance_stage_batches_the_list():
+    batches = []
+
+    def enhance(items):
+        batches.append(list(items))
+        return [item.upper() for item in items]
+
+    items = [f'item {idx}' for idx in range(12)]
+    pipeline = SearchPipeline(enhance=enhance, scrape=_scrape, enhance_workers=1,
+                              enhance_batch=5, enhance_linger=1.0)
+    results = _run_with_timeout(pipeline, items)
+
+    assert batches == [items[:5], items[5:10], items[10:]]
+    assert [r['query'] for r in results] == [item.upper() for item in items]
+
+
+def test_failed_enhance_falls_back_to_the_items():
+    def enhance(items):
+        raise RuntimeError('quota exceeded')
+
+    pipeline = SearchPipeline(enhance=enhance, scrape=_scrape)
+    results = _run_with_timeout(pipeline, ['pens', 'glue'])
+
+    assert [r['query'] for r in results] == ['pens', 'glue']
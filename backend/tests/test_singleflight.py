@@ -0,0 +1,93 @@
+"""
+Tests for request coalescing
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from app.utils.singleflight import SingleFlight
+
+
+def test_do_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', work))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()['leaders'] + flight.stats()['shared'] < 8:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ['result'] * 8
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_submit_after_abandon_gets_a_fresh_future():
+    flight = SingleFlight()
+    blocker = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Keep the only worker busy so the scrape below stays queued
+        executor.submit(blocker.wait, 5)
+
+        first, shared = flight.submit('key', executor, lambda: 'first')
+        assert not shared
+        flight.abandon('key', first)
+
+        second, shared = flight.submit('key', executor, lambda: 'second')
+        blocker.set()
+
+        assert not shared
+        assert first.cancelled()
+        assert second.result(timeout=5) == 'second'
+
+
+class _PausingFuture(Future):
+    """Future whose cancel() waits until the test lets it proceed"""
+    def __init__(self, in_cancel, proceed):
+        super().__init__()
+        self.in_cancel = in_cancel
+        self.proceed = proceed
+
+    def cancel(self):
+        self.in_cancel.set()
+        self.proceed.wait(5)
+        return super().cancel()
+
+
+class _QueuedExecutor:
+    """Executor stub that never starts its work"""
+    def __init__(self):
+        self.in_cancel = threading.Event()
+        self.proceed = threading.Event()
+
+    def submit(self, fn, *args, **kwargs):
+        return _PausingFuture(self.in_cancel, self.proceed)
+
+
+def test_join_racing_the_last_abandon_gets_a_live_future():
+    flight = SingleFlight()
+    executor = _QueuedExecutor()
+
+    first, _ = flight.submit('key', executor, lambda: 'value')
+    abandoning = threading.Thread(target=flight.abandon, args=('key', first))
+    abandoning.start()
+
+    # The last waiter is now cancelling; a new caller arrives in between
+    assert executor.in_cancel.wait(5)
+    second, shared = flight.submit('key', executor, lambda: 'value')
+    executor.proceed.set()
+    abandoning.join()
+
+    assert first.cancelled()
+    assert second is not first and not shared
+    assert not second.cancelled()
@@ -0,0 +1,97 @@
+"""
+Tests for the cached store locator and its spatial index
+"""
+import random
+import threading
+import time
+import numpy as np
+from app.scrapers.store_locator import StoreIndex, StoreLocator
+from app.utils.cache import LRUCache, TieredCache
+from app.utils.geo import haversine_one_to_many
+
+OXFORD = {'lat': 34.3665, 'lng': -89.5192}
+# About 150m away, in the same precision 5 tile
+OXFORD_NEARBY = {'lat': 34.3675, 'lng': -89.5180}
+
+
+class FakePlaces:
+    """Places client answering with fixed stores, counting lookups"""
+    def __init__(self, stores, fail=False, delay=0.0):
+        self.stores = stores
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def places_nearby(self, location, radius, keyword, type):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('OVER_QUERY_LIMIT')
+        return {'results': [
+            {'name': f'{keyword} {idx}', 'vicinity': 'Oxford',
+             'geometry': {'location': {'lat': lat, 'lng': lng}}}
+            for idx, (lat, lng) in enumerate(self.stores)
+        ]}
+
+
+def _locator(client):
+    return StoreLocator(client=client, cache=TieredCache(LRUCache(maxsize=64, ttl=60)))
+
+
+def test_index_matches_a_brute_force_scan():
+    rng = random.Random(11)
+    stores = [{'lat': 34 + rng.random(), 'lng': -90 + rng.random()} for _ in range(400)]
+    index = StoreIndex(precision=5)
+    index.add('Walmart', stores)
+
+    for _ in range(200):
+        lat, lng = 34 + rng.random(), -90 + rng.random()
+        distances = haversine_one_to_many(lat, lng, [s['lat'] for s in stores], [s['lng'] for s in stores])
+        expected = [stores[idx] for idx in np.argsort(distances)[:3]]
+
+        assert index.nearest('Walmart', lat, lng, n=3) == expected
+
+
+def test_index_applies_the_radius_and_skips_duplicates():
+    index = StoreIndex()
+    near = {'lat': 34.37, 'lng': -89.52}
+    far = {'lat': 35.15, 'lng': -90.05}
+    index.add('Target', [near, far, dict(near)])
+
+    assert index.nearest('Target', OXFORD['lat'], OXFORD['lng'], n=3) == [near, far]
+    assert index.nearest('Target', OXFORD['lat'], OXFORD['lng'], n=3, max_miles=10) == [near]
+
+
+def test_one_lookup_per_chain_and_tile():
+    client = FakePlaces([(34.37, -89.52), (34.40, -89.50)], delay=0.05)
+    locator = _locator(client)
+
+    threads = [threading.Thread(target=locator.nearest, args=('Kroger', OXFORD)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stores = locator.nearest('Kroger', OXFORD_NEARBY)
+    locator.nearest('CVS', OXFORD)
+
+    assert client.calls == 2
+    assert [s['name'] for s in stores] == ['Kroger 0', 'Kroger 1']
+
+
+def test_failed_lookup_falls_back_to_the_user_and_retries():
+    client = FakePlaces([(34.37, -89.52)], fail=True)
+    locator = _locator(client)
+
+    assert locator.nearest('Kroger', OXFORD) == [OXFORD]
+
+    client.fail = False
+    assert locator.nearest('Kroger', OXFORD)[0]['name'] == 'Kroger 0'
+    assert client.calls == 2
+
+
+def test_without_a_client_stores_are_placed_at_fixed_offsets():
+    stores = _locator(None).nearest('Walmart', OXFORD)
+
+    assert stores == [{'lat': OXFORD['lat'] + 0.01, 'lng': OXFORD['lng'] + 0.01}]
@@ -0,0 +1,86 @@
+"""
+Tests for joint store selection and routing
+"""
+import itertools
+import numpy as np
+from app.utils import trip_planner
+from app.utils.geo import haversine_matrix
+from app.utils.trip_planner import plan_trip
+
+START = {'lat': 34.36, 'lng': -89.52}
+
+
+def _brute_force_total(products, cost_per_mile):
+    items = sorted({p['search_query'] for p in products})
+    locations = sorted({(p['location']['lat'], p['location']['lng']) for p in products})
+    points = [(START['lat'], START['lng'])] + locations
+    matrix = haversine_matrix([p[0] for p in points], [p[1] for p in points])
+
+    best = np.inf
+    for size in range(1, len(locations) + 1):
+        for subset in itertools.combinations(range(len(locations)), size):
+            price = 0.0
+            for item in items:
+                offers = [p['price'] for p in products if p['search_query'] == item
+                          and (p['location']['lat'], p['location']['lng']) in [locations[j] for j in subset]]
+                if not offers:
+                    price = np.inf
+                    break
+                price += min(offers)
+            if not np.isfinite(price):
+                continue
+
+            distance = min(
+                sum(matrix[a][b] for a, b in zip((0,) + order, order))
+                for order in itertools.permutations([j + 1 for j in subset])
+            )
+            best = min(best, price + cost_per_mile * distance)
+
+    return best
+
+
+def _random_products(seed, n_items=3, n_stores=6):
+    rng = np.random.default_rng(seed)
+    stores = [{'lat': START['lat'] + rng.uniform(-0.2, 0.2), 'lng': START['lng'] + rng.uniform(-0.2, 0.2)}
+              for _ in range(n_stores)]
+    products = []
+    for item in range(n_items):
+        for idx, location in enumerate(stores):
+            if rng.random() < 0.7:
+                products.append({'name': f'item {item} at {idx}', 'search_query': f'item {item}',
+                                 'price': round(float(rng.uniform(1, 10)), 2), 'store': f'Store {idx}',
+                                 'location': location})
+    return products
+
+
+def test_exact_plan_matches_brute_force():
+    for seed in range(6):
+        products = _random_products(seed)
+        for cost_per_mile in (0.1, 0.5, 2.0):
+            plan = plan_trip(products, START, cost_per_mile)
+            expected = _brute_force_total(products, cost_per_mile)
+            assert abs(plan['totals']['total'] - round(expected, 2)) <= 0.011, (seed, cost_per_mile)
+
+
+def _far_cheap_near_convenient():
+    far_a = {'lat': START['lat'] + 0.3, 'lng': START['lng']}
+    far_b = {'lat': START['lat'] - 0.3, 'lng': START['lng']}
+    near = {'lat': START['lat'] + 0.01, 'lng': START['lng']}
+    return [
+        {'name': 'Cheap A', 'search_query': 'a', 'price': 10.0, 'store': 'Far A', 'location': far_a},
+        {'name': 'Cheap B', 'search_query': 'b', 'price': 10.0, 'store': 'Far B', 'location': far_b},
+        {'name': 'Near A', 'search_query': 'a', 'price': 11.0, 'store': 'Near', 'location': near},
+        {'name': 'Near B', 'search_query': 'b', 'price': 11.0, 'store': 'Near', 'location': near},
+    ]
+
+
+def test_local_search_swaps_in_candidate_stores(monkeypatch):
+    products = _far_cheap_near_convenient()
+    exact = plan_trip(products, START, cost_per_mile=1.0)
+
+    monkeypatch.setattr(trip_planner, 'TRIP_EXACT_MAX_STOPS', 0)
+    local = plan_trip(products, START, cost_per_mile=1.0, time_budget_ms=200)
+
+    # The far stores are each item's cheapest; only a swap reaches the near one
+    assert [stop['name'] for stop in local['route']] == ['Near']
+    assert local['totals'] == exact['totals']
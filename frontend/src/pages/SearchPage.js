@@ -19,6 +19,32 @@ const defaultCenter = {
   lng: -122.4194
 };
 
+// Parse a text/event-stream response body, calling onEvent(event, data) per message
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+
+    for (const message of messages) {
+      let event = 'message';
+      let data = '';
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 function SearchPage() {
   const [searchQuery, setSearchQuery] = useState('');
   const [budget, setBudget] = useState('');
@@ -75,14 +101,32 @@ function SearchPage() {
     }
 
     setLoading(true);
+    setProducts([]);
     try {
-      const response = await axios.post('/api/search-products', {
-        query: searchQuery,
-        budget: parseFloat(budget) || null,
-        location: userLocation
+      const response = await fetch('/api/search-products/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          query: searchQuery,
+          budget: parseFloat(budget) || null,
+          location: userLocation
+        })
       });
 
-      setProducts(response.data.products || []);
+      if (!response.ok) {
+        throw new Error(`Search failed with status ${response.status}`);
+      }
+
+      // Show each retailer's products as they arrive, then the final ranking
+      await readEventStream(response, (event, data) => {
+        if (event === 'retailer') {
+          setProducts(current => [...current, ...data.products]);
+        } else if (event === 'results') {
+          setProducts(data.products || []);
+        } else if (event === 'error') {
+          throw new Error(data.error);
+        }
+      });
 
       // Add to search history
       const newHistory = [